@@ -1,5 +1,6 @@
 # sam/balanceador/run_balanceador.py (Refactorizado con patrón Fábrica)
 
+import asyncio
 import logging
 import signal
 import sys
@@ -10,6 +11,7 @@ from sam.common.config_manager import ConfigManager
 from sam.common.database import DatabaseConnector
 from sam.common.logging_setup import setup_logging
 from sam.common.mail_client import EmailAlertClient
+from sam.common.migraciones import EsquemaDesactualizadoError
 
 SERVICE_NAME = "balanceador"
 service_instance: Optional[BalanceadorService] = None
@@ -21,8 +23,8 @@ def graceful_shutdown(signum, frame):
         service_instance.stop()
 
 
-def main():
-    """Función principal que inicializa y ejecuta el servicio Balanceador."""
+async def main_async():
+    """Función principal asíncrona que inicializa y ejecuta el servicio Balanceador."""
     global service_instance
 
     setup_logging(service_name=SERVICE_NAME)
@@ -59,8 +61,11 @@ def main():
         service_instance = BalanceadorService(db_sam=db_sam, db_rpa360=db_rpa360, notificador=notificador)
 
         logging.info("Iniciando el ciclo principal del servicio Balanceador...")
-        service_instance.run()
+        await service_instance.run()
 
+    except EsquemaDesactualizadoError as e:
+        logging.critical(str(e))
+        sys.exit(1)
     except Exception as e:
         logging.critical(f"Error crítico no controlado en el servicio {SERVICE_NAME}: {e}", exc_info=True)
         sys.exit(1)
@@ -73,3 +78,7 @@ def main():
             db_rpa360.cerrar_conexion_hilo_actual()
         logging.info(f"El servicio {SERVICE_NAME} ha concluido su ejecución.")
 
+
+def main():
+    """Punto de entrada síncrono (script sam-balanceador)."""
+    asyncio.run(main_async())
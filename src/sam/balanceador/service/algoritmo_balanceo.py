@@ -4,13 +4,21 @@
 import logging
 import math
 import threading
-from typing import Any, Dict, List, Optional, Set, Tuple
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from sam.common.database import DatabaseConnector
 from sam.common.mail_client import EmailAlertClient
 
 from .cooling_manager import CoolingManager
+from .coordinacion import ArrendamientoPerdidoError, CercoArrendamiento
+from .escritor_historico import DecisionHistorica, EscritorHistoricoBalanceo
+from .estado_balanceo_cache import EstadoBalanceoCache
+from .estado_enfriamiento import crear_backend_enfriamiento
 from .historico_client import HistoricoBalanceoClient
+from .plan_balanceo import PlanBalanceo
+from .pronostico_carga import PronosticadorCarga
+from .solver_asignacion import EquipoCandidato, RobotDemanda, crear_solver
 
 logger = logging.getLogger(__name__)
 
@@ -32,36 +40,213 @@ class Balanceo:
 
         self.historico_client = HistoricoBalanceoClient(self.db_sam)
         cooling_period = self.cfg_balanceador_specifics.get("cooling_period_seg", 300)
-        self.cooling_manager = CoolingManager(cooling_period_seconds=cooling_period)
+        backend_enfriamiento = crear_backend_enfriamiento(
+            self.cfg_balanceador_specifics.get("cooling_backend", "memoria"),
+            self.db_sam,
+            self.cfg_balanceador_specifics.get("cooling_archivo", "sam_balanceador_enfriamiento.json"),
+        )
+        self.cooling_manager = CoolingManager(cooling_period_seconds=cooling_period, backend=backend_enfriamiento)
         self.aislamiento_estricto_pool = self.cfg_balanceador_specifics.get("aislamiento_estricto_pool", True)
+        self.solver = crear_solver(self.cfg_balanceador_specifics.get("solver", "greedy"))
+        # Por defecto un robot amplía de a un equipo por ciclo; el enfriamiento regula el ritmo.
+        self.ampliacion_completa_por_ciclo = self.cfg_balanceador_specifics.get("ampliacion_completa_por_ciclo", False)
+        logger.info(f"Solver de asignación: {self.solver.nombre}")
+        self.estado_cache: Optional[EstadoBalanceoCache] = None
+        if self.cfg_balanceador_specifics.get("cache_estado", True):
+            self.estado_cache = EstadoBalanceoCache(
+                self.db_sam, self.cfg_balanceador_specifics.get("cache_recarga_completa_seg", 3600)
+            )
+        self.escritor_historico: Optional[EscritorHistoricoBalanceo] = None
+        if self.cfg_balanceador_specifics.get("historico_habilitado", True):
+            self.escritor_historico = EscritorHistoricoBalanceo(
+                self.historico_client,
+                capacidad=self.cfg_balanceador_specifics.get("historico_capacidad", 10000),
+                tamano_lote=self.cfg_balanceador_specifics.get("historico_lote", 500),
+                politica=self.cfg_balanceador_specifics.get("historico_politica", "descartar"),
+            )
+            self.escritor_historico.iniciar()
+        self.pronosticador: Optional[PronosticadorCarga] = None
+        if self.cfg_balanceador_specifics.get("pronostico_habilitado", False):
+            self.pronosticador = PronosticadorCarga(
+                horizonte_min=self.cfg_balanceador_specifics.get("pronostico_horizonte_min", 15),
+                constante_nivel_min=self.cfg_balanceador_specifics.get("pronostico_constante_nivel_min", 2),
+                constante_tendencia_min=self.cfg_balanceador_specifics.get("pronostico_constante_tendencia_min", 10),
+                minutos_franja=self.cfg_balanceador_specifics.get("pronostico_minutos_franja", 15),
+                dias_fin_de_mes=self.cfg_balanceador_specifics.get("pronostico_dias_fin_de_mes", 2),
+            )
+            logger.info(f"Pronóstico de carga activado con horizonte de {self.pronosticador.horizonte_min} minutos.")
         self._lock = threading.RLock()
         logger.info(
             f"Modo de aislamiento estricto de pools: {'Activado' if self.aislamiento_estricto_pool else 'Desactivado'}"
         )
 
-    def ejecutar_algoritmo_completo(self, carga_consolidada: Dict[int, int], pools_activos: List[Dict[str, Any]]):
+    def ejecutar_algoritmo_completo(
+        self,
+        carga_consolidada: Dict[int, int],
+        pools_activos: List[Dict[str, Any]],
+        pools_en_alcance: Optional[List[Optional[int]]] = None,
+        verificar_arrendamiento: Optional[Callable[[], Optional[CercoArrendamiento]]] = None,
+    ) -> PlanBalanceo:
         """
-        Orquesta todas las fases del algoritmo de balanceo.
+        Orquesta todas las fases del algoritmo de balanceo. Las fases solo construyen
+        el plan; al final se aplica en una única operación contra la base de datos.
+
+        Args: pools_en_alcance: Si se indica, solo se balancean estos pools (None es el Pool
+            General) y solo se limpian sus robots; el resto queda a cargo de otras instancias.
+            verificar_arrendamiento: Se invoca justo antes de aplicar el plan; lanza
+            ArrendamientoPerdidoError si la instancia ya no es dueña de esos pools, o retorna
+            el cerco que el procedimiento vuelve a verificar en la misma transacción.
         """
         with self._lock:
             estado_global = self._obtener_estado_inicial_global(carga_consolidada)
+            estado_global["demanda_por_robot"] = self._calcular_demanda(carga_consolidada)
+            if pools_en_alcance is not None:
+                estado_global["pools_en_alcance"] = set(pools_en_alcance)
+            plan = estado_global["plan"]
             self.ejecutar_limpieza_global(estado_global)
 
-            pool_ids = [p["PoolId"] for p in pools_activos]
-            if None not in pool_ids:
-                pool_ids.append(None)
+            if pools_en_alcance is not None:
+                pool_ids = list(pools_en_alcance)
+            else:
+                pool_ids = [p["PoolId"] for p in pools_activos]
+                if None not in pool_ids:
+                    pool_ids.append(None)
 
+            # Las fases solo trabajan sobre el estado en memoria (sin SQL): se ejecutan en serie.
             for pool_id in pool_ids:
                 self.ejecutar_balanceo_interno_de_pool(pool_id, estado_global)
 
             self.ejecutar_fase_de_desborde_global(estado_global)
 
+            plan.completar_mantenidas(estado_global["mapa_asignaciones_dinamicas"])
+            logger.info(f"Plan de balanceo calculado: {plan.resumen()}.")
+            try:
+                self._aplicar_plan(plan, estado_global, verificar_arrendamiento)
+            except Exception:
+                if self.estado_cache is not None:
+                    self.estado_cache.invalidar()
+                raise
+            return plan
+
+    def observar_carga(self, carga_consolidada: Dict[int, int]):
+        """Alimenta el pronóstico con una muestra de carga tomada fuera de un ciclo de balanceo."""
+        if self.pronosticador is not None:
+            self.pronosticador.observar(carga_consolidada)
+
+    def _calcular_demanda(self, carga_consolidada: Dict[int, int]) -> Dict[int, int]:
+        """
+        Tickets con los que se dimensiona cada robot: la carga actual o, con pronóstico,
+        la esperada dentro del horizonte configurado (nunca menor que la actual).
+        """
+        if self.pronosticador is None:
+            return carga_consolidada
+        self.pronosticador.observar(carga_consolidada)
+        demanda = self.pronosticador.pronosticar(carga_consolidada)
+        anticipados = {rid: d for rid, d in demanda.items() if d > carga_consolidada.get(rid, 0)}
+        if anticipados:
+            logger.info(f"Demanda anticipada por pronóstico para {len(anticipados)} robots: {anticipados}")
+        return demanda
+
+    def cerrar(self):
+        """Vuelca el histórico pendiente y detiene su hilo de escritura."""
+        if self.escritor_historico is not None:
+            self.escritor_historico.detener()
+
+    def _aplicar_plan(
+        self,
+        plan: PlanBalanceo,
+        estado_global: Dict[str, Any],
+        verificar_arrendamiento: Optional[Callable[[], Optional[CercoArrendamiento]]] = None,
+    ):
+        """
+        Aplica el plan con un único MERGE sobre dbo.Asignaciones (dbo.AplicarPlanBalanceo)
+        y, solo si tuvo éxito, registra las operaciones en el CoolingManager.
+
+        Con coordinación entre instancias, el procedimiento recibe el cerco (instancia y
+        arrendamientos) y rechaza el plan si ya no le pertenecen (migración 9).
+        """
+        if not plan.tiene_cambios:
+            logger.info("El plan de balanceo no tiene cambios que aplicar.")
+            return
+
+        cerco = verificar_arrendamiento() if verificar_arrendamiento is not None else None
+        if cerco is None:
+            query, params = "{CALL dbo.AplicarPlanBalanceo(?)}", (plan.a_filas_tvp(),)
+        else:
+            query = "{CALL dbo.AplicarPlanBalanceo(?, ?, ?)}"
+            params = (plan.a_filas_tvp(), cerco.instancia, ",".join(cerco.recursos))
+        try:
+            resultado = self.db_sam.ejecutar_consulta(query, params, es_select=True) or [{}]
+        except Exception as e:
+            if cerco is not None and "ArrendamientoPerdido" in str(e):
+                raise ArrendamientoPerdidoError(
+                    f"dbo.AplicarPlanBalanceo rechazó el plan de la instancia {cerco.instancia}: {e}"
+                ) from e
+            raise
+        logger.info(
+            f"Plan de balanceo aplicado: {resultado[0].get('Agregadas', 0)} asignaciones agregadas, "
+            f"{resultado[0].get('Quitadas', 0)} quitadas."
+        )
+        if self.estado_cache is not None:
+            self.estado_cache.aplicar_plan(plan)
+
+        carga = estado_global["carga_trabajo_por_robot"]
+        for robot_id in plan.robots_ampliados:
+            self.cooling_manager.registrar_ampliacion(
+                robot_id, carga.get(robot_id, 0), plan.cantidad_agregada(robot_id)
+            )
+        for robot_id in plan.robots_reducidos:
+            self.cooling_manager.registrar_reduccion(robot_id, carga.get(robot_id, 0), plan.cantidad_quitada(robot_id))
+        self.cooling_manager.volcar()
+        self._registrar_historico(plan, estado_global)
+
+    def _registrar_historico(self, plan: PlanBalanceo, estado_global: Dict[str, Any]):
+        """
+        Encola en el escritor de histórico una fila por cada decisión del plan ya aplicado,
+        con los equipos del robot antes y después de esa decisión.
+        """
+        if self.escritor_historico is None:
+            return
+        fecha = datetime.now().replace(microsecond=0)
+        carga = estado_global["carga_trabajo_por_robot"]
+        mapa_config = estado_global["mapa_config_robots"]
+        asignaciones = estado_global["mapa_asignaciones_dinamicas"]
+        equipos = {
+            rid: len(asignaciones.get(rid, [])) - plan.cantidad_agregada(rid) + plan.cantidad_quitada(rid)
+            for rid in plan.robots_ampliados | plan.robots_reducidos
+        }
+        # Mismo orden que el TVP: primero las quitas y luego las altas.
+        for decision, delta in [(d, -1) for d in plan.quitar] + [(d, 1) for d in plan.agregar]:
+            rid = decision.robot_id
+            antes = equipos[rid]
+            equipos[rid] = antes + delta
+            self.escritor_historico.registrar(
+                DecisionHistorica(
+                    fecha=fecha,
+                    robot_id=rid,
+                    pool_id=mapa_config.get(rid, {}).get("PoolId"),
+                    tickets_pendientes=carga.get(rid, 0),
+                    equipos_antes=antes,
+                    equipos_despues=antes + delta,
+                    accion=decision.motivo,
+                    justificacion=decision.justificacion or None,
+                )
+            )
+        self.escritor_historico.solicitar_volcado()
+
     def _obtener_estado_inicial_global(self, carga_consolidada: Dict[int, int]) -> Dict[str, Any]:
         """
         Recopila toda la información necesaria de la base de datos para tomar decisiones.
         """
         logger.info("Obteniendo estado inicial global del sistema...")
 
+        if self.estado_cache is not None:
+            estado = self.estado_cache.obtener_estado()
+            estado["carga_trabajo_por_robot"] = carga_consolidada
+            estado["plan"] = PlanBalanceo()
+            logger.info("Estado inicial global obtenido desde la caché.")
+            return estado
+
         robots_activos_query = "SELECT RobotId, Robot, EsOnline, MinEquipos, MaxEquipos, PrioridadBalanceo, TicketsPorEquipoAdicional, PoolId FROM dbo.Robots WHERE Activo = 1"
         mapa_config_robots = {
             r["RobotId"]: r for r in self.db_sam.ejecutar_consulta(robots_activos_query, es_select=True) or []
@@ -102,6 +287,7 @@ class Balanceo:
             "mapa_asignaciones_dinamicas": mapa_asignaciones_dinamicas,
             "equipos_con_asignacion_fija": equipos_con_asignacion_fija,
             "carga_trabajo_por_robot": carga_consolidada,
+            "plan": PlanBalanceo(),
         }
         logger.info("Estado inicial global obtenido.")
         return estado
@@ -114,9 +300,13 @@ class Balanceo:
         robots_a_limpiar = []
         mapa_config = estado_global["mapa_config_robots"]
 
+        pools_en_alcance = estado_global.get("pools_en_alcance")
         for robot_id, equipos_asignados in list(estado_global["mapa_asignaciones_dinamicas"].items()):
             config_robot = mapa_config.get(robot_id)
-            tiene_carga = estado_global["carga_trabajo_por_robot"].get(robot_id, 0) > 0
+            # Los robots sin configuración quedan a cargo de quien balancea el Pool General.
+            if pools_en_alcance is not None and (config_robot or {}).get("PoolId") not in pools_en_alcance:
+                continue
+            tiene_carga = self._demanda_de_robot(robot_id, estado_global) > 0
 
             if not config_robot or not config_robot.get("EsOnline") or not tiene_carga:
                 robots_a_limpiar.append(robot_id)
@@ -136,7 +326,7 @@ class Balanceo:
         robots_del_pool = {
             rid: rcfg
             for rid, rcfg in estado_global["mapa_config_robots"].items()
-            if rcfg.get("PoolId") == pool_id and rid in estado_global["carga_trabajo_por_robot"]
+            if rcfg.get("PoolId") == pool_id and self._es_candidato_con_carga(rid, estado_global)
         }
 
         if not robots_del_pool:
@@ -155,7 +345,7 @@ class Balanceo:
         necesidades = {}
         excedentes = {}
         for rid, rcfg in robots_del_pool.items():
-            tickets = estado_global["carga_trabajo_por_robot"].get(rid, 0)
+            tickets = self._demanda_de_robot(rid, estado_global)
             equipos_necesarios = self._calcular_equipos_necesarios_para_robot(rid, tickets, rcfg)
             equipos_actuales = len(estado_global["mapa_asignaciones_dinamicas"].get(rid, []))
 
@@ -165,20 +355,12 @@ class Balanceo:
             elif diferencia < 0:
                 excedentes[rid] = -diferencia
 
-        robots_por_prioridad = sorted(
-            necesidades.keys(), key=lambda r: estado_global["mapa_config_robots"][r].get("PrioridadBalanceo", 100)
-        )
-        for rid in robots_por_prioridad:
-            necesidad = necesidades[rid]
-            while necesidad > 0 and equipos_libres_del_pool:
-                equipo_a_asignar = equipos_libres_del_pool.pop(0)
-                if self._realizar_asignacion_db(rid, equipo_a_asignar, "ASIGNAR_DEMANDA_POOL", estado_global):
-                    necesidad -= 1
+        self._asignar_con_solver(necesidades, equipos_libres_del_pool, pool_id, "ASIGNAR_DEMANDA_POOL", estado_global)
 
         for rid, cantidad_a_quitar in excedentes.items():
             equipos_del_robot = estado_global["mapa_asignaciones_dinamicas"].get(rid, [])
-            for _ in range(min(cantidad_a_quitar, len(equipos_del_robot))):
-                equipo_a_quitar = equipos_del_robot.pop()
+            # _realizar_desasignacion_db quita el equipo del mapa solo si la desasignación procede.
+            for equipo_a_quitar in list(reversed(equipos_del_robot))[:cantidad_a_quitar]:
                 self._realizar_desasignacion_db(rid, equipo_a_quitar, "DESASIGNAR_EXCEDENTE_POOL", estado_global)
 
         logger.info(f"ETAPA DE BALANCEO INTERNO para {pool_nombre} completada.")
@@ -191,6 +373,9 @@ class Balanceo:
         if self.aislamiento_estricto_pool:
             logger.info("Aislamiento estricto activado, no se realizará desborde.")
             return
+        if None not in estado_global.get("pools_en_alcance", {None}):
+            logger.info("El Pool General lo balancea otra instancia, no se realizará desborde.")
+            return
 
         equipos_asignados_globalmente = {
             eq for subl in estado_global["mapa_asignaciones_dinamicas"].values() for eq in subl
@@ -207,26 +392,91 @@ class Balanceo:
 
         necesidades_globales = {}
         for rid, rcfg in estado_global["mapa_config_robots"].items():
-            if rid in estado_global["carga_trabajo_por_robot"]:
-                tickets = estado_global["carga_trabajo_por_robot"].get(rid, 0)
+            if self._es_candidato_con_carga(rid, estado_global):
+                tickets = self._demanda_de_robot(rid, estado_global)
                 equipos_necesarios = self._calcular_equipos_necesarios_para_robot(rid, tickets, rcfg)
                 equipos_actuales = len(estado_global["mapa_asignaciones_dinamicas"].get(rid, []))
                 diferencia = equipos_necesarios - equipos_actuales
                 if diferencia > 0:
                     necesidades_globales[rid] = diferencia
 
-        robots_por_prioridad = sorted(
-            necesidades_globales.keys(),
-            key=lambda r: estado_global["mapa_config_robots"][r].get("PrioridadBalanceo", 100),
+        self._asignar_con_solver(
+            necesidades_globales, equipos_libres_general, None, "ASIGNAR_DESBORDE_GLOBAL", estado_global
         )
-        for rid in robots_por_prioridad:
-            necesidad = necesidades_globales[rid]
-            while necesidad > 0 and equipos_libres_general:
-                equipo_a_asignar = equipos_libres_general.pop(0)
-                if self._realizar_asignacion_db(rid, equipo_a_asignar, "ASIGNAR_DESBORDE_GLOBAL", estado_global):
-                    necesidad -= 1
         logger.info("ETAPA DE DESBORDE Y DEMANDA ADICIONAL GLOBAL completada.")
 
+    def _asignar_con_solver(
+        self,
+        necesidades: Dict[int, int],
+        equipos_libres: List[int],
+        pool_id_equipos: Optional[int],
+        motivo: str,
+        estado_global: Dict[str, Any],
+    ):
+        """
+        Pasa al solver las necesidades de los robots que pueden ampliar y registra en el
+        plan las asignaciones que devuelve. Los robots en enfriamiento se excluyen antes
+        de resolver, para que no consuman equipos que otros robots podrían usar. Sin
+        ampliación completa por ciclo, cada robot pide como mucho un equipo.
+        """
+        plan = self._plan_del_ciclo(estado_global)
+        mapa_config = estado_global["mapa_config_robots"]
+        robots = []
+        for rid, necesidad in necesidades.items():
+            if not self._puede_ampliar_en_ciclo(rid, plan)[0]:
+                continue
+            rcfg = mapa_config[rid]
+            actuales = len(estado_global["mapa_asignaciones_dinamicas"].get(rid, []))
+            faltan_para_minimo = max(rcfg.get("MinEquipos", 1) - actuales, 0)
+            if not self.ampliacion_completa_por_ciclo:
+                necesidad = min(necesidad, 1)
+                faltan_para_minimo = min(faltan_para_minimo, 1)
+            robots.append(
+                RobotDemanda(
+                    robot_id=rid,
+                    pool_id=rcfg.get("PoolId"),
+                    prioridad=rcfg.get("PrioridadBalanceo", 100),
+                    necesidad=necesidad,
+                    faltan_para_minimo=faltan_para_minimo,
+                )
+            )
+        if not robots or not equipos_libres:
+            return
+
+        liberados = {d.equipo_id for d in plan.quitar}
+        equipos = [EquipoCandidato(eq, pool_id_equipos, eq in liberados) for eq in equipos_libres]
+        for rid, equipo_id in self.solver.resolver(robots, equipos):
+            self._realizar_asignacion_db(rid, equipo_id, motivo, estado_global)
+
+    @staticmethod
+    def _plan_del_ciclo(estado_global: Dict[str, Any]) -> PlanBalanceo:
+        plan = estado_global.get("plan")
+        if plan is None:
+            plan = estado_global["plan"] = PlanBalanceo()
+        return plan
+
+    def _puede_ampliar_en_ciclo(self, robot_id: int, plan: PlanBalanceo) -> Tuple[bool, str]:
+        # El enfriamiento se registra al aplicar el plan; dentro del ciclo, una ampliación ya
+        # planificada cuenta como reciente. Con ampliación completa por ciclo el enfriamiento
+        # se evalúa una sola vez y el robot puede recibir equipos hasta cubrir su necesidad.
+        if plan.amplio(robot_id):
+            if self.ampliacion_completa_por_ciclo:
+                return True, "Ampliación en curso en este ciclo"
+            return False, "En período de enfriamiento tras asignación en este ciclo"
+        return self.cooling_manager.puede_ampliar(robot_id)
+
+    @staticmethod
+    def _demanda_de_robot(robot_id: int, estado_global: Dict[str, Any]) -> int:
+        demanda = estado_global.get("demanda_por_robot", estado_global["carga_trabajo_por_robot"])
+        return demanda.get(robot_id, 0)
+
+    @classmethod
+    def _es_candidato_con_carga(cls, robot_id: int, estado_global: Dict[str, Any]) -> bool:
+        """Robots con tickets pendientes o con demanda pronosticada aunque su cola esté vacía."""
+        return (
+            robot_id in estado_global["carga_trabajo_por_robot"] or cls._demanda_de_robot(robot_id, estado_global) > 0
+        )
+
     def _calcular_equipos_necesarios_para_robot(self, robot_id: int, tickets: int, config: Dict) -> int:
         if tickets <= 0:
             return config.get("MinEquipos", 1) if config.get("EsOnline") else 0
@@ -248,43 +498,40 @@ class Balanceo:
     def _realizar_asignacion_db(
         self, robot_id: int, equipo_id: int, motivo: str, estado_global: Dict[str, Any]
     ) -> bool:
-        puede_asignar, justificacion = self.cooling_manager.puede_ampliar(robot_id)
+        """Registra la asignación en el plan del ciclo y actualiza el estado en memoria."""
+        plan = self._plan_del_ciclo(estado_global)
+        # El enfriamiento se registra en el CoolingManager al aplicar el plan.
+        puede_asignar, justificacion = self._puede_ampliar_en_ciclo(robot_id, plan)
         if not puede_asignar:
             logger.debug(f"Asignación omitida por CoolingManager para RobotId {robot_id}. Just: {justificacion}")
             return False
-        query = "INSERT INTO dbo.Asignaciones (RobotId, EquipoId, EsProgramado, Reservado, AsignadoPor) VALUES (?, ?, 0, 0, ?)"
-        try:
-            self.db_sam.ejecutar_consulta(query, (robot_id, equipo_id, motivo), es_select=False)
-            estado_global["mapa_asignaciones_dinamicas"].setdefault(robot_id, []).append(equipo_id)
-            self.cooling_manager.registrar_ampliacion(
-                robot_id, estado_global["carga_trabajo_por_robot"].get(robot_id, 0), 1
-            )
-            return True
-        except Exception as e:
-            logger.error(f"Error al asignar RobotId {robot_id} a EquipoId {equipo_id}: {e}")
-            return False
+
+        tickets = estado_global["carga_trabajo_por_robot"].get(robot_id, 0)
+        equipos_antes = len(estado_global["mapa_asignaciones_dinamicas"].get(robot_id, []))
+        plan.registrar_asignacion(robot_id, equipo_id, motivo, f"Tickets: {tickets}, equipos antes: {equipos_antes}")
+        estado_global["mapa_asignaciones_dinamicas"].setdefault(robot_id, []).append(equipo_id)
+        return True
 
     def _realizar_desasignacion_db(
         self, robot_id: int, equipo_id: int, motivo: str, estado_global: Dict[str, Any]
     ) -> bool:
-        puede_desasignar, justificacion = self.cooling_manager.puede_reducir(
-            robot_id, estado_global["carga_trabajo_por_robot"].get(robot_id, 0)
-        )
+        """Registra la desasignación en el plan del ciclo y actualiza el estado en memoria."""
+        plan = self._plan_del_ciclo(estado_global)
+        tickets = estado_global["carga_trabajo_por_robot"].get(robot_id, 0)
+        if plan.redujo(robot_id):
+            puede_desasignar, justificacion = False, "En período de enfriamiento tras desasignación en este ciclo"
+        else:
+            puede_desasignar, justificacion = self.cooling_manager.puede_reducir(robot_id, tickets)
         if not puede_desasignar:
             logger.info(f"Desasignación omitida por CoolingManager para RobotId {robot_id}. Just: {justificacion}")
+            plan.registrar_desasignacion_bloqueada(robot_id, equipo_id, justificacion)
             return False
-        query = "DELETE FROM dbo.Asignaciones WHERE RobotId = ? AND EquipoId = ? AND (EsProgramado = 0 OR EsProgramado IS NULL) AND (Reservado = 0 OR Reservado IS NULL)"
-        try:
-            self.db_sam.ejecutar_consulta(query, (robot_id, equipo_id), es_select=False)
-            if (
-                robot_id in estado_global["mapa_asignaciones_dinamicas"]
-                and equipo_id in estado_global["mapa_asignaciones_dinamicas"][robot_id]
-            ):
-                estado_global["mapa_asignaciones_dinamicas"][robot_id].remove(equipo_id)
-            self.cooling_manager.registrar_reduccion(
-                robot_id, estado_global["carga_trabajo_por_robot"].get(robot_id, 0), 1
-            )
-            return True
-        except Exception as e:
-            logger.error(f"Error al desasignar RobotId {robot_id} de EquipoId {equipo_id}: {e}")
-            return False
+
+        equipos_antes = len(estado_global["mapa_asignaciones_dinamicas"].get(robot_id, []))
+        plan.registrar_desasignacion(robot_id, equipo_id, motivo, f"Tickets: {tickets}, equipos antes: {equipos_antes}")
+        if (
+            robot_id in estado_global["mapa_asignaciones_dinamicas"]
+            and equipo_id in estado_global["mapa_asignaciones_dinamicas"][robot_id]
+        ):
+            estado_global["mapa_asignaciones_dinamicas"][robot_id].remove(equipo_id)
+        return True
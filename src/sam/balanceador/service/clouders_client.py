@@ -2,6 +2,7 @@
 import logging
 from typing import Any, Dict, List
 
+import httpx
 import requests
 import urllib3
 
@@ -36,43 +37,62 @@ class CloudersClient:
         if not self.verify_ssl:
             logger.warning("La verificación SSL está deshabilitada. No recomendado para producción.")
 
+        self.endpoint = f"{self.base_url}/automatizacion/task/api/stats/pending_by_robot"
+        self.headers = {"Accept": "application/json", "Authorization": self.auth_header}
+        # Conexiones reutilizadas entre ciclos, en lugar de una conexión nueva por consulta.
+        self._session = requests.Session()
+        self._client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=self.timeout,
+            verify=self.verify_ssl,
+            limits=httpx.Limits(max_connections=4, max_keepalive_connections=2),
+        )
+
     def obtener_tickets_pendientes(self) -> List[Dict[str, Any]]:
         """
         Obtiene la cantidad de tickets pendientes por robot desde la API de Clouders.
         """
-        endpoint = f"{self.base_url}/automatizacion/task/api/stats/pending_by_robot"
-        headers = {"Accept": "application/json", "Authorization": self.auth_header}
-
         try:
-            logger.debug(f"Consultando tickets pendientes en: {endpoint}")
-            response = requests.get(
-                endpoint,
-                headers=headers,
-                timeout=self.timeout,
-                verify=self.verify_ssl,
+            logger.debug(f"Consultando tickets pendientes en: {self.endpoint}")
+            response = self._session.get(
+                self.endpoint, headers=self.headers, timeout=self.timeout, verify=self.verify_ssl
             )
             response.raise_for_status()
-
-            data = response.json()
-            resultados = []
-
-            for item in data:
-                for robot_name, cantidad in item.items():
-                    resultado = {
-                        "robot_name": robot_name,
-                        "CantidadTickets": cantidad,
-                    }
-                    # Aplicar mapeo de robots si existe
-                    robot_sam = self.mapa_robots.get(robot_name)
-                    if robot_sam:
-                        resultado["robot_name_sam"] = robot_sam
-                        logger.debug(f"Robot mapeado: {robot_name} → {robot_sam}")
-                    resultados.append(resultado)
-
-            logger.info(f"Obtenidos {len(resultados)} robots con tickets pendientes desde Clouders.")
-            return resultados
+            return self._procesar_respuesta(response.json())
 
         except requests.exceptions.RequestException as e:
             logger.error(f"Error al obtener tickets pendientes de Clouders: {e}", exc_info=True)
             # Devolver una lista vacía en caso de error para no detener el ciclo de balanceo
             return []
+
+    async def obtener_tickets_pendientes_async(self) -> List[Dict[str, Any]]:
+        """
+        Versión asíncrona sobre el cliente httpx compartido. A diferencia de la versión
+        síncrona propaga los errores, para que quien llama distinga "sin tickets" de "sin respuesta".
+        """
+        logger.debug(f"Consultando tickets pendientes en: {self.endpoint}")
+        response = await self._client.get(self.endpoint)
+        response.raise_for_status()
+        return self._procesar_respuesta(response.json())
+
+    def _procesar_respuesta(self, data: List[Dict[str, int]]) -> List[Dict[str, Any]]:
+        resultados = []
+        for item in data:
+            for robot_name, cantidad in item.items():
+                resultado = {
+                    "robot_name": robot_name,
+                    "CantidadTickets": cantidad,
+                }
+                # Aplicar mapeo de robots si existe
+                robot_sam = self.mapa_robots.get(robot_name)
+                if robot_sam:
+                    resultado["robot_name_sam"] = robot_sam
+                    logger.debug(f"Robot mapeado: {robot_name} → {robot_sam}")
+                resultados.append(resultado)
+
+        logger.debug(f"Obtenidos {len(resultados)} robots con tickets pendientes desde Clouders.")
+        return resultados
+
+    async def close(self):
+        await self._client.aclose()
+        self._session.close()
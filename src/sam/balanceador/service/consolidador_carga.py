@@ -0,0 +1,115 @@
+# SAM/src/sam/balanceador/service/consolidador_carga.py
+
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .proveedores import CargaProveedorBase
+
+logger = logging.getLogger(__name__)
+
+
+class ConsolidadorCarga:
+    """
+    Consulta todos los proveedores de carga a la vez, cada uno con su propio plazo,
+    y suma sus resultados.
+
+    Si un proveedor no responde a tiempo o falla, se usa su último resultado bueno
+    mientras no supere `max_antiguedad_seg`. La consulta que venció el plazo no se
+    cancela: sigue en curso y, si termina, su resultado queda disponible para el
+    próximo ciclo, sin lanzar otra consulta al mismo origen mientras tanto.
+    """
+
+    def __init__(
+        self,
+        proveedores: List[CargaProveedorBase],
+        timeout_seg: float = 20.0,
+        timeouts_por_proveedor: Optional[Dict[str, float]] = None,
+        max_antiguedad_seg: float = 600.0,
+    ):
+        """
+        Args:
+            proveedores: Proveedores de carga activos.
+            timeout_seg: Plazo por defecto de cada proveedor en un ciclo.
+            timeouts_por_proveedor: Plazos específicos por nombre de proveedor.
+            max_antiguedad_seg: Antigüedad máxima del último resultado bueno para reutilizarlo.
+        """
+        self.proveedores = proveedores
+        self.timeout_seg = timeout_seg
+        self.timeouts_por_proveedor = timeouts_por_proveedor or {}
+        self.max_antiguedad_seg = max_antiguedad_seg
+        self._ultimo_bueno: Dict[str, Tuple[float, Dict[int, int]]] = {}
+        self._en_curso: Dict[str, asyncio.Task] = {}
+
+    async def obtener_carga(self) -> Dict[int, int]:
+        """Retorna la carga consolidada. Nunca espera más que el mayor de los plazos."""
+        if not self.proveedores:
+            logger.warning("No hay proveedores de carga configurados.")
+            return {}
+
+        resultados = await asyncio.gather(*(self._obtener_de_proveedor(p) for p in self.proveedores))
+
+        carga_total: Dict[int, int] = {}
+        for carga_proveedor in resultados:
+            for robot_id, tickets in (carga_proveedor or {}).items():
+                carga_total[robot_id] = carga_total.get(robot_id, 0) + tickets
+
+        logger.debug(f"Carga consolidada final: {len(carga_total)} robots con demanda.")
+        return carga_total
+
+    async def _obtener_de_proveedor(self, proveedor: CargaProveedorBase) -> Optional[Dict[int, int]]:
+        nombre = proveedor.get_nombre()
+        tarea = self._en_curso.get(nombre)
+        if tarea is None or tarea.done():
+            tarea = asyncio.ensure_future(self._refrescar(proveedor))
+            tarea.add_done_callback(self._descartar_excepcion)
+            self._en_curso[nombre] = tarea
+
+        timeout = self.timeouts_por_proveedor.get(nombre, self.timeout_seg)
+        try:
+            carga = await asyncio.wait_for(asyncio.shield(tarea), timeout=timeout)
+            logger.debug(f"Proveedor '{nombre}' retornó {len(carga)} robots con carga.")
+            return carga
+        except asyncio.TimeoutError:
+            logger.warning(f"Proveedor '{nombre}' no respondió en {timeout}s. La consulta sigue en segundo plano.")
+        except Exception as e:
+            logger.error(f"Error al obtener carga del proveedor '{nombre}': {e}", exc_info=True)
+        return self._ultimo_resultado_vigente(nombre)
+
+    async def _refrescar(self, proveedor: CargaProveedorBase) -> Dict[int, int]:
+        carga = await proveedor.obtener_carga_async()
+        self._ultimo_bueno[proveedor.get_nombre()] = (time.monotonic(), carga)
+        return carga
+
+    @staticmethod
+    def _descartar_excepcion(tarea: asyncio.Task) -> None:
+        # Una consulta que vence el plazo y luego falla ya no tiene quien la espere.
+        if not tarea.cancelled():
+            tarea.exception()
+
+    def _ultimo_resultado_vigente(self, nombre: str) -> Optional[Dict[int, int]]:
+        if nombre not in self._ultimo_bueno:
+            logger.error(f"Proveedor '{nombre}' sin resultado previo. Su carga no se considera en este ciclo.")
+            return None
+        momento, carga = self._ultimo_bueno[nombre]
+        antiguedad = time.monotonic() - momento
+        if antiguedad > self.max_antiguedad_seg:
+            logger.error(
+                f"El último resultado del proveedor '{nombre}' tiene {antiguedad:.0f}s "
+                f"(máximo {self.max_antiguedad_seg:.0f}s). Su carga no se considera en este ciclo."
+            )
+            return None
+        logger.warning(f"Se usa el último resultado del proveedor '{nombre}', de hace {antiguedad:.0f}s.")
+        return carga
+
+    async def close(self):
+        """Cancela las consultas en curso y cierra los proveedores."""
+        for tarea in self._en_curso.values():
+            if not tarea.done():
+                tarea.cancel()
+        for proveedor in self.proveedores:
+            try:
+                await proveedor.close()
+            except Exception as e:
+                logger.warning(f"Error al cerrar el proveedor '{proveedor.get_nombre()}': {e}")
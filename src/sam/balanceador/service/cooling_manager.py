@@ -3,7 +3,9 @@
 import logging
 import time
 from threading import RLock
-from typing import Dict, Tuple
+from typing import Callable, Dict, Optional, Tuple
+
+from .estado_enfriamiento import BackendEnfriamiento, BackendEnfriamientoMemoria, RegistroEnfriamiento
 
 logger = logging.getLogger(__name__)
 
@@ -16,30 +18,81 @@ class CoolingManager:
     y previene cambios frecuentes en la misma dirección para un mismo robot.
     """
 
-    def __init__(self, cooling_period_seconds: int = 300):
+    def __init__(
+        self,
+        cooling_period_seconds: int = 300,
+        reloj: Callable[[], float] = time.time,
+        backend: Optional[BackendEnfriamiento] = None,
+    ):
         """
         Inicializa el gestor de enfriamiento.
 
         Args:
             cooling_period_seconds: Período de enfriamiento en segundos (default: 5 minutos)
+            reloj: Fuente de la hora actual en segundos. El simulador inyecta un reloj simulado.
+            backend: Dónde persistir las operaciones para que sobrevivan a reinicios y se
+                compartan entre instancias. Por defecto solo en memoria.
         """
         self.cooling_period = cooling_period_seconds
+        self._reloj = reloj
         self._lock = RLock()
+        self.backend = backend or BackendEnfriamientoMemoria()
 
         # Mapas para registrar las últimas operaciones
         # {robot_id: (timestamp, operación, cantidad)}
         self._ultima_ampliacion: Dict[int, Tuple[float, str, int]] = {}
         self._ultima_reduccion: Dict[int, Tuple[float, str, int]] = {}
+        # Operaciones registradas y todavía no escritas en el backend: {(robot_id, operación): registro}
+        self._pendientes: Dict[Tuple[int, str], RegistroEnfriamiento] = {}
 
         # Umbrales para considerar un cambio significativo
         self.umbral_de_ampliacion = 0.3  # 30% más tickets justifica escalar
         self.umbral_de_reduccion = 0.4  # 40% menos tickets justifica desescalar
 
+        self.recargar()
+
+    def recargar(self) -> None:
+        """Carga en bloque desde el backend las operaciones todavía dentro del período de enfriamiento."""
+        try:
+            registros = self.backend.cargar(desde=self._reloj() - self.cooling_period)
+        except Exception as e:
+            logger.error(f"No se pudo cargar el estado de enfriamiento ({self.backend.nombre}). Se inicia vacío: {e}", exc_info=True)
+            return
+        with self._lock:
+            for registro in registros:
+                mapa = self._ultima_ampliacion if registro.operacion == "ASIGNAR" else self._ultima_reduccion
+                actual = mapa.get(registro.robot_id)
+                if actual is None or actual[0] < registro.marca:
+                    mapa[registro.robot_id] = (registro.marca, registro.operacion, registro.tickets)
+        if registros:
+            logger.info(f"Estado de enfriamiento cargado ({self.backend.nombre}): {len(registros)} operaciones vigentes.")
+
+    def volcar(self) -> None:
+        """
+        Escribe en un solo lote las operaciones registradas desde el último volcado y
+        descarta, en memoria y en el backend, las que ya salieron del período de enfriamiento.
+        Si el backend falla, las operaciones quedan pendientes para el próximo volcado.
+        """
+        with self._lock:
+            vencidas_antes_de = self._reloj() - self.cooling_period
+            for mapa in (self._ultima_ampliacion, self._ultima_reduccion):
+                for robot_id in [rid for rid, (marca, _, _) in mapa.items() if marca < vencidas_antes_de]:
+                    del mapa[robot_id]
+            pendientes = list(self._pendientes.values())
+            self._pendientes.clear()
+        try:
+            self.backend.guardar(pendientes, vencidos_antes_de=vencidas_antes_de)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar el estado de enfriamiento ({self.backend.nombre}). Se reintentará: {e}")
+            with self._lock:
+                for registro in pendientes:
+                    self._pendientes.setdefault((registro.robot_id, registro.operacion), registro)
+
     def puede_ampliar(self, robot_id: int) -> Tuple[bool, str]:
         with self._lock:
             if robot_id in self._ultima_ampliacion:
                 last_time, _, _ = self._ultima_ampliacion[robot_id]
-                time_elapsed = time.time() - last_time
+                time_elapsed = self._reloj() - last_time
                 if time_elapsed < self.cooling_period:
                     return False, f"En período de enfriamiento tras asignación reciente ({int(time_elapsed)}s < {self.cooling_period}s)"
             return True, "Fuera de período de enfriamiento"
@@ -51,7 +104,7 @@ class CoolingManager:
         with self._lock:
             if robot_id in self._ultima_reduccion:
                 last_time, _, tickets_anteriores = self._ultima_reduccion[robot_id]
-                time_elapsed = time.time() - last_time
+                time_elapsed = self._reloj() - last_time
 
                 if time_elapsed < self.cooling_period:
                     # Comprobar si la caída de tickets es drástica
@@ -73,7 +126,9 @@ class CoolingManager:
             equipos_asignados: Cantidad de equipos asignados
         """
         with self._lock:
-            self._ultima_ampliacion[robot_id] = (time.time(), "ASIGNAR", tickets)
+            marca = self._reloj()
+            self._ultima_ampliacion[robot_id] = (marca, "ASIGNAR", tickets)
+            self._pendientes[(robot_id, "ASIGNAR")] = RegistroEnfriamiento(robot_id, "ASIGNAR", marca, tickets)
             logger.debug(f"Registrada operación de ampliación para RobotId {robot_id}: {tickets} tickets, {equipos_asignados} equipos")
 
     def registrar_reduccion(self, robot_id: int, tickets: int, equipos_desasignados: int) -> None:
@@ -85,5 +140,7 @@ class CoolingManager:
             equipos_desasignados: Cantidad de equipos desasignados
         """
         with self._lock:
-            self._ultima_reduccion[robot_id] = (time.time(), "DESASIGNAR", tickets)
+            marca = self._reloj()
+            self._ultima_reduccion[robot_id] = (marca, "DESASIGNAR", tickets)
+            self._pendientes[(robot_id, "DESASIGNAR")] = RegistroEnfriamiento(robot_id, "DESASIGNAR", marca, tickets)
             logger.debug(f"Registrada operación de reducción para RobotId {robot_id}: {tickets} tickets, {equipos_desasignados} equipos")
@@ -0,0 +1,326 @@
+# SAM/src/sam/balanceador/service/coordinacion.py
+
+import bisect
+import hashlib
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sam.common.database import DatabaseConnector
+
+logger = logging.getLogger(__name__)
+
+
+class ArrendamientoPerdidoError(Exception):
+    """Se lanza cuando la instancia ya no puede garantizar que conserva los arrendamientos del ciclo."""
+
+
+class CercoArrendamiento(NamedTuple):
+    """Instancia y arrendamientos que dbo.AplicarPlanBalanceo verifica antes de aplicar el plan."""
+
+    instancia: str
+    recursos: List[str]
+
+
+class AlmacenArrendamientos(ABC):
+    """
+    Arrendamientos (leases) con vencimiento: un recurso pertenece a una instancia hasta
+    que lo libera o deja de renovarlo. Adquirir un recurso propio lo renueva.
+    """
+
+    @abstractmethod
+    def adquirir(self, recurso: str, instancia: str, ttl_seg: float) -> bool:
+        """Adquiere o renueva el recurso si está libre, vencido o ya es de `instancia`."""
+
+    @abstractmethod
+    def liberar(self, recursos: Iterable[str], instancia: str) -> None:
+        """Libera los recursos que pertenecen a `instancia`."""
+
+    @abstractmethod
+    def listar(self, prefijo: str) -> Dict[str, str]:
+        """Retorna {recurso: instancia} de los arrendamientos vigentes cuyo nombre empieza por `prefijo`."""
+
+
+class AlmacenArrendamientosMemoria(AlmacenArrendamientos):
+    """Arrendamientos en memoria del proceso, para tests y para simular varias instancias en uno solo."""
+
+    def __init__(self, reloj: Callable[[], float] = time.monotonic):
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        self._arrendamientos: Dict[str, Tuple[str, float]] = {}
+
+    def adquirir(self, recurso: str, instancia: str, ttl_seg: float) -> bool:
+        with self._lock:
+            ahora = self._reloj()
+            actual = self._arrendamientos.get(recurso)
+            if actual is not None and actual[0] != instancia and actual[1] > ahora:
+                return False
+            self._arrendamientos[recurso] = (instancia, ahora + ttl_seg)
+            return True
+
+    def liberar(self, recursos: Iterable[str], instancia: str) -> None:
+        with self._lock:
+            for recurso in recursos:
+                if self._arrendamientos.get(recurso, ("", 0))[0] == instancia:
+                    del self._arrendamientos[recurso]
+
+    def listar(self, prefijo: str) -> Dict[str, str]:
+        with self._lock:
+            ahora = self._reloj()
+            return {
+                recurso: instancia
+                for recurso, (instancia, vence) in self._arrendamientos.items()
+                if recurso.startswith(prefijo) and vence > ahora
+            }
+
+
+class AlmacenArrendamientosSql(AlmacenArrendamientos):
+    """
+    Tabla dbo.ArrendamientosBalanceador (migración 7). Los vencimientos se calculan con el
+    reloj de SQL Server, así el desfase entre los relojes de las instancias no importa.
+
+    Se usa una tabla y no sp_getapplock porque los bloqueos de aplicación viven en la
+    sesión, y el DatabaseConnector reparte las consultas entre conexiones de un pool.
+    """
+
+    def __init__(self, db_connector: DatabaseConnector):
+        self.db = db_connector
+
+    def adquirir(self, recurso: str, instancia: str, ttl_seg: float) -> bool:
+        query = """
+            MERGE dbo.ArrendamientosBalanceador WITH (HOLDLOCK) AS T
+            USING (SELECT ? AS Recurso, ? AS Instancia, ? AS TtlMs) AS S
+                ON T.Recurso = S.Recurso
+            WHEN MATCHED AND (T.Instancia = S.Instancia OR T.VenceEn < SYSUTCDATETIME()) THEN
+                UPDATE SET Instancia = S.Instancia, VenceEn = DATEADD(MILLISECOND, S.TtlMs, SYSUTCDATETIME())
+            WHEN NOT MATCHED THEN
+                INSERT (Recurso, Instancia, VenceEn)
+                VALUES (S.Recurso, S.Instancia, DATEADD(MILLISECOND, S.TtlMs, SYSUTCDATETIME()));
+        """
+        filas = self.db.ejecutar_consulta(query, (recurso, instancia, int(ttl_seg * 1000)), es_select=False)
+        return bool(filas)
+
+    def liberar(self, recursos: Iterable[str], instancia: str) -> None:
+        parametros = [(recurso, instancia) for recurso in recursos]
+        if parametros:
+            self.db.ejecutar_consulta_multiple(
+                "DELETE FROM dbo.ArrendamientosBalanceador WHERE Recurso = ? AND Instancia = ?;", parametros
+            )
+
+    def listar(self, prefijo: str) -> Dict[str, str]:
+        query = """
+            SELECT Recurso, Instancia FROM dbo.ArrendamientosBalanceador
+            WHERE Recurso LIKE ? AND VenceEn > SYSUTCDATETIME();
+        """
+        filas = self.db.ejecutar_consulta(query, (prefijo + "%",), es_select=True) or []
+        return {f["Recurso"]: f["Instancia"] for f in filas}
+
+
+class AnilloConsistente:
+    """Hashing consistente con nodos virtuales: al entrar o salir una instancia solo se mueve su parte de las claves."""
+
+    def __init__(self, miembros: Iterable[str], nodos_virtuales: int = 64):
+        self._anillo: List[Tuple[int, str]] = sorted(
+            (self._hash(f"{miembro}#{i}"), miembro) for miembro in set(miembros) for i in range(nodos_virtuales)
+        )
+        self._hashes = [h for h, _ in self._anillo]
+
+    @staticmethod
+    def _hash(valor: str) -> int:
+        return int.from_bytes(hashlib.md5(valor.encode("utf-8")).digest()[:8], "big")
+
+    def duenio(self, clave: str) -> Optional[str]:
+        if not self._anillo:
+            return None
+        posicion = bisect.bisect(self._hashes, self._hash(clave)) % len(self._anillo)
+        return self._anillo[posicion][1]
+
+
+class CoordinadorBalanceador:
+    """
+    Coordina varias instancias del balanceador sobre un AlmacenArrendamientos.
+
+    Modos:
+      - "ninguna": una sola instancia; balancea todos los pools.
+      - "lider": activo/pasivo. Solo la instancia que tiene el arrendamiento del líder
+        balancea; si deja de renovarlo, otra lo toma al vencer.
+      - "particionado": cada instancia renueva su membresía, reparte los pools entre los
+        miembros vivos con un anillo consistente sobre PoolId y balancea solo los pools
+        cuyo arrendamiento individual obtuvo. El arrendamiento por pool garantiza la
+        exclusión mientras los miembros todavía no coinciden en la vista del anillo.
+
+    Localmente, los arrendamientos se dan por perdidos cuando la última renovación exitosa
+    tiene más de `ttl_seg - margen_seg` (reloj monótono, medido desde antes de renovar):
+    una instancia que no logra renovar deja de balancear antes de que otra pueda tomarlos.
+    """
+
+    MODOS = ("ninguna", "lider", "particionado")
+    RECURSO_LIDER = "balanceador:lider"
+    PREFIJO_MIEMBRO = "balanceador:miembro:"
+    PREFIJO_POOL = "balanceador:pool:"
+
+    def __init__(
+        self,
+        almacen: Optional[AlmacenArrendamientos],
+        instancia: str,
+        modo: str = "ninguna",
+        ttl_seg: float = 60,
+        margen_seg: Optional[float] = None,
+        reloj: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            margen_seg: Antelación con la que se dan por perdidos los arrendamientos no
+                renovados (por defecto, un cuarto de `ttl_seg`).
+            reloj: Reloj monótono local; se inyecta en los tests.
+        """
+        if modo not in self.MODOS:
+            raise ValueError(f"Modo de coordinación '{modo}' inválido. Opciones: {', '.join(self.MODOS)}.")
+        if modo != "ninguna" and almacen is None:
+            raise ValueError(f"El modo de coordinación '{modo}' requiere un almacén de arrendamientos.")
+        self.almacen = almacen
+        self.instancia = instancia
+        self.modo = modo
+        self.ttl_seg = ttl_seg
+        self.margen_seg = ttl_seg / 4 if margen_seg is None else margen_seg
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        self._es_lider = modo == "ninguna"
+        self._pools_propios: Set[Optional[int]] = set()
+        self._ultima_renovacion: Optional[float] = None
+
+    @staticmethod
+    def _clave_pool(pool_id: Optional[int]) -> str:
+        return "general" if pool_id is None else str(pool_id)
+
+    def actualizar(self, pool_ids: Iterable[Optional[int]] = ()) -> bool:
+        """
+        Renueva los arrendamientos de la instancia. Debe llamarse bastante más seguido que `ttl_seg`.
+
+        Args: pool_ids: Pools activos; solo se usan en modo particionado.
+
+        Returns: bool: True si la instancia acaba de tomar trabajo que antes no tenía (conviene recargar estado).
+        """
+        if self.modo == "ninguna":
+            return False
+        with self._lock:
+            # Se toma antes de renovar: el almacén calcula el vencimiento después de este instante.
+            inicio = self._reloj()
+            try:
+                if self.modo == "lider":
+                    tomo_trabajo = self._actualizar_lider()
+                else:
+                    tomo_trabajo = self._actualizar_particiones(list(pool_ids))
+                self._ultima_renovacion = inicio
+                return tomo_trabajo
+            except Exception as e:
+                # Sin poder renovar no hay garantía de exclusión: la instancia pasa a pasiva.
+                logger.error(
+                    f"Error al renovar los arrendamientos de la instancia {self.instancia}: {e}", exc_info=True
+                )
+                self._es_lider = False
+                self._pools_propios = set()
+                return False
+
+    def _actualizar_lider(self) -> bool:
+        era_lider = self._es_lider and self._vigente()
+        self._es_lider = self.almacen.adquirir(self.RECURSO_LIDER, self.instancia, self.ttl_seg)
+        if self._es_lider != era_lider:
+            logger.info(
+                f"Instancia {self.instancia}: {'es ahora la líder' if self._es_lider else 'dejó de ser líder'}."
+            )
+        return self._es_lider and not era_lider
+
+    def _actualizar_particiones(self, pool_ids: List[Optional[int]]) -> bool:
+        self.almacen.adquirir(self.PREFIJO_MIEMBRO + self.instancia, self.instancia, self.ttl_seg)
+        miembros = set(self.almacen.listar(self.PREFIJO_MIEMBRO).values()) | {self.instancia}
+        anillo = AnilloConsistente(miembros)
+
+        candidatos = {pid for pid in pool_ids if anillo.duenio(self._clave_pool(pid)) == self.instancia}
+        # Los pools que el anillo asignó a otra instancia se sueltan para que pueda tomarlos.
+        soltar = self._pools_propios - candidatos
+        self.almacen.liberar([self.PREFIJO_POOL + self._clave_pool(pid) for pid in soltar], self.instancia)
+
+        propios = {
+            pid
+            for pid in candidatos
+            if self.almacen.adquirir(self.PREFIJO_POOL + self._clave_pool(pid), self.instancia, self.ttl_seg)
+        }
+        nuevos = propios - (self._pools_propios if self._vigente() else set())
+        if nuevos or soltar:
+            logger.info(
+                f"Instancia {self.instancia} ({len(miembros)} miembros): balancea los pools "
+                f"{sorted(self._clave_pool(p) for p in propios)}."
+            )
+        self._pools_propios = propios
+        return bool(nuevos)
+
+    def pools_a_balancear(self, pool_ids: Iterable[Optional[int]]) -> List[Optional[int]]:
+        """Filtra los pools que esta instancia debe balancear en el ciclo actual."""
+        pool_ids = list(pool_ids)
+        with self._lock:
+            if self.modo != "ninguna" and not self._vigente():
+                return []
+            if self.modo == "particionado":
+                return [pid for pid in pool_ids if pid in self._pools_propios]
+            return pool_ids if self._es_lider else []
+
+    def tiene_trabajo(self) -> bool:
+        """False si la instancia está pasiva: no es la líder o no tiene pools propios."""
+        if self.modo == "ninguna":
+            return True
+        with self._lock:
+            if not self._vigente():
+                return False
+            return bool(self._pools_propios) if self.modo == "particionado" else self._es_lider
+
+    def verificar_vigencia(self, pool_ids: Iterable[Optional[int]]) -> Optional[CercoArrendamiento]:
+        """
+        Confirma, justo antes de aplicar un plan, que la instancia conserva los arrendamientos
+        de los pools balanceados y retorna el cerco que verifica dbo.AplicarPlanBalanceo.
+
+        Returns: None sin coordinación.
+
+        Raises: ArrendamientoPerdidoError: si venció el plazo local o ya no le pertenecen.
+        """
+        if self.modo == "ninguna":
+            return None
+        pool_ids = list(pool_ids)
+        with self._lock:
+            if not self._vigente():
+                raise ArrendamientoPerdidoError(
+                    f"La instancia {self.instancia} no renovó sus arrendamientos en los últimos "
+                    f"{self.ttl_seg - self.margen_seg:.0f}s."
+                )
+            if self.modo == "lider":
+                if not self._es_lider:
+                    raise ArrendamientoPerdidoError(f"La instancia {self.instancia} ya no es la líder.")
+                return CercoArrendamiento(self.instancia, [self.RECURSO_LIDER])
+            ajenos = [pid for pid in pool_ids if pid not in self._pools_propios]
+            if ajenos:
+                raise ArrendamientoPerdidoError(
+                    f"La instancia {self.instancia} ya no tiene los pools {sorted(self._clave_pool(p) for p in ajenos)}."
+                )
+            return CercoArrendamiento(self.instancia, [self.PREFIJO_POOL + self._clave_pool(pid) for pid in pool_ids])
+
+    def _vigente(self) -> bool:
+        """True si la última renovación exitosa es más reciente que `ttl_seg - margen_seg`."""
+        if self._ultima_renovacion is None:
+            return False
+        return self._reloj() - self._ultima_renovacion < self.ttl_seg - self.margen_seg
+
+    def liberar_todo(self) -> None:
+        """Suelta todos los arrendamientos para que otra instancia tome el trabajo sin esperar el vencimiento."""
+        if self.modo == "ninguna":
+            return
+        with self._lock:
+            recursos = [self.RECURSO_LIDER, self.PREFIJO_MIEMBRO + self.instancia]
+            recursos += [self.PREFIJO_POOL + self._clave_pool(pid) for pid in self._pools_propios]
+            try:
+                self.almacen.liberar(recursos, self.instancia)
+            except Exception as e:
+                logger.warning(f"No se pudieron liberar los arrendamientos de la instancia {self.instancia}: {e}")
+            self._es_lider = False
+            self._pools_propios = set()
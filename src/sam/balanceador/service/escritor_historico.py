@@ -0,0 +1,148 @@
+# SAM/src/sam/balanceador/service/escritor_historico.py
+
+import logging
+import queue
+import threading
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+from .historico_client import HistoricoBalanceoClient
+
+logger = logging.getLogger(__name__)
+
+
+class DecisionHistorica(NamedTuple):
+    fecha: datetime
+    robot_id: int
+    pool_id: Optional[int]
+    tickets_pendientes: int
+    equipos_antes: int
+    equipos_despues: int
+    accion: str
+    justificacion: Optional[str] = None
+
+
+class EscritorHistoricoBalanceo:
+    """
+    Cola acotada en memoria para las decisiones que se registran en dbo.HistoricoBalanceo.
+
+    El algoritmo encola sin tocar la base de datos; un hilo de fondo inserta las
+    decisiones en lotes (fast_executemany) al final de cada ciclo, cuando la cola
+    alcanza `tamano_lote` o cada `intervalo_seg` segundos. Si la cola está llena,
+    la política "descartar" pierde la decisión nueva (y la cuenta) y la política
+    "bloquear" espera a que el hilo libere espacio.
+    """
+
+    POLITICAS = ("descartar", "bloquear")
+
+    def __init__(
+        self,
+        historico_client: HistoricoBalanceoClient,
+        capacidad: int = 10000,
+        tamano_lote: int = 500,
+        politica: str = "descartar",
+        intervalo_seg: float = 30.0,
+    ):
+        """
+        Args:
+            historico_client: Cliente que inserta los lotes en dbo.HistoricoBalanceo.
+            capacidad: Máximo de decisiones retenidas en memoria.
+            tamano_lote: Cantidad de decisiones encoladas que dispara un volcado anticipado.
+            politica: "descartar" o "bloquear" cuando la cola está llena.
+            intervalo_seg: Tiempo máximo entre volcados aunque no se solicite ninguno.
+        """
+        if politica not in self.POLITICAS:
+            logger.warning(f"Política de cola de histórico '{politica}' desconocida. Se usará 'descartar'.")
+            politica = "descartar"
+        self._client = historico_client
+        self._cola: "queue.Queue[DecisionHistorica]" = queue.Queue(maxsize=max(capacidad, 1))
+        self._tamano_lote = max(tamano_lote, 1)
+        self._politica = politica
+        self._intervalo = intervalo_seg
+        self._volcado_solicitado = threading.Event()
+        self._detenido = threading.Event()
+        self._lock_volcado = threading.Lock()
+        self._hilo: Optional[threading.Thread] = None
+        self.estadisticas = {"encoladas": 0, "volcadas": 0, "descartadas": 0, "lotes_fallidos": 0}
+
+    @property
+    def cantidad_pendientes(self) -> int:
+        return self._cola.qsize()
+
+    def iniciar(self) -> None:
+        if self._hilo is None:
+            self._detenido.clear()
+            self._hilo = threading.Thread(target=self._bucle_volcado, name="sam-historico-balanceo", daemon=True)
+            self._hilo.start()
+
+    def detener(self, timeout: float = 30.0) -> None:
+        """Detiene el hilo de fondo tras volcar lo que quede en la cola."""
+        if self._hilo is not None:
+            self._detenido.set()
+            self._volcado_solicitado.set()
+            self._hilo.join(timeout)
+            self._hilo = None
+        self.volcar()
+
+    def registrar(self, decision: DecisionHistorica) -> bool:
+        """Encola una decisión. Retorna False si se descartó por cola llena."""
+        try:
+            if self._politica == "bloquear" and self._hilo is not None:
+                self._cola.put(decision)
+            else:
+                self._cola.put_nowait(decision)
+        except queue.Full:
+            self.estadisticas["descartadas"] += 1
+            if self.estadisticas["descartadas"] % 1000 == 1:
+                logger.warning(
+                    f"Cola de histórico de balanceo llena ({self._cola.maxsize}). "
+                    f"Decisiones descartadas hasta ahora: {self.estadisticas['descartadas']}."
+                )
+            return False
+        self.estadisticas["encoladas"] += 1
+        if self._cola.qsize() >= self._tamano_lote:
+            self._volcado_solicitado.set()
+        return True
+
+    def solicitar_volcado(self) -> None:
+        """Pide al hilo de fondo que vuelque la cola (p. ej. al terminar un ciclo de balanceo)."""
+        self._volcado_solicitado.set()
+
+    def volcar(self) -> int:
+        """Inserta todo lo encolado en lotes de `tamano_lote`. Retorna la cantidad insertada."""
+        total = 0
+        with self._lock_volcado:
+            while True:
+                lote = self._extraer_lote()
+                if not lote:
+                    return total
+                try:
+                    self._client.registrar_decisiones_balanceo(lote)
+                except Exception as e:
+                    # El histórico es auditoría: un lote fallido se registra y se descarta para no acumular memoria.
+                    self.estadisticas["lotes_fallidos"] += 1
+                    self.estadisticas["descartadas"] += len(lote)
+                    logger.error(
+                        f"No se pudo registrar un lote de {len(lote)} decisiones de balanceo: {e}", exc_info=True
+                    )
+                    continue
+                total += len(lote)
+                self.estadisticas["volcadas"] += len(lote)
+
+    def _extraer_lote(self) -> List[DecisionHistorica]:
+        lote = []
+        while len(lote) < self._tamano_lote:
+            try:
+                lote.append(self._cola.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _bucle_volcado(self) -> None:
+        while not self._detenido.is_set():
+            self._volcado_solicitado.wait(self._intervalo)
+            self._volcado_solicitado.clear()
+            try:
+                self.volcar()
+            except Exception as e:
+                logger.error(f"Error inesperado al volcar el histórico de balanceo: {e}", exc_info=True)
@@ -0,0 +1,197 @@
+# SAM/src/sam/balanceador/service/estado_balanceo_cache.py
+
+import logging
+import time
+from threading import RLock
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sam.common.database import DatabaseConnector
+
+from .plan_balanceo import PlanBalanceo
+
+logger = logging.getLogger(__name__)
+
+
+class EstadoBalanceoCache:
+    """
+    Mantiene en memoria las filas de dbo.Robots, dbo.Equipos y dbo.Asignaciones que usa
+    el algoritmo de balanceo, para no releer las tablas completas en cada ciclo.
+
+    En cada ciclo solo se leen las filas cuya columna VersionFila (rowversion, migración 5)
+    supera la marca del ciclo anterior. Como un rowversion no registra borrados, también
+    se compara una huella (cantidad de filas y suma de claves) de cada tabla contra la
+    calculada en memoria: si no coinciden hay deriva y se recarga todo. La recarga completa
+    también ocurre cada `intervalo_recarga_completa_seg` segundos.
+    """
+
+    _CONSULTA_CONTROL = """
+        SELECT
+            MIN_ACTIVE_ROWVERSION() AS Marca,
+            (SELECT COUNT_BIG(*) FROM dbo.Robots) AS FilasRobots,
+            (SELECT ISNULL(SUM(CAST(RobotId AS BIGINT)), 0) FROM dbo.Robots) AS SumaRobots,
+            (SELECT COUNT_BIG(*) FROM dbo.Equipos) AS FilasEquipos,
+            (SELECT ISNULL(SUM(CAST(EquipoId AS BIGINT)), 0) FROM dbo.Equipos) AS SumaEquipos,
+            (SELECT COUNT_BIG(*) FROM dbo.Asignaciones) AS FilasAsignaciones,
+            (SELECT ISNULL(SUM(CAST(ISNULL(RobotId, 0) AS BIGINT) * 100003 + ISNULL(EquipoId, 0)), 0) FROM dbo.Asignaciones) AS SumaAsignaciones;
+    """
+    _CONSULTA_ROBOTS = "SELECT RobotId, Robot, Activo, EsOnline, MinEquipos, MaxEquipos, PrioridadBalanceo, TicketsPorEquipoAdicional, PoolId FROM dbo.Robots"
+    _CONSULTA_EQUIPOS = "SELECT EquipoId, PoolId, Activo_SAM, PermiteBalanceoDinamico FROM dbo.Equipos"
+    _CONSULTA_ASIGNACIONES = "SELECT RobotId, EquipoId, EsProgramado, Reservado FROM dbo.Asignaciones"
+    _FILTRO_INCREMENTAL = " WHERE VersionFila >= ?"
+
+    def __init__(self, db_connector: DatabaseConnector, intervalo_recarga_completa_seg: int = 3600):
+        """
+        Args:
+            db_connector: Conector a la base de datos de SAM.
+            intervalo_recarga_completa_seg: Cada cuánto se descarta la caché y se recarga todo.
+        """
+        self.db = db_connector
+        self.intervalo_recarga_completa = intervalo_recarga_completa_seg
+        self._lock = RLock()
+
+        self._robots: Dict[int, Dict[str, Any]] = {}
+        self._equipos: Dict[int, Dict[str, Any]] = {}
+        self._asignaciones: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        self._marca: Optional[bytes] = None
+        self._ultima_recarga_completa = 0.0
+        self._incremental_disponible = True
+        self.estadisticas = {"recargas_completas": 0, "refrescos_incrementales": 0, "derivas": 0}
+
+    def invalidar(self) -> None:
+        """Fuerza una recarga completa en el próximo refresco."""
+        with self._lock:
+            self._marca = None
+
+    def obtener_estado(self) -> Dict[str, Any]:
+        """
+        Refresca la caché y retorna los mapas que espera el algoritmo, como copias que
+        el ciclo de balanceo puede modificar libremente.
+        """
+        with self._lock:
+            self._refrescar()
+            return self._construir_mapas()
+
+    def aplicar_plan(self, plan: PlanBalanceo) -> None:
+        """Refleja en la caché un plan ya aplicado, para que no se detecte como deriva."""
+        with self._lock:
+            for decision in plan.quitar:
+                self._asignaciones.pop((decision.robot_id, decision.equipo_id), None)
+            for decision in plan.agregar:
+                self._asignaciones[(decision.robot_id, decision.equipo_id)] = {
+                    "RobotId": decision.robot_id,
+                    "EquipoId": decision.equipo_id,
+                    "EsProgramado": False,
+                    "Reservado": False,
+                }
+
+    def _refrescar(self) -> None:
+        control = (self.db.ejecutar_consulta(self._CONSULTA_CONTROL, es_select=True) or [{}])[0]
+        nueva_marca = control.get("Marca")
+
+        vencida = time.monotonic() - self._ultima_recarga_completa >= self.intervalo_recarga_completa
+        if self._marca is None or vencida or not self._incremental_disponible:
+            self._recargar_completo(nueva_marca)
+            return
+
+        try:
+            self._aplicar_cambios(self._robots, self._CONSULTA_ROBOTS, ("RobotId",))
+            self._aplicar_cambios(self._equipos, self._CONSULTA_EQUIPOS, ("EquipoId",))
+            self._aplicar_cambios(self._asignaciones, self._CONSULTA_ASIGNACIONES, ("RobotId", "EquipoId"))
+        except Exception as e:
+            logger.warning(
+                f"No se pudo refrescar el estado de forma incremental (¿falta la migración 5?): {e}. "
+                "Se recargará completo en cada ciclo."
+            )
+            self._incremental_disponible = False
+            self._recargar_completo(nueva_marca)
+            return
+
+        if self._huella_local() != self._huella_remota(control):
+            logger.info("Deriva detectada entre la caché de estado y la base de datos. Recargando completo...")
+            self.estadisticas["derivas"] += 1
+            self._recargar_completo(nueva_marca)
+            return
+
+        self._marca = nueva_marca
+        self.estadisticas["refrescos_incrementales"] += 1
+
+    def _aplicar_cambios(self, destino: Dict, consulta: str, claves: Tuple[str, ...]) -> None:
+        filas = self.db.ejecutar_consulta(consulta + self._FILTRO_INCREMENTAL, (self._marca,), es_select=True) or []
+        for fila in filas:
+            destino[self._clave(fila, claves)] = fila
+        if filas:
+            logger.debug(f"Caché de estado: {len(filas)} filas modificadas aplicadas.")
+
+    def _recargar_completo(self, marca: Optional[bytes]) -> None:
+        # La marca se toma antes de leer: lo que cambie durante la lectura se relee en el próximo refresco.
+        self._robots = {r["RobotId"]: r for r in self.db.ejecutar_consulta(self._CONSULTA_ROBOTS, es_select=True) or []}
+        self._equipos = {
+            e["EquipoId"]: e for e in self.db.ejecutar_consulta(self._CONSULTA_EQUIPOS, es_select=True) or []
+        }
+        self._asignaciones = {
+            self._clave(a, ("RobotId", "EquipoId")): a
+            for a in self.db.ejecutar_consulta(self._CONSULTA_ASIGNACIONES, es_select=True) or []
+        }
+        self._marca = marca
+        self._ultima_recarga_completa = time.monotonic()
+        self.estadisticas["recargas_completas"] += 1
+        logger.info(
+            f"Caché de estado recargada: {len(self._robots)} robots, {len(self._equipos)} equipos, "
+            f"{len(self._asignaciones)} asignaciones."
+        )
+
+    @staticmethod
+    def _clave(fila: Dict[str, Any], claves: Tuple[str, ...]):
+        return fila[claves[0]] if len(claves) == 1 else tuple(fila.get(c) for c in claves)
+
+    def _huella_local(self) -> Tuple[int, ...]:
+        suma_asignaciones = sum(
+            (robot_id or 0) * 100003 + (equipo_id or 0) for robot_id, equipo_id in self._asignaciones
+        )
+        return (
+            len(self._robots),
+            sum(self._robots),
+            len(self._equipos),
+            sum(self._equipos),
+            len(self._asignaciones),
+            suma_asignaciones,
+        )
+
+    @staticmethod
+    def _huella_remota(control: Dict[str, Any]) -> Tuple[int, ...]:
+        return tuple(
+            int(control.get(campo) or 0)
+            for campo in (
+                "FilasRobots",
+                "SumaRobots",
+                "FilasEquipos",
+                "SumaEquipos",
+                "FilasAsignaciones",
+                "SumaAsignaciones",
+            )
+        )
+
+    def _construir_mapas(self) -> Dict[str, Any]:
+        mapa_config_robots = {rid: dict(r) for rid, r in self._robots.items() if r.get("Activo")}
+
+        mapa_equipos_validos_por_pool: Dict[Optional[int], Set[int]] = {}
+        for equipo_id, eq in self._equipos.items():
+            if eq.get("Activo_SAM") and eq.get("PermiteBalanceoDinamico"):
+                mapa_equipos_validos_por_pool.setdefault(eq.get("PoolId"), set()).add(equipo_id)
+
+        mapa_asignaciones_dinamicas: Dict[int, List[int]] = {}
+        equipos_con_asignacion_fija: Set[int] = set()
+        for (robot_id, equipo_id), a in self._asignaciones.items():
+            if not robot_id or not equipo_id:
+                continue
+            if not a.get("EsProgramado") and not a.get("Reservado"):
+                mapa_asignaciones_dinamicas.setdefault(robot_id, []).append(equipo_id)
+            else:
+                equipos_con_asignacion_fija.add(equipo_id)
+
+        return {
+            "mapa_config_robots": mapa_config_robots,
+            "mapa_equipos_validos_por_pool": mapa_equipos_validos_por_pool,
+            "mapa_asignaciones_dinamicas": mapa_asignaciones_dinamicas,
+            "equipos_con_asignacion_fija": equipos_con_asignacion_fija,
+        }
@@ -0,0 +1,144 @@
+# SAM/src/sam/balanceador/service/estado_enfriamiento.py
+
+import json
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import List, NamedTuple
+
+from sam.common.database import DatabaseConnector
+
+logger = logging.getLogger(__name__)
+
+
+class RegistroEnfriamiento(NamedTuple):
+    robot_id: int
+    operacion: str  # "ASIGNAR" o "DESASIGNAR"
+    marca: float  # segundos desde epoch
+    tickets: int
+
+
+class BackendEnfriamiento(ABC):
+    """
+    Almacenamiento de las últimas operaciones del CoolingManager. Se lee en bloque al
+    iniciar, se escribe una vez por ciclo con los registros nuevos y se purga lo vencido.
+    Guarda un único registro por (RobotId, operación): el más reciente.
+    """
+
+    nombre = ""
+
+    @abstractmethod
+    def cargar(self, desde: float) -> List[RegistroEnfriamiento]:
+        """Retorna los registros con marca posterior a `desde`."""
+
+    @abstractmethod
+    def guardar(self, registros: List[RegistroEnfriamiento], vencidos_antes_de: float) -> None:
+        """Inserta o reemplaza los registros y elimina los anteriores a `vencidos_antes_de`."""
+
+
+class BackendEnfriamientoMemoria(BackendEnfriamiento):
+    """Sin persistencia: el estado vive solo en el proceso (comportamiento histórico)."""
+
+    nombre = "memoria"
+
+    def cargar(self, desde: float) -> List[RegistroEnfriamiento]:
+        return []
+
+    def guardar(self, registros: List[RegistroEnfriamiento], vencidos_antes_de: float) -> None:
+        return None
+
+
+class BackendEnfriamientoArchivo(BackendEnfriamiento):
+    """Archivo JSON local, reescrito de forma atómica. Sobrevive a reinicios de una misma instancia."""
+
+    nombre = "archivo"
+
+    def __init__(self, ruta: str):
+        self.ruta = Path(ruta)
+        self._lock = threading.Lock()
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+
+    def cargar(self, desde: float) -> List[RegistroEnfriamiento]:
+        with self._lock:
+            return [r for r in self._leer_sin_lock() if r.marca >= desde]
+
+    def guardar(self, registros: List[RegistroEnfriamiento], vencidos_antes_de: float) -> None:
+        with self._lock:
+            vigentes = {(r.robot_id, r.operacion): r for r in self._leer_sin_lock() if r.marca >= vencidos_antes_de}
+            for registro in registros:
+                vigentes[(registro.robot_id, registro.operacion)] = registro
+            ruta_temporal = self.ruta.with_suffix(self.ruta.suffix + ".tmp")
+            with open(ruta_temporal, "w", encoding="utf-8") as f:
+                json.dump([r._asdict() for r in vigentes.values()], f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(ruta_temporal, self.ruta)
+
+    def _leer_sin_lock(self) -> List[RegistroEnfriamiento]:
+        if not self.ruta.exists():
+            return []
+        try:
+            with open(self.ruta, "r", encoding="utf-8") as f:
+                return [RegistroEnfriamiento(**r) for r in json.load(f)]
+        except (json.JSONDecodeError, TypeError) as e:
+            logger.warning(f"Archivo de enfriamiento {self.ruta} corrupto. Se ignorará su contenido: {e}")
+            return []
+
+
+class BackendEnfriamientoSql(BackendEnfriamiento):
+    """Tabla dbo.EnfriamientoBalanceo (migración 6), compartida por todas las instancias del balanceador."""
+
+    nombre = "sql"
+
+    def __init__(self, db_connector: DatabaseConnector):
+        self.db = db_connector
+
+    def cargar(self, desde: float) -> List[RegistroEnfriamiento]:
+        query = """
+            SELECT RobotId, Operacion, FechaOperacion, Tickets
+            FROM dbo.EnfriamientoBalanceo
+            WHERE FechaOperacion >= ?;
+        """
+        filas = self.db.ejecutar_consulta(query, (datetime.fromtimestamp(desde),), es_select=True) or []
+        return [
+            RegistroEnfriamiento(f["RobotId"], f["Operacion"], f["FechaOperacion"].timestamp(), f["Tickets"])
+            for f in filas
+        ]
+
+    def guardar(self, registros: List[RegistroEnfriamiento], vencidos_antes_de: float) -> None:
+        if registros:
+            query = """
+                MERGE dbo.EnfriamientoBalanceo WITH (HOLDLOCK) AS T
+                USING (SELECT ? AS RobotId, ? AS Operacion, ? AS FechaOperacion, ? AS Tickets) AS S
+                    ON T.RobotId = S.RobotId AND T.Operacion = S.Operacion
+                WHEN MATCHED AND S.FechaOperacion > T.FechaOperacion THEN
+                    UPDATE SET FechaOperacion = S.FechaOperacion, Tickets = S.Tickets
+                WHEN NOT MATCHED THEN
+                    INSERT (RobotId, Operacion, FechaOperacion, Tickets)
+                    VALUES (S.RobotId, S.Operacion, S.FechaOperacion, S.Tickets);
+            """
+            self.db.ejecutar_consulta_multiple(
+                query, [(r.robot_id, r.operacion, datetime.fromtimestamp(r.marca), r.tickets) for r in registros]
+            )
+        self.db.ejecutar_consulta(
+            "DELETE FROM dbo.EnfriamientoBalanceo WHERE FechaOperacion < ?;",
+            (datetime.fromtimestamp(vencidos_antes_de),),
+            es_select=False,
+        )
+
+
+def crear_backend_enfriamiento(nombre: str, db_connector: DatabaseConnector, ruta_archivo: str) -> BackendEnfriamiento:
+    """Crea el backend configurado; si el nombre no existe se usa el de memoria."""
+    nombre = (nombre or BackendEnfriamientoMemoria.nombre).lower()
+    if nombre == BackendEnfriamientoSql.nombre:
+        return BackendEnfriamientoSql(db_connector)
+    if nombre == BackendEnfriamientoArchivo.nombre:
+        return BackendEnfriamientoArchivo(ruta_archivo)
+    if nombre != BackendEnfriamientoMemoria.nombre:
+        logger.warning(
+            f"Backend de enfriamiento '{nombre}' desconocido. Se usará '{BackendEnfriamientoMemoria.nombre}'."
+        )
+    return BackendEnfriamientoMemoria()
@@ -1,7 +1,7 @@
 # SAM/src/sam/balanceador/service/historico_client.py
 
 import logging
-from typing import Optional
+from typing import List, Optional
 
 from sam.common.database import DatabaseConnector
 
@@ -53,6 +53,31 @@ class HistoricoBalanceoClient:
             logger.error(f"Error al registrar decisión de balanceo: {e}", exc_info=True)
             return False
 
+    def registrar_decisiones_balanceo(self, decisiones: List[tuple]) -> int:
+        """
+        Inserta un lote de decisiones en una sola llamada con fast_executemany.
+        A diferencia de `ejecutar_consulta_multiple`, propaga el error para que el
+        llamador decida qué hacer con el lote.
+
+        Args: decisiones: Tuplas (FechaBalanceo, RobotId, PoolId, TicketsPendientes,
+            EquiposAsignadosAntes, EquiposAsignadosDespues, AccionTomada, Justificacion)
+
+        Returns: int: Filas insertadas
+        """
+        if not decisiones:
+            return 0
+        query = """
+        INSERT INTO dbo.HistoricoBalanceo
+        (FechaBalanceo, RobotId, PoolId, TicketsPendientes, EquiposAsignadosAntes, EquiposAsignadosDespues, AccionTomada, Justificacion)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?);
+        """
+        params_list = [tuple(d) for d in decisiones]
+        with self.db.obtener_cursor() as cursor:
+            cursor.fast_executemany = True
+            cursor.executemany(query, params_list)
+        logger.debug(f"Registradas {len(params_list)} decisiones de balanceo en el histórico.")
+        return len(params_list)
+
     def obtener_historico_robot(self, robot_id: int, limite: int = 10) -> list:
         """
         Obtiene el histórico de decisiones de balanceo para un robot específico.
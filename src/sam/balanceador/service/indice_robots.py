@@ -0,0 +1,142 @@
+# SAM/src/sam/balanceador/service/indice_robots.py
+
+import logging
+import threading
+from typing import Any, Dict, NamedTuple, Optional
+
+from sam.common.database import DatabaseConnector
+
+logger = logging.getLogger(__name__)
+
+
+class RobotIndexado(NamedTuple):
+    robot_id: int
+    nombre: str
+    activo: bool
+    es_online: bool
+    pool_id: Optional[int]
+
+
+def normalizar_nombre(nombre: str) -> str:
+    return (nombre or "").strip().casefold()
+
+
+class IndiceRobots:
+    """
+    Índice compartido por todos los proveedores de carga que traduce nombres de robot
+    (o sus alias de MAPA_ROBOTS) a la fila de dbo.Robots.
+
+    Un hilo de fondo lo refresca cada `intervalo_refresco_seg` segundos leyendo solo las
+    filas cuya VersionFila (migración 5) cambió. Si la cantidad de filas no coincide
+    (hubo borrados) o la columna no existe, se recarga completo. Las lecturas nunca
+    bloquean: el refresco construye un mapa nuevo y lo reemplaza de una vez.
+    """
+
+    _CONSULTA_ROBOTS = "SELECT RobotId, Robot, Activo, EsOnline, PoolId FROM dbo.Robots"
+    _CONSULTA_CONTROL = "SELECT MIN_ACTIVE_ROWVERSION() AS Marca, COUNT_BIG(*) AS Filas FROM dbo.Robots"
+
+    def __init__(
+        self, db_connector: DatabaseConnector, mapa_alias: Dict[str, str], intervalo_refresco_seg: float = 60.0
+    ):
+        """
+        Args:
+            db_connector: Conector a la base de datos de SAM.
+            mapa_alias: Alias de nombres externos a nombres de SAM (ConfigManager.get_mapa_robots).
+            intervalo_refresco_seg: Cada cuánto se buscan cambios en dbo.Robots.
+        """
+        self.db = db_connector
+        self.intervalo_refresco = intervalo_refresco_seg
+        self._alias = {normalizar_nombre(k): normalizar_nombre(v) for k, v in (mapa_alias or {}).items()}
+        self._por_id: Dict[int, RobotIndexado] = {}
+        self._por_nombre: Dict[str, RobotIndexado] = {}
+        self._marca: Optional[Any] = None
+        self._incremental_disponible = True
+        self._lock = threading.Lock()
+        self._detenido = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._por_id)
+
+    def buscar(self, nombre: str) -> Optional[RobotIndexado]:
+        """Busca un robot por nombre o alias, sin distinguir mayúsculas ni espacios extremos."""
+        clave = normalizar_nombre(nombre)
+        return self._por_nombre.get(self._alias.get(clave, clave))
+
+    def iniciar(self) -> None:
+        """Carga el índice y lanza el hilo de refresco."""
+        self.refrescar()
+        if self._hilo is None and self.intervalo_refresco > 0:
+            self._detenido.clear()
+            self._hilo = threading.Thread(target=self._bucle_refresco, name="sam-indice-robots", daemon=True)
+            self._hilo.start()
+
+    def detener(self) -> None:
+        if self._hilo is not None:
+            self._detenido.set()
+            self._hilo.join(5)
+            self._hilo = None
+
+    def refrescar(self) -> None:
+        with self._lock:
+            control = (self.db.ejecutar_consulta(self._CONSULTA_CONTROL, es_select=True) or [{}])[0]
+            if self._marca is None or not self._incremental_disponible:
+                self._recargar_completo(control.get("Marca"))
+                return
+            try:
+                cambios = (
+                    self.db.ejecutar_consulta(
+                        self._CONSULTA_ROBOTS + " WHERE VersionFila >= ?", (self._marca,), es_select=True
+                    )
+                    or []
+                )
+            except Exception as e:
+                logger.warning(
+                    f"No se pudo refrescar el índice de robots de forma incremental: {e}. Se recargará completo."
+                )
+                self._incremental_disponible = False
+                self._recargar_completo(control.get("Marca"))
+                return
+
+            if cambios:
+                por_id = dict(self._por_id)
+                por_id.update((f["RobotId"], self._a_robot(f)) for f in cambios)
+                self._publicar(por_id)
+                logger.info(f"Índice de robots actualizado: {len(cambios)} robots nuevos o modificados.")
+
+            if len(self._por_id) != int(control.get("Filas") or 0):
+                logger.info(
+                    "El índice de robots no coincide con dbo.Robots (¿robots eliminados?). Recargando completo..."
+                )
+                self._recargar_completo(control.get("Marca"))
+                return
+            self._marca = control.get("Marca")
+
+    def _recargar_completo(self, marca: Optional[Any]) -> None:
+        filas = self.db.ejecutar_consulta(self._CONSULTA_ROBOTS, es_select=True) or []
+        self._publicar({f["RobotId"]: self._a_robot(f) for f in filas})
+        self._marca = marca
+        logger.info(f"Índice de robots cargado: {len(self._por_id)} robots.")
+
+    def _publicar(self, por_id: Dict[int, RobotIndexado]) -> None:
+        # Se reemplazan los mapas completos: quien esté leyendo sigue viendo un estado coherente.
+        # Un robot renombrado deja de responder a su nombre anterior.
+        self._por_nombre = {normalizar_nombre(r.nombre): r for r in por_id.values()}
+        self._por_id = por_id
+
+    @staticmethod
+    def _a_robot(fila: Dict[str, Any]) -> RobotIndexado:
+        return RobotIndexado(
+            robot_id=fila["RobotId"],
+            nombre=(fila.get("Robot") or "").strip(),
+            activo=bool(fila.get("Activo")),
+            es_online=bool(fila.get("EsOnline")),
+            pool_id=fila.get("PoolId"),
+        )
+
+    def _bucle_refresco(self) -> None:
+        while not self._detenido.wait(self.intervalo_refresco):
+            try:
+                self.refrescar()
+            except Exception as e:
+                logger.error(f"Error al refrescar el índice de robots: {e}", exc_info=True)
@@ -1,22 +1,33 @@
 # SAM/src/balanceador/service/main.py (Refactorizado con Inyección de Dependencias)
 
+import asyncio
+import functools
 import logging
 import threading
 import time
 from concurrent.futures import ThreadPoolExecutor
-from typing import Any, Dict, List
-
-import schedule
+from typing import Any, Dict, List, Optional
 
 from sam.common.config_manager import ConfigManager
 from sam.common.database import DatabaseConnector
 from sam.common.mail_client import EmailAlertClient
+from sam.common.migraciones import EsquemaDesactualizadoError, MigradorEsquema
 
 from .algoritmo_balanceo import Balanceo
+from .consolidador_carga import ConsolidadorCarga
+from .coordinacion import AlmacenArrendamientosSql, ArrendamientoPerdidoError, CoordinadorBalanceador
+from .indice_robots import IndiceRobots
+from .motor_disparos import MotorDisparos
+from .planificador_ciclos import PlanificadorCiclos
 from .proveedores import ProveedorCargaFactory
 
 logger = logging.getLogger(__name__)
 
+# Migraciones de las que depende el balanceador: el TVP y dbo.AplicarPlanBalanceo (4) siempre; con
+# coordinación, la tabla de arrendamientos (7) y la verificación de arrendamientos en el procedimiento (9).
+MIGRACIONES_REQUERIDAS = {4}
+MIGRACIONES_REQUERIDAS_COORDINACION = {7, 9}
+
 
 class BalanceadorService:
     """
@@ -36,17 +47,32 @@ class BalanceadorService:
         # --- 2. Cargar configuración específica ---
         self.cfg_balanceador_specifics = ConfigManager.get_balanceador_config()
         self._validar_configuracion_critica()
+        self._verificar_esquema()
 
         # --- 3. Inicializar componentes de lógica ---
         nombres_proveedores = self.cfg_balanceador_specifics.get("proveedores_carga", [])
-        mapa_robots = ConfigManager.get_mapa_robots()
+
+        # Un único índice de nombres de robot para todos los proveedores, refrescado en segundo plano.
+        self.indice_robots = IndiceRobots(
+            self.db_sam,
+            mapa_alias=ConfigManager.get_mapa_robots(),
+            intervalo_refresco_seg=self.cfg_balanceador_specifics.get("indice_robots_refresco_seg", 60),
+        )
+        self.indice_robots.iniciar()
 
         # Inyectar las dependencias en la fábrica de proveedores
         self.proveedores_carga = ProveedorCargaFactory.crear_proveedores(
             config_proveedores=nombres_proveedores,
             db_sam=self.db_sam,
             db_rpa360=self.db_rpa360,
-            mapa_robots=mapa_robots,
+            indice_robots=self.indice_robots,
+        )
+
+        self.consolidador_carga = ConsolidadorCarga(
+            self.proveedores_carga,
+            timeout_seg=self.cfg_balanceador_specifics.get("proveedores_timeout_seg", 20),
+            timeouts_por_proveedor=self.cfg_balanceador_specifics.get("proveedores_timeouts", {}),
+            max_antiguedad_seg=self.cfg_balanceador_specifics.get("carga_max_antiguedad_seg", 600),
         )
 
         # Inyectar las dependencias en la clase de algoritmo
@@ -54,44 +80,210 @@ class BalanceadorService:
             db_connector=self.db_sam, notificador=self.notificador, config_balanceador=self.cfg_balanceador_specifics
         )
 
+        # Coordinación entre instancias: activo/pasivo o pools repartidos entre instancias.
+        modo_coordinacion = self.cfg_balanceador_specifics.get("coordinacion", "ninguna")
+        self.coordinador = CoordinadorBalanceador(
+            AlmacenArrendamientosSql(self.db_sam) if modo_coordinacion != "ninguna" else None,
+            instancia=self.cfg_balanceador_specifics.get("instancia", "balanceador"),
+            modo=modo_coordinacion,
+            ttl_seg=self.cfg_balanceador_specifics.get("arrendamiento_ttl_seg", 60),
+        )
+        self._renovar_coordinacion()
+
         # --- 4. Configuración del ciclo de vida ---
-        self._shutdown_event = threading.Event()
+        # El evento de parada se crea en run(), dentro del event loop que lo va a esperar.
+        self._shutdown_event: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         self._is_shutting_down = False
+        # Evita que un ciclo arranque mientras otro sigue en curso, aunque se invoque por fuera del planificador.
+        self._ciclo_lock = threading.Lock()
+        # El algoritmo usa pyodbc de forma síncrona: cada ciclo corre en este hilo dedicado.
+        self._executor_ciclos = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sam-ciclo-balanceo")
+        self.espera_cierre_seg = self.cfg_balanceador_specifics.get("espera_cierre_seg", 30)
         self.intervalo_ciclo = self.cfg_balanceador_specifics.get("intervalo_ciclo_seg", 120)
-        schedule.every(self.intervalo_ciclo).seconds.do(self.ejecutar_ciclo_balanceo)
-        logger.info(f"Servicio configurado para ejecutarse cada {self.intervalo_ciclo} segundos.")
+        self.modo_disparo = self.cfg_balanceador_specifics.get("modo_disparo", "intervalo")
+        self.intervalo_muestreo = self.cfg_balanceador_specifics.get("muestreo_seg", 30)
+        self._ultima_muestra_pasiva: Optional[float] = None
+
+        if self.modo_disparo == "intervalo":
+            self.motor_disparos = None
+            self.planificador = PlanificadorCiclos(self.intervalo_ciclo)
+            logger.info(f"Servicio configurado para ejecutarse cada {self.intervalo_ciclo} segundos.")
+        else:
+            # El intervalo de ciclo pasa a ser el latido: el máximo tiempo sin balancear.
+            self.motor_disparos = MotorDisparos(
+                umbral_tickets=self.cfg_balanceador_specifics.get("disparo_umbral_tickets", 5),
+                umbral_relativo=self.cfg_balanceador_specifics.get("disparo_umbral_relativo", 0.2),
+                latido_seg=self.intervalo_ciclo,
+                antirrebote_seg=self.cfg_balanceador_specifics.get("disparo_antirrebote_seg", 5),
+                intervalo_min_seg=self.cfg_balanceador_specifics.get("disparo_intervalo_min_seg", 15),
+            )
+            self.planificador = PlanificadorCiclos(self.intervalo_muestreo)
+            logger.info(
+                f"Servicio configurado por eventos: muestreo de carga cada {self.intervalo_muestreo} segundos "
+                f"y ciclo garantizado cada {self.intervalo_ciclo} segundos."
+            )
 
     def _validar_configuracion_critica(self):
         """Valida que la configuración esencial esté presente."""
         if not self.cfg_balanceador_specifics.get("proveedores_carga"):
             raise ValueError("La variable de entorno 'BALANCEADOR_PROVEEDORES_CARGA' es obligatoria.")
+        if self.cfg_balanceador_specifics.get(
+            "coordinacion"
+        ) == "particionado" and not self.cfg_balanceador_specifics.get("aislamiento_estricto_pool", True):
+            # El desborde asigna equipos del Pool General a robots de otros pools, que pueden ser de otra instancia.
+            raise ValueError(
+                "BALANCEADOR_COORDINACION=particionado requiere BALANCEADOR_POOL_AISLAMIENTO_ESTRICTO=true."
+            )
+
+    def _verificar_esquema(self):
+        """Falla al iniciar si la base SAM no tiene las migraciones que el balanceador necesita."""
+        requeridas = set(MIGRACIONES_REQUERIDAS)
+        if self.cfg_balanceador_specifics.get("coordinacion", "ninguna") != "ninguna":
+            requeridas |= MIGRACIONES_REQUERIDAS_COORDINACION
+        faltantes = sorted(requeridas - MigradorEsquema(self.db_sam).obtener_versiones_aplicadas())
+        if faltantes:
+            raise EsquemaDesactualizadoError(
+                f"Faltan migraciones del esquema de SAM requeridas por el balanceador: {faltantes}. "
+                "Aplíquelas con 'sam-migrar' antes de iniciar el servicio."
+            )
+
+    async def run(self):
+        """Inicia el bucle principal del servicio y libera sus recursos al detenerse."""
+        self._loop = asyncio.get_running_loop()
+        self._shutdown_event = asyncio.Event()
+        if self._is_shutting_down:
+            self._shutdown_event.set()
+
+        tareas = [asyncio.ensure_future(self.planificador.ejecutar(self._tick, self._shutdown_event))]
+        if self.coordinador.modo != "ninguna":
+            renovacion = PlanificadorCiclos(self.coordinador.ttl_seg / 3, nombre="coordinación")
+            tareas.append(
+                asyncio.ensure_future(renovacion.ejecutar(self._renovar_coordinacion_async, self._shutdown_event))
+            )
 
-    def run(self):
-        """Inicia el bucle principal del servicio."""
-        logger.info("El servicio Balanceador ha iniciado. Esperando la primera ejecución programada...")
-        while not self._shutdown_event.is_set():
-            schedule.run_pending()
-            time.sleep(1)
+        modo = "por eventos" if self.motor_disparos is not None else "por intervalo"
+        logger.info(f"El servicio Balanceador ha iniciado en modo {modo}.")
+        try:
+            await asyncio.gather(*tareas)
+        finally:
+            await self._cerrar()
         logger.info("Bucle principal del Balanceador finalizado.")
 
+    async def _cerrar(self):
+        ciclo_terminado = await self.planificador.esperar_ciclo_en_curso(self.espera_cierre_seg)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.coordinador.liberar_todo)
+        if ciclo_terminado:
+            await loop.run_in_executor(None, self.algoritmo.cerrar)
+        else:
+            logger.warning(
+                f"El ciclo de balanceo en curso no terminó en {self.espera_cierre_seg}s. Se cierra el servicio sin esperarlo."
+            )
+            # El hilo de ciclos tiene un solo worker: el cierre del algoritmo corre cuando termine el ciclo.
+            self._executor_ciclos.submit(self.algoritmo.cerrar)
+        await loop.run_in_executor(None, self.indice_robots.detener)
+        await self.consolidador_carga.close()
+        self._executor_ciclos.shutdown(wait=False)
+
     def stop(self):
-        """Detiene el servicio de forma ordenada."""
+        """Detiene el servicio de forma ordenada. Puede invocarse desde un manejador de señales u otro hilo."""
         if not self._is_shutting_down:
             logger.info("Recibida señal de parada. Finalizando el ciclo actual y deteniendo el servicio...")
             self._is_shutting_down = True
-            self._shutdown_event.set()
+            if self._loop is not None and self._shutdown_event is not None:
+                self._loop.call_soon_threadsafe(self._shutdown_event.set)
 
-    def ejecutar_ciclo_balanceo(self):
-        """Ejecuta un único ciclo completo del algoritmo de balanceo."""
+    async def _tick(self):
+        """Un instante del planificador: un ciclo programado, o una muestra de carga en modo por eventos."""
+        if self.motor_disparos is None:
+            self.planificador.lanzar_ciclo(self._ciclo_async, "PROGRAMADO")
+            return
+        await self.evaluar_disparo()
+
+    async def evaluar_disparo(self) -> Optional[str]:
+        """
+        Toma una muestra de la carga y, si el motor de disparos lo decide, lanza un ciclo
+        con esa misma carga. Retorna el motivo del disparo, o None si no hubo ciclo.
+        """
+        if not self.coordinador.tiene_trabajo():
+            await self._muestrear_instancia_pasiva()
+            return None
+        try:
+            carga = await self.consolidador_carga.obtener_carga()
+        except Exception as e:
+            logger.error(f"Error al muestrear la carga de trabajo: {e}", exc_info=True)
+            return None
+        self.algoritmo.observar_carga(carga)
+
+        ahora = time.monotonic()
+        motivo = self.motor_disparos.evaluar(carga, ahora)
+        if motivo is None:
+            return None
+        if self.planificador.lanzar_ciclo(lambda: self._ciclo_async(carga, motivo), motivo):
+            self.motor_disparos.registrar_ciclo(carga, ahora)
+        return motivo
+
+    async def _ciclo_async(self, carga_consolidada: Optional[Dict[int, int]] = None, motivo: str = "PROGRAMADO"):
+        """Obtiene la carga si hace falta (proveedores en paralelo) y ejecuta el ciclo en su hilo dedicado."""
+        if carga_consolidada is None:
+            if not self.coordinador.tiene_trabajo():
+                logger.info("Instancia pasiva: el balanceo está a cargo de otra instancia. Se omite el ciclo.")
+                await self._muestrear_instancia_pasiva()
+                return
+            carga_consolidada = await self.consolidador_carga.obtener_carga()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor_ciclos, self.ejecutar_ciclo_balanceo, carga_consolidada, motivo)
+
+    async def _muestrear_instancia_pasiva(self):
+        """
+        Una instancia pasiva no consulta a los proveedores, salvo una muestra por latido si el
+        pronóstico está habilitado: así conserva su historia para cuando tome el relevo.
+        """
+        if self.algoritmo.pronosticador is None:
+            return
+        ahora = time.monotonic()
+        if self._ultima_muestra_pasiva is not None and ahora - self._ultima_muestra_pasiva < self.intervalo_ciclo:
+            return
+        self._ultima_muestra_pasiva = ahora
+        try:
+            self.algoritmo.observar_carga(await self.consolidador_carga.obtener_carga())
+        except Exception as e:
+            logger.error(f"Error al muestrear la carga de trabajo: {e}", exc_info=True)
+
+    def ejecutar_ciclo_balanceo(self, carga_consolidada: Dict[int, int], motivo: str = "PROGRAMADO") -> bool:
+        """
+        Ejecuta un único ciclo completo del algoritmo de balanceo (síncrono, fuera del event loop).
+
+        Args: carga_consolidada: Carga consolidada de los proveedores.
+            motivo: Causa del ciclo, solo para el log.
+
+        Returns: bool: False si el ciclo se omitió (parada en curso u otro ciclo en ejecución).
+        """
         if self._is_shutting_down:
             logger.info("Omitiendo ciclo de balanceo debido a una señal de parada.")
-            return
+            return False
+        if not self._ciclo_lock.acquire(blocking=False):
+            logger.warning(f"Omitiendo ciclo de balanceo ({motivo}): el ciclo anterior sigue en ejecución.")
+            return False
 
-        logger.info("*" * 20 + " INICIANDO NUEVO CICLO DE BALANCEO " + "*" * 20)
+        logger.info("*" * 20 + f" INICIANDO NUEVO CICLO DE BALANCEO ({motivo}) " + "*" * 20)
         try:
-            carga_consolidada = self._obtener_carga_de_trabajo_consolidada()
             pools_activos = self.obtener_pools_activos()
-            self.algoritmo.ejecutar_algoritmo_completo(carga_consolidada, pools_activos)
+            pools_en_alcance = None
+            verificar_arrendamiento = None
+            if self.coordinador.modo != "ninguna":
+                pools_en_alcance = self.coordinador.pools_a_balancear([p["PoolId"] for p in pools_activos] + [None])
+                if not pools_en_alcance:
+                    logger.info("Instancia pasiva: el balanceo está a cargo de otra instancia. Se omite el ciclo.")
+                    return True
+                # Se vuelve a verificar justo antes de aplicar: el ciclo puede durar más que el arrendamiento.
+                verificar_arrendamiento = functools.partial(self.coordinador.verificar_vigencia, pools_en_alcance)
+            self.algoritmo.ejecutar_algoritmo_completo(
+                carga_consolidada, pools_activos, pools_en_alcance, verificar_arrendamiento=verificar_arrendamiento
+            )
+        except ArrendamientoPerdidoError as e:
+            logger.warning(f"Plan de balanceo descartado: {e}")
         except Exception as e:
             logger.error(f"Error inesperado en el ciclo de balanceo: {e}", exc_info=True)
             self.notificador.send_alert(
@@ -99,31 +291,23 @@ class BalanceadorService:
                 message=f"Se produjo un error no controlado en el ciclo principal.\n\nError: {e}",
             )
         finally:
+            self._ciclo_lock.release()
             logger.info("*" * 22 + " FIN DEL CICLO DE BALANCEO " + "*" * 23 + "\n")
+        return True
 
-    def _obtener_carga_de_trabajo_consolidada(self) -> Dict[int, int]:
-        """Obtiene y consolida la carga de trabajo de todos los proveedores activos."""
-        if not self.proveedores_carga:
-            logger.warning("No hay proveedores de carga configurados.")
-            return {}
-
-        carga_total: Dict[int, int] = {}
-        max_workers = max(len(self.proveedores_carga), 1)
-
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_provider = {executor.submit(p.obtener_carga): p for p in self.proveedores_carga}
-            for future in future_to_provider:
-                provider = future_to_provider[future]
-                try:
-                    carga_proveedor = future.result()
-                    logger.info(f"Proveedor '{provider.get_nombre()}' retornó {len(carga_proveedor)} robots con carga.")
-                    for robot_id, tickets in carga_proveedor.items():
-                        carga_total[robot_id] = carga_total.get(robot_id, 0) + tickets
-                except Exception as e:
-                    logger.error(f"Error al obtener carga del proveedor '{provider.get_nombre()}': {e}", exc_info=True)
-
-        logger.info(f"Carga consolidada final: {len(carga_total)} robots con demanda.")
-        return carga_total
+    async def _renovar_coordinacion_async(self):
+        await asyncio.get_running_loop().run_in_executor(None, self._renovar_coordinacion)
+
+    def _renovar_coordinacion(self):
+        """Renueva los arrendamientos de la instancia; run() lo hace cada tercio de su vigencia."""
+        if self.coordinador.modo == "ninguna":
+            return
+        pool_ids = []
+        if self.coordinador.modo == "particionado":
+            pool_ids = [p["PoolId"] for p in self.obtener_pools_activos()] + [None]
+        if self.coordinador.actualizar(pool_ids):
+            # Al tomar trabajo de otra instancia se parte de su estado de enfriamiento.
+            self.algoritmo.cooling_manager.recargar()
 
     def obtener_pools_activos(self) -> List[Dict[str, Any]]:
         """Obtiene la lista de pools de balanceo activos desde la BD."""
@@ -0,0 +1,98 @@
+# SAM/src/sam/balanceador/service/motor_disparos.py
+
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class MotorDisparos:
+    """
+    Decide, a partir de muestras frecuentes de la carga, cuándo vale la pena ejecutar un
+    ciclo completo de balanceo.
+
+    Se dispara un ciclo cuando:
+      - la carga de algún robot cambió respecto de la del último ciclo en al menos
+        `umbral_tickets` tickets y `umbral_relativo` (un robot que pasa de 0 tickets a
+        tenerlos, o al revés, siempre cuenta), o
+      - pasaron `latido_seg` segundos desde el último ciclo, aunque nada haya cambiado.
+
+    Un cambio detectado espera `antirrebote_seg` antes de disparar, para que una ráfaga
+    de tickets se resuelva en un solo ciclo, y nunca se disparan dos ciclos con menos de
+    `intervalo_min_seg` entre sí.
+    """
+
+    MOTIVO_CAMBIO_CARGA = "CAMBIO_CARGA"
+    MOTIVO_LATIDO = "LATIDO"
+
+    def __init__(
+        self,
+        umbral_tickets: int = 5,
+        umbral_relativo: float = 0.2,
+        latido_seg: float = 120.0,
+        antirrebote_seg: float = 5.0,
+        intervalo_min_seg: float = 15.0,
+    ):
+        """
+        Args:
+            umbral_tickets: Variación mínima absoluta de tickets de un robot.
+            umbral_relativo: Variación mínima relativa a la carga del último ciclo.
+            latido_seg: Tiempo máximo sin ciclos de balanceo.
+            antirrebote_seg: Espera desde el primer cambio detectado hasta disparar.
+            intervalo_min_seg: Separación mínima entre dos ciclos.
+        """
+        self.umbral_tickets = umbral_tickets
+        self.umbral_relativo = umbral_relativo
+        self.latido_seg = latido_seg
+        self.antirrebote_seg = antirrebote_seg
+        self.intervalo_min_seg = intervalo_min_seg
+
+        self._carga_ultimo_ciclo: Dict[int, int] = {}
+        self._ultimo_ciclo: Optional[float] = None
+        self._cambio_detectado_en: Optional[float] = None
+
+    def evaluar(self, carga: Dict[int, int], ahora: float) -> Optional[str]:
+        """Retorna el motivo del disparo si corresponde ejecutar un ciclo ahora, o None."""
+        if self._ultimo_ciclo is None:
+            return self.MOTIVO_LATIDO
+
+        desde_ultimo_ciclo = ahora - self._ultimo_ciclo
+        if desde_ultimo_ciclo >= self.latido_seg:
+            return self.MOTIVO_LATIDO
+
+        robot_cambiado = self._robot_con_cambio_significativo(carga)
+        if robot_cambiado is None:
+            # La carga volvió a valores cercanos a los del último ciclo: no hay nada que hacer.
+            self._cambio_detectado_en = None
+            return None
+
+        if self._cambio_detectado_en is None:
+            self._cambio_detectado_en = ahora
+            logger.debug(f"Cambio de carga detectado en RobotId {robot_cambiado}. Esperando antirrebote...")
+
+        if ahora - self._cambio_detectado_en < self.antirrebote_seg or desde_ultimo_ciclo < self.intervalo_min_seg:
+            return None
+        return self.MOTIVO_CAMBIO_CARGA
+
+    def registrar_ciclo(self, carga: Dict[int, int], ahora: float) -> None:
+        """Toma la carga con la que se ejecutó el ciclo como nueva referencia."""
+        self._carga_ultimo_ciclo = dict(carga)
+        self._ultimo_ciclo = ahora
+        self._cambio_detectado_en = None
+
+    def segundos_hasta_latido(self, ahora: float) -> float:
+        if self._ultimo_ciclo is None:
+            return 0.0
+        return max(self.latido_seg - (ahora - self._ultimo_ciclo), 0.0)
+
+    def _robot_con_cambio_significativo(self, carga: Dict[int, int]) -> Optional[int]:
+        anterior_por_robot = self._carga_ultimo_ciclo
+        for robot_id in anterior_por_robot.keys() | carga.keys():
+            anterior = anterior_por_robot.get(robot_id, 0)
+            actual = carga.get(robot_id, 0)
+            if (anterior == 0) != (actual == 0):
+                return robot_id
+            delta = abs(actual - anterior)
+            if delta >= self.umbral_tickets and delta >= self.umbral_relativo * anterior:
+                return robot_id
+        return None
@@ -0,0 +1,119 @@
+# SAM/src/sam/balanceador/service/plan_balanceo.py
+
+import logging
+from typing import Dict, List, NamedTuple, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class DecisionAsignacion(NamedTuple):
+    robot_id: int
+    equipo_id: int
+    motivo: str
+    justificacion: str = ""
+
+
+class PlanBalanceo:
+    """
+    Resultado completo de un ciclo de balanceo antes de tocar la base de datos:
+    las asignaciones dinámicas a agregar, a quitar y a mantener, cada una con su motivo.
+
+    Las fases del algoritmo solo registran decisiones aquí; el plan se aplica al final
+    en una única operación de conjunto (ver Balanceo._aplicar_plan).
+    """
+
+    ACCION_AGREGAR = "AGREGAR"
+    ACCION_QUITAR = "QUITAR"
+
+    def __init__(self):
+        # Indexadas por (RobotId, EquipoId) en orden de registro, para compensar en O(1).
+        self._agregar: Dict[Tuple[int, int], DecisionAsignacion] = {}
+        self._quitar: Dict[Tuple[int, int], DecisionAsignacion] = {}
+        self._agregados_por_robot: Dict[int, int] = {}
+        self._quitados_por_robot: Dict[int, int] = {}
+        self.mantener: List[DecisionAsignacion] = []
+        # Quitas que el CoolingManager bloqueó, con su justificación.
+        self._quitas_bloqueadas: Dict[Tuple[int, int], str] = {}
+
+    @property
+    def agregar(self) -> List[DecisionAsignacion]:
+        return list(self._agregar.values())
+
+    @property
+    def quitar(self) -> List[DecisionAsignacion]:
+        return list(self._quitar.values())
+
+    @property
+    def robots_ampliados(self) -> Set[int]:
+        return set(self._agregados_por_robot)
+
+    @property
+    def robots_reducidos(self) -> Set[int]:
+        return set(self._quitados_por_robot)
+
+    @property
+    def tiene_cambios(self) -> bool:
+        return bool(self._agregar or self._quitar)
+
+    def amplio(self, robot_id: int) -> bool:
+        """True si el robot ya recibe equipos en este ciclo."""
+        return robot_id in self._agregados_por_robot
+
+    def redujo(self, robot_id: int) -> bool:
+        """True si al robot ya se le quitan equipos en este ciclo."""
+        return robot_id in self._quitados_por_robot
+
+    def cantidad_agregada(self, robot_id: int) -> int:
+        return self._agregados_por_robot.get(robot_id, 0)
+
+    def cantidad_quitada(self, robot_id: int) -> int:
+        return self._quitados_por_robot.get(robot_id, 0)
+
+    def registrar_asignacion(self, robot_id: int, equipo_id: int, motivo: str, justificacion: str = "") -> None:
+        # Quitar y volver a agregar el mismo par en un ciclo se compensa: el MERGE no admite ambos.
+        if self._compensar(self._quitar, self._quitados_por_robot, robot_id, equipo_id):
+            return
+        self._agregar[(robot_id, equipo_id)] = DecisionAsignacion(robot_id, equipo_id, motivo, justificacion)
+        self._agregados_por_robot[robot_id] = self._agregados_por_robot.get(robot_id, 0) + 1
+
+    def registrar_desasignacion(self, robot_id: int, equipo_id: int, motivo: str, justificacion: str = "") -> None:
+        if self._compensar(self._agregar, self._agregados_por_robot, robot_id, equipo_id):
+            return
+        self._quitar[(robot_id, equipo_id)] = DecisionAsignacion(robot_id, equipo_id, motivo, justificacion)
+        self._quitados_por_robot[robot_id] = self._quitados_por_robot.get(robot_id, 0) + 1
+
+    @staticmethod
+    def _compensar(
+        decisiones: Dict[Tuple[int, int], DecisionAsignacion], por_robot: Dict[int, int], robot_id: int, equipo_id: int
+    ) -> bool:
+        if decisiones.pop((robot_id, equipo_id), None) is None:
+            return False
+        por_robot[robot_id] -= 1
+        if not por_robot[robot_id]:
+            del por_robot[robot_id]
+        return True
+
+    def registrar_desasignacion_bloqueada(self, robot_id: int, equipo_id: int, justificacion: str) -> None:
+        self._quitas_bloqueadas[(robot_id, equipo_id)] = justificacion
+
+    def completar_mantenidas(self, asignaciones_finales: Dict[int, List[int]]) -> None:
+        """Registra como mantenidas las asignaciones dinámicas que el ciclo no modificó."""
+        self.mantener = []
+        for robot_id, equipos in asignaciones_finales.items():
+            for equipo_id in equipos:
+                if (robot_id, equipo_id) in self._agregar:
+                    continue
+                bloqueo = self._quitas_bloqueadas.get((robot_id, equipo_id))
+                if bloqueo:
+                    self.mantener.append(DecisionAsignacion(robot_id, equipo_id, "MANTENER_ENFRIAMIENTO", bloqueo))
+                else:
+                    self.mantener.append(DecisionAsignacion(robot_id, equipo_id, "MANTENER_DEMANDA_VIGENTE"))
+
+    def a_filas_tvp(self) -> List[Tuple[int, int, str, str]]:
+        """Filas para el parámetro dbo.PlanBalanceoType: (RobotId, EquipoId, Accion, Motivo)."""
+        filas = [(d.robot_id, d.equipo_id, self.ACCION_QUITAR, d.motivo) for d in self._quitar.values()]
+        filas.extend((d.robot_id, d.equipo_id, self.ACCION_AGREGAR, d.motivo) for d in self._agregar.values())
+        return filas
+
+    def resumen(self) -> str:
+        return f"{len(self._agregar)} a agregar, {len(self._quitar)} a quitar, {len(self.mantener)} a mantener"
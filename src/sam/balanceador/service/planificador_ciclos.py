@@ -0,0 +1,100 @@
+# SAM/src/sam/balanceador/service/planificador_ciclos.py
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PlanificadorCiclos:
+    """
+    Ejecuta un tick en instantes fijos del reloj monotónico (inicio + k * intervalo), de
+    modo que la duración de cada tick no desplaza a los siguientes. Si un tick se atrasa
+    más de un intervalo, los instantes perdidos se saltean y se cuentan en las métricas.
+
+    El trabajo pesado (un ciclo de balanceo) se lanza desde el tick con `lanzar_ciclo`,
+    que corre en segundo plano y nunca se solapa consigo mismo: mientras un ciclo sigue
+    en curso, los siguientes se omiten y se cuentan.
+    """
+
+    def __init__(self, intervalo_seg: float, nombre: str = "balanceo"):
+        self.intervalo_seg = intervalo_seg
+        self.nombre = nombre
+        self._tarea_ciclo: Optional[asyncio.Task] = None
+        self.metricas: Dict[str, Any] = {
+            "ticks": 0,
+            "ticks_perdidos": 0,
+            "ciclos_lanzados": 0,
+            "ciclos_omitidos_por_solapamiento": 0,
+            "ciclos_con_error": 0,
+            "ultima_duracion_ciclo_seg": None,
+        }
+
+    @property
+    def ciclo_en_curso(self) -> bool:
+        return self._tarea_ciclo is not None and not self._tarea_ciclo.done()
+
+    async def ejecutar(self, tick: Callable[[], Awaitable[None]], parada: asyncio.Event) -> None:
+        """Ejecuta `tick` periódicamente hasta que se activa `parada`, que interrumpe también el tick en curso."""
+        loop = asyncio.get_running_loop()
+        espera_parada = asyncio.ensure_future(parada.wait())
+        proximo = loop.time()
+        try:
+            while not parada.is_set():
+                self.metricas["ticks"] += 1
+                tarea_tick = asyncio.ensure_future(tick())
+                await asyncio.wait({tarea_tick, espera_parada}, return_when=asyncio.FIRST_COMPLETED)
+                if not tarea_tick.done():
+                    tarea_tick.cancel()
+                    await asyncio.gather(tarea_tick, return_exceptions=True)
+                    break
+                if tarea_tick.exception() is not None:
+                    logger.error(
+                        f"Error en el tick de {self.nombre}: {tarea_tick.exception()}", exc_info=tarea_tick.exception()
+                    )
+
+                proximo += self.intervalo_seg
+                ahora = loop.time()
+                if proximo <= ahora:
+                    perdidos = int((ahora - proximo) // self.intervalo_seg) + 1
+                    proximo += perdidos * self.intervalo_seg
+                    self.metricas["ticks_perdidos"] += perdidos
+                    logger.warning(f"El tick de {self.nombre} se atrasó: se saltean {perdidos} instantes programados.")
+                await asyncio.wait({espera_parada}, timeout=proximo - ahora)
+        finally:
+            espera_parada.cancel()
+
+    def lanzar_ciclo(self, ciclo: Callable[[], Awaitable[Any]], motivo: str = "") -> bool:
+        """Lanza el ciclo en segundo plano salvo que el anterior siga en curso. Retorna si se lanzó."""
+        if self.ciclo_en_curso:
+            self.metricas["ciclos_omitidos_por_solapamiento"] += 1
+            logger.warning(
+                f"Ciclo de {self.nombre} omitido ({motivo}): el anterior sigue en curso. "
+                f"Omitidos hasta ahora: {self.metricas['ciclos_omitidos_por_solapamiento']}."
+            )
+            return False
+        self.metricas["ciclos_lanzados"] += 1
+        self._tarea_ciclo = asyncio.ensure_future(self._medir(ciclo))
+        return True
+
+    async def _medir(self, ciclo: Callable[[], Awaitable[Any]]):
+        inicio = time.monotonic()
+        try:
+            await ciclo()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.metricas["ciclos_con_error"] += 1
+            logger.error(f"Error no controlado en el ciclo de {self.nombre}: {e}", exc_info=True)
+        finally:
+            self.metricas["ultima_duracion_ciclo_seg"] = round(time.monotonic() - inicio, 3)
+            logger.info(f"Métricas del planificador de {self.nombre}: {self.metricas}")
+
+    async def esperar_ciclo_en_curso(self, timeout_seg: float) -> bool:
+        """Espera el ciclo en curso hasta `timeout_seg`. Retorna False si no terminó a tiempo."""
+        if not self.ciclo_en_curso:
+            return True
+        hechas, _ = await asyncio.wait({self._tarea_ciclo}, timeout=timeout_seg)
+        return bool(hechas)
@@ -0,0 +1,221 @@
+# SAM/src/sam/balanceador/service/pronostico_carga.py
+
+import calendar
+import logging
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PronosticadorCarga:
+    """
+    Pronostica los tickets pendientes de cada robot unos minutos hacia adelante para
+    dimensionar los equipos antes de que la cola crezca.
+
+    Modelo (vectorizado con NumPy sobre todos los robots):
+      - Nivel y tendencia de Holt con suavizado exponencial en tiempo continuo: los pesos
+        dependen de los segundos entre muestras, así da igual muestrear cada 10 s o cada
+        ciclo de 120 s.
+      - Perfil estacional de la tasa de variación (tickets/minuto) por franja del día, con
+        un perfil separado para los últimos días del mes. Cada franja se actualiza una vez
+        por día al cerrarse, de modo que recuerda los picos de días anteriores (ej. 9 am).
+
+    La tasa esperada es la mayor entre la tendencia y el perfil estacional de las franjas
+    del horizonte (si ya tienen suficientes días observados). El pronóstico nunca es menor
+    que la carga actual: solo adelanta ampliaciones, no reducciones.
+    """
+
+    PERFIL_NORMAL = 0
+    PERFIL_FIN_DE_MES = 1
+
+    def __init__(
+        self,
+        horizonte_min: float = 15.0,
+        constante_nivel_min: float = 2.0,
+        constante_tendencia_min: float = 10.0,
+        minutos_franja: int = 15,
+        peso_dia_estacional: float = 0.3,
+        dias_minimos_estacional: int = 2,
+        dias_fin_de_mes: int = 2,
+    ):
+        """
+        Args:
+            horizonte_min: Minutos hacia adelante que se pronostican.
+            constante_nivel_min: Constante de tiempo del suavizado del nivel.
+            constante_tendencia_min: Constante de tiempo del suavizado de la tendencia.
+            minutos_franja: Duración de cada franja del perfil estacional (divisor de 1440).
+            peso_dia_estacional: Peso del último día al actualizar una franja del perfil.
+            dias_minimos_estacional: Días observados de una franja antes de usarla.
+            dias_fin_de_mes: Últimos días de cada mes que usan el perfil de fin de mes.
+        """
+        try:
+            import numpy as np
+        except ImportError as e:
+            raise ImportError(
+                "El pronóstico de carga requiere NumPy. Instale el extra correspondiente: pip install sam[pronostico]"
+            ) from e
+        if minutos_franja <= 0 or 1440 % minutos_franja:
+            raise ValueError("minutos_franja debe ser un divisor de 1440.")
+
+        self._np = np
+        self.horizonte_min = horizonte_min
+        self.constante_nivel_min = constante_nivel_min
+        self.constante_tendencia_min = constante_tendencia_min
+        self.minutos_franja = minutos_franja
+        self.peso_dia_estacional = peso_dia_estacional
+        self.dias_minimos_estacional = dias_minimos_estacional
+        self.dias_fin_de_mes = dias_fin_de_mes
+        self.franjas_por_dia = 1440 // minutos_franja
+
+        self._indices: Dict[int, int] = {}
+        self._capacidad = 0
+        self._nivel = np.zeros(0)
+        self._tendencia = np.zeros(0)
+        self._ultima_muestra: Optional[float] = None
+
+        # Perfil estacional: (perfil, franja, robot) y días observados por (perfil, franja).
+        self._estacional = np.zeros((2, self.franjas_por_dia, 0))
+        self._dias_observados = np.zeros((2, self.franjas_por_dia), dtype=np.int64)
+        self._franja_actual: Optional[Tuple[int, int]] = None
+        self._inicio_franja: Optional[float] = None
+        self._nivel_inicio_franja = np.zeros(0)
+
+        self._lock = threading.Lock()
+
+    def observar(self, carga: Dict[int, int], ahora: Optional[float] = None) -> None:
+        """Incorpora una muestra de la carga consolidada (RobotId -> tickets)."""
+        np = self._np
+        ahora = time.time() if ahora is None else ahora
+        with self._lock:
+            nuevos = self._asegurar_robots(carga)
+            x = self._vector(carga)
+            # Un robot nuevo arranca con su carga actual como nivel y sin tendencia.
+            self._nivel[nuevos] = x[nuevos]
+            self._nivel_inicio_franja[nuevos] = x[nuevos]
+            if self._ultima_muestra is None:
+                self._ultima_muestra = ahora
+                self._iniciar_franja(ahora)
+                return
+
+            dt_min = (ahora - self._ultima_muestra) / 60.0
+            # Muestras repetidas (el mismo ciclo observado dos veces) no aportan información.
+            if dt_min < 1 / 60:
+                return
+
+            alfa = 1.0 - math.exp(-dt_min / self.constante_nivel_min)
+            beta = 1.0 - math.exp(-dt_min / self.constante_tendencia_min)
+            previsto = self._nivel + self._tendencia * dt_min
+            nivel = alfa * x + (1.0 - alfa) * previsto
+            self._tendencia = beta * (nivel - self._nivel) / dt_min + (1.0 - beta) * self._tendencia
+            self._nivel = np.maximum(nivel, 0.0)
+            self._ultima_muestra = ahora
+
+            if self._clave_franja(ahora) != self._franja_actual:
+                self._cerrar_franja(ahora)
+                self._iniciar_franja(ahora)
+
+    def pronosticar(self, carga: Dict[int, int], ahora: Optional[float] = None) -> Dict[int, int]:
+        """
+        Retorna los tickets esperados dentro de `horizonte_min` para los robots de `carga`,
+        nunca por debajo de sus tickets actuales.
+
+        También incluye los robots conocidos que no están en `carga` (cola vacía) cuyo perfil
+        estacional aprendido anticipa tickets en el horizonte, p.ej. antes del pico de las 9.
+        """
+        np = self._np
+        ahora = time.time() if ahora is None else ahora
+        with self._lock:
+            if self._ultima_muestra is None:
+                return dict(carga)
+
+            tasa = self._tendencia.copy()
+            estacional = self._tasa_estacional(ahora)
+            if estacional is not None:
+                tasa = np.maximum(tasa, estacional)
+            previsto = self._nivel + tasa * self.horizonte_min
+
+            demanda = {}
+            for robot_id, tickets in carga.items():
+                indice = self._indices.get(robot_id)
+                esperado = previsto[indice] if indice is not None else 0.0
+                demanda[robot_id] = max(tickets, int(math.ceil(esperado - 1e-9)))
+            if estacional is not None:
+                for robot_id, indice in self._indices.items():
+                    if robot_id in demanda or estacional[indice] <= 0:
+                        continue
+                    esperado = int(math.ceil(previsto[indice] - 1e-9))
+                    if esperado > 0:
+                        demanda[robot_id] = esperado
+            return demanda
+
+    # --- Perfil estacional ---
+
+    def _clave_franja(self, ahora: float) -> Tuple[int, int]:
+        t = time.localtime(ahora)
+        ultimo_dia = calendar.monthrange(t.tm_year, t.tm_mon)[1]
+        perfil = self.PERFIL_FIN_DE_MES if t.tm_mday > ultimo_dia - self.dias_fin_de_mes else self.PERFIL_NORMAL
+        return perfil, (t.tm_hour * 60 + t.tm_min) // self.minutos_franja
+
+    def _iniciar_franja(self, ahora: float):
+        self._franja_actual = self._clave_franja(ahora)
+        self._inicio_franja = ahora
+        self._nivel_inicio_franja = self._nivel.copy()
+
+    def _cerrar_franja(self, ahora: float):
+        """Actualiza la franja que termina con la tasa media observada en ella."""
+        duracion_min = (ahora - self._inicio_franja) / 60.0
+        # Una franja observada solo en parte (arranque, corte de servicio) no es representativa.
+        if duracion_min < self.minutos_franja / 2 or duracion_min > self.minutos_franja * 2:
+            return
+        perfil, franja = self._franja_actual
+        tasa = (self._nivel - self._nivel_inicio_franja) / duracion_min
+        peso = self.peso_dia_estacional if self._dias_observados[perfil, franja] else 1.0
+        self._estacional[perfil, franja] = peso * tasa + (1.0 - peso) * self._estacional[perfil, franja]
+        self._dias_observados[perfil, franja] += 1
+
+    def _tasa_estacional(self, ahora: float):
+        """Tasa estacional media de las franjas del horizonte con suficientes días observados, o None."""
+        claves = {self._clave_franja(ahora + 60.0 * m) for m in self._minutos_del_horizonte()}
+        aprendidas: List[Tuple[int, int]] = [
+            c for c in claves if self._dias_observados[c] >= self.dias_minimos_estacional
+        ]
+        if not aprendidas:
+            return None
+        perfiles, franjas = zip(*aprendidas)
+        return self._estacional[list(perfiles), list(franjas)].mean(axis=0)
+
+    def _minutos_del_horizonte(self) -> List[float]:
+        pasos = max(int(math.ceil(self.horizonte_min / self.minutos_franja)), 1)
+        return [min(i * self.minutos_franja, self.horizonte_min) for i in range(pasos + 1)]
+
+    # --- Series por robot ---
+
+    def _vector(self, carga: Dict[int, int]):
+        x = self._np.zeros(self._capacidad)
+        for robot_id, tickets in carga.items():
+            x[self._indices[robot_id]] = tickets
+        # Los robots que no aparecen en la muestra no tienen tickets pendientes.
+        return x
+
+    def _asegurar_robots(self, carga: Dict[int, int]) -> List[int]:
+        """Asigna una columna a cada robot nuevo y retorna sus índices."""
+        np = self._np
+        nuevos = []
+        for robot_id in carga:
+            if robot_id not in self._indices:
+                self._indices[robot_id] = len(self._indices)
+                nuevos.append(self._indices[robot_id])
+        if len(self._indices) <= self._capacidad:
+            return nuevos
+
+        capacidad = max(len(self._indices), 2 * self._capacidad, 16)
+        extra = capacidad - self._capacidad
+        self._nivel = np.concatenate([self._nivel, np.zeros(extra)])
+        self._tendencia = np.concatenate([self._tendencia, np.zeros(extra)])
+        self._nivel_inicio_franja = np.concatenate([self._nivel_inicio_franja, np.zeros(extra)])
+        self._estacional = np.concatenate([self._estacional, np.zeros((2, self.franjas_por_dia, extra))], axis=2)
+        self._capacidad = capacidad
+        return nuevos
@@ -1,165 +1,163 @@
 # SAM/src/sam/balanceador/service/proveedores.py
+import asyncio
 import logging
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Set, Tuple
 
 from sam.common.database import DatabaseConnector
 
 from .clouders_client import CloudersClient
+from .indice_robots import IndiceRobots
 
 logger = logging.getLogger(__name__)
 
+_MOTIVOS_DESCARTE = ("NO_EXISTE", "INACTIVO", "NO_ONLINE")
+
 
 class CargaProveedorBase(ABC):
     """Interfaz para todos los proveedores de carga."""
 
+    indice_robots: IndiceRobots
+    # (nombre de robot en el origen, motivo) ya avisados como WARNING.
+    _descartes_avisados: Set[Tuple[str, str]]
+
     @abstractmethod
     def obtener_carga(self) -> Dict[int, int]:
         raise NotImplementedError
 
-    @staticmethod
-    def get_nombre() -> str:
-        raise NotImplementedError
-
-
-class CloudersProveedor(CargaProveedorBase):
-    """Proveedor de carga que obtiene datos desde la API de Clouders."""
+    async def obtener_carga_async(self) -> Dict[int, int]:
+        """
+        Obtiene la carga sin bloquear el event loop. A diferencia de obtener_carga, debe
+        propagar los errores, para que el consolidador pueda usar el último resultado bueno.
+        Por defecto ejecuta obtener_carga en un hilo.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.obtener_carga)
 
-    def __init__(self, db_sam: DatabaseConnector, mapa_robots: Dict[str, str], **kwargs):
-        self.clouders_client = CloudersClient()
-        self.mapa_robots_config = mapa_robots
-        self.mapa_completo_robots_sam = self._obtener_mapa_completo_robots(db_sam)
+    async def close(self):
+        """Libera los recursos del proveedor (clientes HTTP, etc.)."""
 
     @staticmethod
     def get_nombre() -> str:
-        return "clouders"
-
-    def _obtener_mapa_completo_robots(self, db_sam: DatabaseConnector) -> Dict[str, Dict[str, Any]]:
-        """
-        Obtiene un mapa de TODOS los robots en SAM con su estado.
-        Esto permite un diagnóstico y logging mucho más precisos.
-        """
-        query = "SELECT RobotId, Robot, Activo, EsOnline FROM dbo.Robots;"
-        try:
-            robots_db = db_sam.ejecutar_consulta(query, es_select=True) or []
-            # Se usa strip() para limpiar posibles espacios en blanco en los nombres
-            return {r["Robot"].strip(): {"id": r["RobotId"], "activo": r["Activo"], "es_online": r["EsOnline"]} for r in robots_db}
-        except Exception as e:
-            logger.error(f"Error fatal al construir el mapa de robots de SAM: {e}", exc_info=True)
-            return {}
+        raise NotImplementedError
 
-    def obtener_carga(self) -> Dict[int, int]:
+    def _mapear_carga(self, items: List[Dict[str, Any]], campo_nombre: str) -> Dict[int, int]:
         """
-        Obtiene la carga desde Clouders, la mapea y la valida contra el estado en SAM.
+        Traduce los nombres de robot del origen a RobotId de SAM con el índice compartido
+        y acumula los tickets, descartando los robots que no existen, están inactivos o
+        no son online. Cada descarte se avisa como WARNING la primera vez y luego como DEBUG,
+        para no repetirlo en cada muestra; si el robot vuelve a mapearse, un nuevo descarte
+        se avisa otra vez.
         """
-        logger.info(f"Proveedor '{self.get_nombre()}': Obteniendo carga de trabajo...")
-        carga_cruda = self.clouders_client.obtener_tickets_pendientes()
         carga_final = {}
-
-        for item in carga_cruda:
-            nombre_original = item.get("robot_name", "").strip()
+        for item in items:
+            nombre_original = item.get(campo_nombre, "").strip()
             if not nombre_original:
                 continue
 
             cantidad_tickets = item.get("CantidadTickets", 0)
-            nombre_mapeado = self.mapa_robots_config.get(nombre_original, nombre_original).strip()
-
-            robot_info = self.mapa_completo_robots_sam.get(nombre_mapeado)
+            robot = self.indice_robots.buscar(nombre_original)
 
             # --- LÓGICA DE VALIDACIÓN EXPLÍCITA ---
-            if not robot_info:
-                logger.warning(
-                    f"Proveedor '{self.get_nombre()}': Robot '{nombre_mapeado}' (mapeado desde '{nombre_original}') "
-                    f"NO EXISTE en la tabla dbo.Robots y será ignorado."
+            if not robot:
+                self._avisar_descarte(
+                    (nombre_original, "NO_EXISTE"),
+                    f"Proveedor '{self.get_nombre()}': Robot '{nombre_original}' "
+                    f"NO EXISTE en la tabla dbo.Robots (ni como alias en MAPA_ROBOTS) y será ignorado.",
                 )
                 continue
 
-            if not robot_info.get("activo"):
-                logger.warning(
-                    f"Proveedor '{self.get_nombre()}': Robot '{nombre_mapeado}' (RobotId: {robot_info['id']}) "
-                    f"existe pero está INACTIVO (Activo=0) y será ignorado."
+            if not robot.activo:
+                self._avisar_descarte(
+                    (nombre_original, "INACTIVO"),
+                    f"Proveedor '{self.get_nombre()}': Robot '{robot.nombre}' (RobotId: {robot.robot_id}) "
+                    f"existe pero está INACTIVO (Activo=0) y será ignorado.",
                 )
                 continue
 
-            if not robot_info.get("es_online"):
-                logger.warning(
-                    f"Proveedor '{self.get_nombre()}': Robot '{nombre_mapeado}' (RobotId: {robot_info['id']}) "
-                    f"existe pero NO ES ONLINE (EsOnline=0) y será ignorado."
+            if not robot.es_online:
+                self._avisar_descarte(
+                    (nombre_original, "NO_ONLINE"),
+                    f"Proveedor '{self.get_nombre()}': Robot '{robot.nombre}' (RobotId: {robot.robot_id}) "
+                    f"existe pero NO ES ONLINE (EsOnline=0) y será ignorado.",
                 )
                 continue
 
             # Si todas las validaciones pasan, el robot es un candidato válido.
-            robot_id = robot_info["id"]
-            carga_final[robot_id] = carga_final.get(robot_id, 0) + cantidad_tickets
+            if self._descartes_avisados:
+                for motivo in _MOTIVOS_DESCARTE:
+                    self._descartes_avisados.discard((nombre_original, motivo))
+            carga_final[robot.robot_id] = carga_final.get(robot.robot_id, 0) + cantidad_tickets
 
         return carga_final
 
+    def _avisar_descarte(self, clave: Tuple[str, str], mensaje: str):
+        if clave in self._descartes_avisados:
+            logger.debug(mensaje)
+            return
+        self._descartes_avisados.add(clave)
+        logger.warning(mensaje)
+
+
+class CloudersProveedor(CargaProveedorBase):
+    """Proveedor de carga que obtiene datos desde la API de Clouders."""
+
+    def __init__(self, indice_robots: IndiceRobots, **kwargs):
+        self.clouders_client = CloudersClient()
+        self.indice_robots = indice_robots
+        self._descartes_avisados = set()
+
+    @staticmethod
+    def get_nombre() -> str:
+        return "clouders"
+
+    def obtener_carga(self) -> Dict[int, int]:
+        """
+        Obtiene la carga desde Clouders, la mapea y la valida contra el estado en SAM.
+        """
+        logger.debug(f"Proveedor '{self.get_nombre()}': Obteniendo carga de trabajo...")
+        return self._mapear_carga(self.clouders_client.obtener_tickets_pendientes(), "robot_name")
+
+    async def obtener_carga_async(self) -> Dict[int, int]:
+        logger.debug(f"Proveedor '{self.get_nombre()}': Obteniendo carga de trabajo...")
+        return self._mapear_carga(await self.clouders_client.obtener_tickets_pendientes_async(), "robot_name")
+
+    async def close(self):
+        await self.clouders_client.close()
+
 
 class Rpa360Proveedor(CargaProveedorBase):
     """
     Proveedor de carga que obtiene datos desde una tabla en la BD de RPA360.
     """
 
-    def __init__(self, db_sam: DatabaseConnector, db_rpa360: DatabaseConnector, mapa_robots: Dict[str, str], **kwargs):
+    def __init__(self, db_rpa360: DatabaseConnector, indice_robots: IndiceRobots, **kwargs):
         self.db_rpa360 = db_rpa360
-        self.mapa_completo_robots_sam = self._obtener_mapa_completo_robots(db_sam)
-        self.mapa_robots_config = mapa_robots
+        self.indice_robots = indice_robots
+        self._descartes_avisados = set()
 
     @staticmethod
     def get_nombre() -> str:
         return "rpa360"
 
-    # Reutiliza el mismo método que Clouders para obtener el mapa completo.
-    _obtener_mapa_completo_robots = CloudersProveedor._obtener_mapa_completo_robots
-
-    def obtener_carga(self) -> Dict[int, int]:
-        logger.info(f"Proveedor '{self.get_nombre()}': Obteniendo carga de trabajo ejecutando SP...")
+    def _consultar_carga(self) -> Dict[int, int]:
+        logger.debug(f"Proveedor '{self.get_nombre()}': Obteniendo carga de trabajo ejecutando SP...")
         # Llama al Stored Procedure en lugar de una consulta directa.
         query = "EXEC dbo.usp_obtener_tickets_pendientes_por_robot;"
-        carga_final = {}
-        try:
-            resultados_db = self.db_rpa360.ejecutar_consulta(query, es_select=True) or []
-
-            for item in resultados_db:
-                nombre_original = item.get("Robot", "").strip()
-                if not nombre_original:
-                    continue
-
-                cantidad_tickets = item.get("CantidadTickets", 0)
-                nombre_mapeado = self.mapa_robots_config.get(nombre_original, nombre_original).strip()
-                robot_info = self.mapa_completo_robots_sam.get(nombre_mapeado)
-
-                # --- LÓGICA DE VALIDACIÓN EXPLÍCITA (replicada de Clouders) ---
-                if not robot_info:
-                    logger.warning(
-                        f"Proveedor '{self.get_nombre()}': Robot '{nombre_mapeado}' (mapeado desde '{nombre_original}') "
-                        f"NO EXISTE en la tabla dbo.Robots y será ignorado."
-                    )
-                    continue
-
-                if not robot_info.get("activo"):
-                    logger.warning(
-                        f"Proveedor '{self.get_nombre()}': Robot '{nombre_mapeado}' (RobotId: {robot_info['id']}) "
-                        f"existe pero está INACTIVO (Activo=0) y será ignorado."
-                    )
-                    continue
-
-                if not robot_info.get("es_online"):
-                    logger.warning(
-                        f"Proveedor '{self.get_nombre()}': Robot '{nombre_mapeado}' (RobotId: {robot_info['id']}) "
-                        f"existe pero NO ES ONLINE (EsOnline=0) y será ignorado."
-                    )
-                    continue
-
-                robot_id = robot_info["id"]
-                carga_final[robot_id] = carga_final.get(robot_id, 0) + cantidad_tickets
-
-            return carga_final
+        resultados_db = self.db_rpa360.ejecutar_consulta(query, es_select=True) or []
+        return self._mapear_carga(resultados_db, "Robot")
 
+    def obtener_carga(self) -> Dict[int, int]:
+        try:
+            return self._consultar_carga()
         except Exception as e:
             logger.error(f"Proveedor '{self.get_nombre()}': Error al ejecutar la consulta de carga: {e}", exc_info=True)
             return {}
 
+    async def obtener_carga_async(self) -> Dict[int, int]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._consultar_carga)
+
 
 class ProveedorCargaFactory:
     _proveedores_registrados = {
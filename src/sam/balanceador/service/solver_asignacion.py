@@ -0,0 +1,224 @@
+# SAM/src/sam/balanceador/service/solver_asignacion.py
+
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RobotDemanda(NamedTuple):
+    robot_id: int
+    pool_id: Optional[int]
+    prioridad: int
+    necesidad: int
+    faltan_para_minimo: int = 0
+
+
+class EquipoCandidato(NamedTuple):
+    equipo_id: int
+    pool_id: Optional[int]
+    # True si el equipo fue liberado de otro robot en este mismo ciclo.
+    liberado_en_ciclo: bool = False
+
+
+class SolverAsignacion(ABC):
+    """
+    Decide qué equipos libres se asignan a qué robots en una fase del balanceo.
+    Recibe solo robots habilitados para ampliar (ya filtrados por enfriamiento) y
+    retorna pares (RobotId, EquipoId); no toca la base de datos ni el estado.
+    """
+
+    nombre = ""
+
+    @abstractmethod
+    def resolver(self, robots: List[RobotDemanda], equipos: List[EquipoCandidato]) -> List[Tuple[int, int]]:
+        """Retorna las asignaciones a realizar, sin repetir equipos."""
+
+
+class SolverGreedy(SolverAsignacion):
+    """Atiende a los robots por PrioridadBalanceo, tomando los equipos libres en el orden recibido."""
+
+    nombre = "greedy"
+
+    def resolver(self, robots: List[RobotDemanda], equipos: List[EquipoCandidato]) -> List[Tuple[int, int]]:
+        libres = [e.equipo_id for e in equipos]
+        asignaciones = []
+        for robot in sorted(robots, key=lambda r: r.prioridad):
+            necesidad = robot.necesidad
+            while necesidad > 0 and libres:
+                asignaciones.append((robot.robot_id, libres.pop(0)))
+                necesidad -= 1
+        return asignaciones
+
+
+class SolverFlujoCostoMinimo(SolverAsignacion):
+    """
+    Resuelve la asignación como un flujo de costo mínimo (problema de transporte) con NumPy.
+
+    Cada robot aporta hasta dos tramos de demanda: los equipos que le faltan para llegar a
+    MinEquipos y el resto hasta su necesidad (ya acotada por MaxEquipos). El beneficio de
+    cubrir una unidad depende del tramo y de la PrioridadBalanceo, y se le restan los costos
+    del equipo: pertenecer a otro pool (afinidad) y haber sido liberado de otro robot en
+    este ciclo (movimiento), que es donde suelen fallar los despliegues inmediatos.
+
+    Los equipos se agrupan en clases (pool, liberado) con la misma estructura de costos,
+    así el grafo tiene (tramos x clases) aristas y no (robots x equipos).
+    """
+
+    nombre = "flujo"
+
+    PESO_TRAMO_MINIMO = 100_000.0
+    PESO_PRIORIDAD = 10.0
+    COSTO_OTRO_POOL = 1.0
+    COSTO_MOVIMIENTO = 3.0
+
+    def __init__(self):
+        try:
+            import numpy as np
+        except ImportError as e:
+            raise ImportError(
+                "El solver 'flujo' requiere NumPy. Instale el extra correspondiente: pip install sam[solver]"
+            ) from e
+        self._np = np
+
+    def resolver(self, robots: List[RobotDemanda], equipos: List[EquipoCandidato]) -> List[Tuple[int, int]]:
+        np = self._np
+        robots = [r for r in robots if r.necesidad > 0]
+        if not robots or not equipos:
+            return []
+
+        # --- Clases de equipos ---
+        clases: Dict[Tuple[Optional[int], bool], List[int]] = {}
+        for equipo in equipos:
+            clases.setdefault((equipo.pool_id, equipo.liberado_en_ciclo), []).append(equipo.equipo_id)
+        claves_clase = list(clases)
+        oferta = np.array([len(clases[c]) for c in claves_clase], dtype=np.int64)
+
+        # --- Tramos de demanda por robot ---
+        prioridad_max = max(r.prioridad for r in robots)
+        tramos_robot, capacidad, beneficio = [], [], []
+        for indice, robot in enumerate(robots):
+            peso_prioridad = (prioridad_max - robot.prioridad + 1) * self.PESO_PRIORIDAD
+            minimo = min(max(robot.faltan_para_minimo, 0), robot.necesidad)
+            if minimo > 0:
+                tramos_robot.append(indice)
+                capacidad.append(minimo)
+                beneficio.append(self.PESO_TRAMO_MINIMO + peso_prioridad)
+            if robot.necesidad - minimo > 0:
+                tramos_robot.append(indice)
+                capacidad.append(robot.necesidad - minimo)
+                beneficio.append(peso_prioridad)
+        capacidad = np.array(capacidad, dtype=np.int64)
+        beneficio = np.array(beneficio, dtype=np.float64)
+
+        pool_tramo = np.array([robots[i].pool_id if robots[i].pool_id is not None else -1 for i in tramos_robot])
+        pool_clase = np.array([c[0] if c[0] is not None else -1 for c in claves_clase])
+        liberada = np.array([c[1] for c in claves_clase], dtype=bool)
+        costo = (
+            np.where(pool_tramo[:, None] != pool_clase[None, :], self.COSTO_OTRO_POOL, 0.0)
+            + np.where(liberada, self.COSTO_MOVIMIENTO, 0.0)[None, :]
+        )
+        # Costo de enviar una unidad del tramo g a la clase k: negativo si conviene.
+        peso = costo - beneficio[:, None]
+
+        flujo = self._flujo_costo_minimo(peso, capacidad, oferta)
+
+        # --- Traducción a equipos concretos, de la mayor a la menor prioridad ---
+        asignaciones = []
+        orden_tramos = sorted(range(len(tramos_robot)), key=lambda g: -beneficio[g])
+        for g in orden_tramos:
+            robot_id = robots[tramos_robot[g]].robot_id
+            for k in np.nonzero(flujo[g])[0]:
+                equipos_clase = clases[claves_clase[k]]
+                for _ in range(int(flujo[g, k])):
+                    asignaciones.append((robot_id, equipos_clase.pop(0)))
+        return asignaciones
+
+    def _flujo_costo_minimo(self, peso, capacidad, oferta):
+        """
+        Caminos más cortos sucesivos sobre el grafo residual fuente -> tramos -> clases -> sumidero.
+        Las distancias se relajan por capas (Bellman-Ford vectorizado) y se aumenta por el
+        cuello de botella de cada camino mientras el camino tenga costo negativo.
+        """
+        np = self._np
+        n_tramos, n_clases = peso.shape
+        flujo = np.zeros((n_tramos, n_clases), dtype=np.int64)
+        salida = np.zeros(n_tramos, dtype=np.int64)
+        entrada = np.zeros(n_clases, dtype=np.int64)
+        inf = np.inf
+        max_iteraciones = 2 * (n_tramos + n_clases) + 2
+
+        while True:
+            dist_tramo = np.where(salida < capacidad, 0.0, inf)
+            pred_tramo = np.full(n_tramos, -1, dtype=np.int64)  # -1: viene de la fuente
+            dist_clase = np.full(n_clases, inf)
+            pred_clase = np.full(n_clases, -1, dtype=np.int64)
+
+            for _ in range(max_iteraciones):
+                # Aristas tramo -> clase (capacidad ilimitada).
+                candidatos = dist_tramo[:, None] + peso
+                mejor_tramo = np.argmin(candidatos, axis=0)
+                mejor_dist = candidatos[mejor_tramo, np.arange(n_clases)]
+                mejora_clase = mejor_dist < dist_clase - 1e-9
+                dist_clase = np.where(mejora_clase, mejor_dist, dist_clase)
+                pred_clase = np.where(mejora_clase, mejor_tramo, pred_clase)
+
+                # Aristas residuales clase -> tramo (deshacer flujo existente).
+                candidatos = np.where(flujo > 0, dist_clase[None, :] - peso, inf)
+                mejor_clase = np.argmin(candidatos, axis=1)
+                mejor_dist = candidatos[np.arange(n_tramos), mejor_clase]
+                mejora_tramo = mejor_dist < dist_tramo - 1e-9
+                dist_tramo = np.where(mejora_tramo, mejor_dist, dist_tramo)
+                pred_tramo = np.where(mejora_tramo, mejor_clase, pred_tramo)
+
+                if not mejora_clase.any() and not mejora_tramo.any():
+                    break
+
+            dist_sumidero = np.where(entrada < oferta, dist_clase, inf)
+            k_final = int(np.argmin(dist_sumidero))
+            if not dist_sumidero[k_final] < -1e-9:
+                return flujo
+
+            # Reconstruir el camino: (tramo, clase) hacia adelante y (clase, tramo) hacia atrás.
+            adelante, atras = [], []
+            k = k_final
+            while True:
+                g = int(pred_clase[k])
+                adelante.append((g, k))
+                k_previa = int(pred_tramo[g])
+                if k_previa == -1:
+                    break
+                atras.append((g, k_previa))
+                k = k_previa
+                if len(adelante) > n_tramos + n_clases:
+                    logger.error(
+                        "Ciclo inesperado al reconstruir el camino del solver de flujo. Se corta la optimización."
+                    )
+                    return flujo
+
+            g_inicial = adelante[-1][0]
+            delta = min(int(capacidad[g_inicial] - salida[g_inicial]), int(oferta[k_final] - entrada[k_final]))
+            for g, k in atras:
+                delta = min(delta, int(flujo[g, k]))
+            if delta <= 0:
+                return flujo
+
+            salida[g_inicial] += delta
+            entrada[k_final] += delta
+            for g, k in adelante:
+                flujo[g, k] += delta
+            for g, k in atras:
+                flujo[g, k] -= delta
+
+
+_SOLVERS = {SolverGreedy.nombre: SolverGreedy, SolverFlujoCostoMinimo.nombre: SolverFlujoCostoMinimo}
+
+
+def crear_solver(nombre: str) -> SolverAsignacion:
+    """Crea el solver configurado; si el nombre no existe se usa el greedy."""
+    clase = _SOLVERS.get((nombre or SolverGreedy.nombre).lower())
+    if clase is None:
+        logger.warning(f"Solver de balanceo '{nombre}' desconocido. Se usará '{SolverGreedy.nombre}'.")
+        clase = SolverGreedy
+    return clase()
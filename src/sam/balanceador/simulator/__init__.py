@@ -0,0 +1,19 @@
+"""
+Simulador fuera de línea del balanceador: ejecuta Balanceo sobre una flota sintética o
+reconstruida desde dbo.HistoricoBalanceo, sin tocar la base de datos de producción.
+"""
+
+from .db_en_memoria import DatabaseConnectorEnMemoria
+from .flota import FlotaSimulada, cargar_flota_desde_historico, generar_flota_sintetica
+from .simulador import RelojSimulado, ReporteSimulacion, ResultadoCiclo, Simulador
+
+__all__ = [
+    "DatabaseConnectorEnMemoria",
+    "FlotaSimulada",
+    "ReporteSimulacion",
+    "RelojSimulado",
+    "ResultadoCiclo",
+    "Simulador",
+    "cargar_flota_desde_historico",
+    "generar_flota_sintetica",
+]
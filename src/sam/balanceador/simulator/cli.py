@@ -0,0 +1,92 @@
+# SAM/src/sam/balanceador/simulator/cli.py
+"""
+Uso:
+    python -m sam.balanceador.simulator --robots 500 --ciclos 60 --solver flujo
+    python -m sam.balanceador.simulator --historico --desde 2025-10-01T08:00 --hasta 2025-10-01T20:00
+"""
+
+import argparse
+import json
+import logging
+import sys
+from datetime import datetime
+
+from .flota import cargar_flota_desde_historico, generar_flota_sintetica
+from .simulador import Simulador
+
+
+def _crear_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Simula el balanceador de SAM sobre una flota sintética o histórica.")
+    parser.add_argument("--robots", type=int, default=100, help="Robots de la flota sintética.")
+    parser.add_argument(
+        "--equipos", type=int, default=None, help="Equipos de la flota sintética (por defecto, 3 por robot)."
+    )
+    parser.add_argument("--pools", type=int, default=5, help="Pools dedicados de la flota sintética.")
+    parser.add_argument("--ciclos", type=int, default=30, help="Ciclos a simular.")
+    parser.add_argument("--semilla", type=int, default=0, help="Semilla de la flota sintética.")
+    parser.add_argument(
+        "--historico", action="store_true", help="Reproduce la carga registrada en dbo.HistoricoBalanceo."
+    )
+    parser.add_argument("--desde", type=datetime.fromisoformat, help="Inicio del período histórico (ISO 8601).")
+    parser.add_argument("--hasta", type=datetime.fromisoformat, help="Fin del período histórico (ISO 8601).")
+    parser.add_argument("--solver", default="greedy", help="Solver de asignación (greedy o flujo).")
+    parser.add_argument("--cooling", type=int, default=300, help="Período de enfriamiento en segundos.")
+    parser.add_argument("--intervalo", type=int, default=120, help="Segundos simulados entre ciclos.")
+    parser.add_argument("--sin-aislamiento", action="store_true", help="Permite el desborde hacia el Pool General.")
+    parser.add_argument("--sin-cache", action="store_true", help="Lee el estado completo en cada ciclo.")
+    parser.add_argument("--detalle", action="store_true", help="Muestra los resultados de cada ciclo.")
+    parser.add_argument("--json", action="store_true", help="Imprime el resumen en JSON.")
+    return parser
+
+
+def _cargar_flota_historica(args):
+    from sam.common.config_loader import ConfigLoader
+    from sam.common.config_manager import ConfigManager
+    from sam.common.database import DatabaseConnector
+
+    if not args.desde or not args.hasta:
+        raise SystemExit("--historico requiere --desde y --hasta.")
+    if not ConfigLoader.is_initialized():
+        ConfigLoader.initialize_service("balanceador")
+    cfg_sql_sam = ConfigManager.get_sql_server_config("SQL_SAM")
+    db_connector = DatabaseConnector(
+        servidor=cfg_sql_sam["servidor"],
+        base_datos=cfg_sql_sam["base_datos"],
+        usuario=cfg_sql_sam["usuario"],
+        contrasena=cfg_sql_sam["contrasena"],
+    )
+    try:
+        return cargar_flota_desde_historico(db_connector, args.desde, args.hasta, args.intervalo)
+    finally:
+        db_connector.cerrar_conexiones_pool()
+
+
+def main(argv=None):
+    """Punto de entrada de línea de comandos del simulador."""
+    args = _crear_parser().parse_args(argv)
+    # El algoritmo registra advertencias por robot en cada ciclo, que ocultarían el reporte.
+    logging.basicConfig(level=logging.ERROR, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    if args.historico:
+        flota = _cargar_flota_historica(args)
+    else:
+        flota = generar_flota_sintetica(args.robots, args.equipos, args.pools, args.ciclos, args.semilla)
+
+    config = {
+        "solver": args.solver,
+        "cooling_period_seg": args.cooling,
+        "intervalo_ciclo_seg": args.intervalo,
+        "aislamiento_estricto_pool": not args.sin_aislamiento,
+        "cache_estado": not args.sin_cache,
+    }
+    reporte = Simulador(flota, config).ejecutar(args.ciclos if not args.historico else None)
+
+    if args.json:
+        print(json.dumps(reporte.resumen(), indent=2))
+    else:
+        print(reporte.a_texto(detalle=args.detalle))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+# SAM/src/sam/balanceador/simulator/db_en_memoria.py
+
+import logging
+import re
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseConnectorEnMemoria:
+    """
+    Sustituto en memoria de DatabaseConnector que responde solo las consultas que emiten
+    Balanceo y EstadoBalanceoCache sobre dbo.Robots, dbo.Equipos y dbo.Asignaciones,
+    incluido dbo.AplicarPlanBalanceo. Cualquier otra consulta lanza NotImplementedError,
+    para que un cambio en el algoritmo no quede simulado en silencio con datos falsos.
+
+    Cada fila lleva su propia VersionFila, de modo que el refresco incremental de la
+    caché de estado se ejercita igual que contra SQL Server.
+    """
+
+    def __init__(self, robots: List[Dict[str, Any]], equipos: List[Dict[str, Any]], asignaciones: List[Dict[str, Any]]):
+        self._version = 0
+        self._robots = {r["RobotId"]: self._versionar(dict(r)) for r in robots}
+        self._equipos = {e["EquipoId"]: self._versionar(dict(e)) for e in equipos}
+        self._asignaciones = {(a["RobotId"], a["EquipoId"]): self._versionar(dict(a)) for a in asignaciones}
+        self.historico: List[Tuple] = []
+        self.consultas_ejecutadas = 0
+
+    def _versionar(self, fila: Dict[str, Any]) -> Dict[str, Any]:
+        self._version += 1
+        fila["VersionFila"] = self._version
+        return fila
+
+    @property
+    def asignaciones(self) -> List[Dict[str, Any]]:
+        return [dict(a) for a in self._asignaciones.values()]
+
+    def actualizar_robot(self, robot_id: int, **campos) -> None:
+        """Modifica una fila de dbo.Robots, como lo haría un cambio de configuración durante la simulación."""
+        self._versionar(self._robots[robot_id]).update(campos)
+
+    def ejecutar_consulta(self, query: str, params: Optional[tuple] = None, es_select: bool = True) -> Any:
+        self.consultas_ejecutadas += 1
+        consulta = " ".join(query.split())
+
+        if "dbo.AplicarPlanBalanceo" in consulta:
+            return self._aplicar_plan(params[0])
+        if "MIN_ACTIVE_ROWVERSION" in consulta:
+            return [self._control()]
+        if consulta.startswith("INSERT INTO dbo.HistoricoBalanceo"):
+            self.historico.append(tuple(params or ()))
+            return 1
+
+        coincidencia = re.search(r"FROM dbo\.(Robots|Equipos|Asignaciones)\b(.*)$", consulta)
+        if not coincidencia or not es_select:
+            raise NotImplementedError(f"Consulta no soportada por el conector en memoria: {consulta[:120]}")
+
+        tabla, filtro = coincidencia.groups()
+        filas = {"Robots": self._robots, "Equipos": self._equipos, "Asignaciones": self._asignaciones}[tabla].values()
+        if "VersionFila >= ?" in filtro:
+            filas = [f for f in filas if f["VersionFila"] >= params[0]]
+        if "Activo = 1" in filtro:
+            filas = [f for f in filas if f.get("Activo")]
+        if "Activo_SAM = 1" in filtro:
+            filas = [f for f in filas if f.get("Activo_SAM") and f.get("PermiteBalanceoDinamico")]
+        return [dict(f) for f in filas]
+
+    @contextmanager
+    def obtener_cursor(self):
+        yield _CursorEnMemoria(self)
+
+    def _control(self) -> Dict[str, Any]:
+        return {
+            "Marca": self._version + 1,
+            "FilasRobots": len(self._robots),
+            "SumaRobots": sum(self._robots),
+            "FilasEquipos": len(self._equipos),
+            "SumaEquipos": sum(self._equipos),
+            "FilasAsignaciones": len(self._asignaciones),
+            "SumaAsignaciones": sum(r * 100003 + e for r, e in self._asignaciones),
+        }
+
+    def _aplicar_plan(self, filas_plan: List[Tuple[int, int, str, str]]) -> List[Dict[str, int]]:
+        # Misma semántica que el MERGE de dbo.AplicarPlanBalanceo.
+        agregadas = quitadas = 0
+        for robot_id, equipo_id, accion, _motivo in filas_plan:
+            clave = (robot_id, equipo_id)
+            actual = self._asignaciones.get(clave)
+            if accion == "QUITAR" and actual and not actual.get("EsProgramado") and not actual.get("Reservado"):
+                del self._asignaciones[clave]
+                quitadas += 1
+            elif accion == "AGREGAR" and actual is None:
+                self._asignaciones[clave] = self._versionar(
+                    {"RobotId": robot_id, "EquipoId": equipo_id, "EsProgramado": False, "Reservado": False}
+                )
+                agregadas += 1
+        return [{"Agregadas": agregadas, "Quitadas": quitadas}]
+
+
+class _CursorEnMemoria:
+    """Cursor mínimo para el INSERT en lote del histórico (`executemany` con fast_executemany)."""
+
+    def __init__(self, db: DatabaseConnectorEnMemoria):
+        self._db = db
+        self.fast_executemany = False
+
+    def executemany(self, query: str, params_list: List[tuple]) -> None:
+        consulta = " ".join(query.split())
+        if not consulta.startswith("INSERT INTO dbo.HistoricoBalanceo"):
+            raise NotImplementedError(f"Consulta múltiple no soportada por el conector en memoria: {consulta[:120]}")
+        self._db.historico.extend(tuple(p) for p in params_list)
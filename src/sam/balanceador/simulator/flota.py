@@ -0,0 +1,192 @@
+# SAM/src/sam/balanceador/simulator/flota.py
+
+import logging
+import math
+import random
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class FlotaSimulada:
+    """
+    Flota sobre la que corre una simulación: filas de dbo.Robots, dbo.Equipos y dbo.Pools,
+    las asignaciones iniciales y la carga (tickets pendientes por robot) de cada ciclo.
+    """
+
+    def __init__(
+        self,
+        robots: List[Dict[str, Any]],
+        equipos: List[Dict[str, Any]],
+        pools: List[Dict[str, Any]],
+        carga_por_ciclo: List[Dict[int, int]],
+        asignaciones: Optional[List[Dict[str, Any]]] = None,
+        origen: str = "sintetica",
+    ):
+        self.robots = robots
+        self.equipos = equipos
+        self.pools = pools
+        self.carga_por_ciclo = carga_por_ciclo
+        self.asignaciones = asignaciones or []
+        self.origen = origen
+
+    @property
+    def ciclos(self) -> int:
+        return len(self.carga_por_ciclo)
+
+    def descripcion(self) -> str:
+        return (
+            f"Flota {self.origen}: {len(self.robots)} robots, {len(self.equipos)} equipos, "
+            f"{len(self.pools)} pools, {self.ciclos} ciclos"
+        )
+
+
+def generar_flota_sintetica(
+    robots: int = 100,
+    equipos: Optional[int] = None,
+    pools: int = 5,
+    ciclos: int = 30,
+    semilla: int = 0,
+    fraccion_pool_general: float = 0.2,
+) -> FlotaSimulada:
+    """
+    Genera una flota reproducible para una semilla dada. La carga de cada robot sigue una
+    onda diaria con ruido y ráfagas ocasionales; una parte de los robots no tiene carga.
+
+    Args:
+        robots: Cantidad de robots.
+        equipos: Cantidad de equipos (por defecto, tres por robot).
+        pools: Cantidad de pools dedicados, además del Pool General.
+        ciclos: Cantidad de ciclos de balanceo a simular.
+        semilla: Semilla del generador aleatorio.
+        fraccion_pool_general: Fracción de robots y equipos que quedan en el Pool General.
+    """
+    rnd = random.Random(semilla)
+    equipos = equipos if equipos is not None else robots * 3
+    pool_ids = list(range(1, pools + 1))
+
+    def elegir_pool() -> Optional[int]:
+        if not pool_ids or rnd.random() < fraccion_pool_general:
+            return None
+        return rnd.choice(pool_ids)
+
+    filas_robots = []
+    for robot_id in range(1, robots + 1):
+        minimo = rnd.choice((0, 1, 1, 2))
+        filas_robots.append(
+            {
+                "RobotId": robot_id,
+                "Robot": f"SIM_ROBOT_{robot_id:05d}",
+                "Activo": True,
+                "EsOnline": rnd.random() < 0.9,
+                "MinEquipos": minimo,
+                "MaxEquipos": minimo + rnd.randint(1, 10),
+                "PrioridadBalanceo": rnd.randint(1, 100),
+                "TicketsPorEquipoAdicional": rnd.choice((5, 10, 20, 50)),
+                "PoolId": elegir_pool(),
+            }
+        )
+
+    filas_equipos = [
+        {
+            "EquipoId": 10_000 + i,
+            "PoolId": elegir_pool(),
+            "Activo_SAM": True,
+            "PermiteBalanceoDinamico": rnd.random() < 0.95,
+        }
+        for i in range(1, equipos + 1)
+    ]
+
+    perfiles = []
+    for _ in filas_robots:
+        inactivo = rnd.random() < 0.2
+        perfiles.append((0 if inactivo else rnd.randint(5, 200), rnd.uniform(0, 2 * math.pi), rnd.randint(20, 720)))
+
+    carga_por_ciclo = []
+    for ciclo in range(ciclos):
+        carga = {}
+        for robot, (base, fase, periodo) in zip(filas_robots, perfiles):
+            if base == 0:
+                continue
+            nivel = base * (1 + 0.6 * math.sin(2 * math.pi * ciclo / periodo + fase)) * rnd.uniform(0.8, 1.2)
+            if rnd.random() < 0.02:
+                nivel *= rnd.uniform(2, 5)
+            tickets = int(nivel)
+            if tickets > 0:
+                carga[robot["RobotId"]] = tickets
+        carga_por_ciclo.append(carga)
+
+    filas_pools = [{"PoolId": pool_id, "Nombre": f"SIM_POOL_{pool_id}"} for pool_id in pool_ids]
+    return FlotaSimulada(filas_robots, filas_equipos, filas_pools, carga_por_ciclo)
+
+
+def cargar_flota_desde_historico(
+    db_connector, desde: datetime, hasta: datetime, intervalo_seg: int = 120
+) -> FlotaSimulada:
+    """
+    Reconstruye la carga de un período pasado a partir de dbo.HistoricoBalanceo, sobre la
+    configuración actual de robots, equipos y pools.
+
+    El histórico solo tiene una fila cuando el balanceador tomó una decisión sobre un robot,
+    así que los tickets de cada robot se mantienen entre una fila y la siguiente. Las
+    asignaciones dinámicas empiezan vacías; las programadas y reservadas se copian tal cual.
+
+    Args:
+        db_connector: Conector a la base de datos de SAM (solo lectura).
+        desde: Inicio del período, inclusive.
+        hasta: Fin del período, exclusive.
+        intervalo_seg: Duración de cada ciclo simulado.
+    """
+    robots = (
+        db_connector.ejecutar_consulta(
+            "SELECT RobotId, Robot, Activo, EsOnline, MinEquipos, MaxEquipos, PrioridadBalanceo, TicketsPorEquipoAdicional, PoolId FROM dbo.Robots",
+            es_select=True,
+        )
+        or []
+    )
+    equipos = (
+        db_connector.ejecutar_consulta(
+            "SELECT EquipoId, PoolId, Activo_SAM, PermiteBalanceoDinamico FROM dbo.Equipos", es_select=True
+        )
+        or []
+    )
+    pools = (
+        db_connector.ejecutar_consulta("SELECT PoolId, Nombre FROM dbo.Pools WHERE Activo = 1;", es_select=True) or []
+    )
+    asignaciones_fijas = (
+        db_connector.ejecutar_consulta(
+            "SELECT RobotId, EquipoId, EsProgramado, Reservado FROM dbo.Asignaciones WHERE EsProgramado = 1 OR Reservado = 1",
+            es_select=True,
+        )
+        or []
+    )
+    historico = (
+        db_connector.ejecutar_consulta(
+            """
+        SELECT FechaBalanceo, RobotId, TicketsPendientes
+        FROM dbo.HistoricoBalanceo
+        WHERE FechaBalanceo >= ? AND FechaBalanceo < ?
+        ORDER BY FechaBalanceo, HistoricoId
+        """,
+            (desde, hasta),
+            es_select=True,
+        )
+        or []
+    )
+
+    ciclos = max(math.ceil((hasta - desde).total_seconds() / intervalo_seg), 0)
+    cambios_por_ciclo: List[Dict[int, int]] = [{} for _ in range(ciclos)]
+    for fila in historico:
+        ciclo = int((fila["FechaBalanceo"] - desde).total_seconds() // intervalo_seg)
+        if 0 <= ciclo < ciclos:
+            cambios_por_ciclo[ciclo][fila["RobotId"]] = fila["TicketsPendientes"]
+
+    carga_por_ciclo = []
+    vigente: Dict[int, int] = {}
+    for cambios in cambios_por_ciclo:
+        vigente.update(cambios)
+        carga_por_ciclo.append({robot_id: tickets for robot_id, tickets in vigente.items() if tickets > 0})
+
+    logger.info(f"Histórico reconstruido: {len(historico)} filas en {ciclos} ciclos de {intervalo_seg}s.")
+    return FlotaSimulada(robots, equipos, pools, carga_por_ciclo, asignaciones_fijas, origen="historica")
@@ -0,0 +1,146 @@
+# SAM/src/sam/balanceador/simulator/simulador.py
+
+import logging
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from sam.balanceador.service.algoritmo_balanceo import Balanceo
+from sam.balanceador.service.cooling_manager import CoolingManager
+
+from .db_en_memoria import DatabaseConnectorEnMemoria
+from .flota import FlotaSimulada
+
+logger = logging.getLogger(__name__)
+
+
+class RelojSimulado:
+    """Reloj que solo avanza cuando el simulador pasa al ciclo siguiente."""
+
+    def __init__(self, inicio: float = 0.0):
+        self._ahora = inicio
+
+    def ahora(self) -> float:
+        return self._ahora
+
+    def avanzar(self, segundos: float) -> None:
+        self._ahora += segundos
+
+
+class ResultadoCiclo(NamedTuple):
+    ciclo: int
+    agregadas: int
+    quitadas: int
+    duracion_ms: float
+    demanda_insatisfecha: int
+    equipos_asignados: int
+
+    @property
+    def churn(self) -> int:
+        return self.agregadas + self.quitadas
+
+
+class ReporteSimulacion:
+    """Resultados por ciclo de una simulación y sus totales."""
+
+    def __init__(self, flota: FlotaSimulada, config: Dict[str, Any], ciclos: List[ResultadoCiclo]):
+        self.flota = flota
+        self.config = config
+        self.ciclos = ciclos
+
+    def resumen(self) -> Dict[str, Any]:
+        n = len(self.ciclos) or 1
+        duraciones = sorted(c.duracion_ms for c in self.ciclos) or [0.0]
+        return {
+            "robots": len(self.flota.robots),
+            "equipos": len(self.flota.equipos),
+            "ciclos": len(self.ciclos),
+            "solver": self.config.get("solver", "greedy"),
+            "agregadas": sum(c.agregadas for c in self.ciclos),
+            "quitadas": sum(c.quitadas for c in self.ciclos),
+            "churn_por_ciclo": round(sum(c.churn for c in self.ciclos) / n, 2),
+            "duracion_media_ms": round(sum(duraciones) / len(duraciones), 2),
+            "duracion_p95_ms": round(duraciones[min(int(len(duraciones) * 0.95), len(duraciones) - 1)], 2),
+            "duracion_max_ms": round(duraciones[-1], 2),
+            "demanda_insatisfecha_media": round(sum(c.demanda_insatisfecha for c in self.ciclos) / n, 2),
+            "demanda_insatisfecha_final": self.ciclos[-1].demanda_insatisfecha if self.ciclos else 0,
+        }
+
+    def a_texto(self, detalle: bool = False) -> str:
+        lineas = [self.flota.descripcion()]
+        if detalle:
+            lineas.append(f"{'Ciclo':>6} {'Agreg.':>7} {'Quit.':>6} {'ms':>9} {'Insatisf.':>10} {'Asignados':>10}")
+            for c in self.ciclos:
+                lineas.append(
+                    f"{c.ciclo:>6} {c.agregadas:>7} {c.quitadas:>6} {c.duracion_ms:>9.2f} "
+                    f"{c.demanda_insatisfecha:>10} {c.equipos_asignados:>10}"
+                )
+        lineas.extend(f"  {clave}: {valor}" for clave, valor in self.resumen().items())
+        return "\n".join(lineas)
+
+
+class Simulador:
+    """
+    Ejecuta Balanceo ciclo a ciclo sobre una FlotaSimulada, sin base de datos real.
+    El enfriamiento usa un reloj simulado que avanza `intervalo_ciclo_seg` por ciclo,
+    así los resultados no dependen de cuánto tarda la simulación.
+    """
+
+    CONFIG_POR_DEFECTO = {
+        "cooling_period_seg": 300,
+        "intervalo_ciclo_seg": 120,
+        "aislamiento_estricto_pool": True,
+        "solver": "greedy",
+        "cache_estado": True,
+        # El histórico se escribe fuera del ciclo; se habilita para auditar una simulación puntual.
+        "historico_habilitado": False,
+    }
+
+    def __init__(self, flota: FlotaSimulada, config_balanceador: Optional[Dict[str, Any]] = None):
+        self.flota = flota
+        self.config = {**self.CONFIG_POR_DEFECTO, **(config_balanceador or {})}
+        self.db = DatabaseConnectorEnMemoria(flota.robots, flota.equipos, flota.asignaciones)
+        self.reloj = RelojSimulado()
+        self.algoritmo = Balanceo(db_connector=self.db, notificador=None, config_balanceador=self.config)
+        self.algoritmo.cooling_manager = CoolingManager(self.config["cooling_period_seg"], reloj=self.reloj.ahora)
+        self._config_robots = {r["RobotId"]: r for r in flota.robots if r.get("Activo")}
+        self._ciclo = 0
+
+    def ejecutar_ciclo(self) -> ResultadoCiclo:
+        carga = {rid: t for rid, t in self.flota.carga_por_ciclo[self._ciclo].items() if t > 0}
+        self.reloj.avanzar(self.config["intervalo_ciclo_seg"])
+
+        inicio = time.perf_counter()
+        plan = self.algoritmo.ejecutar_algoritmo_completo(carga, self.flota.pools)
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+
+        resultado = ResultadoCiclo(
+            ciclo=self._ciclo,
+            agregadas=len(plan.agregar),
+            quitadas=len(plan.quitar),
+            duracion_ms=duracion_ms,
+            demanda_insatisfecha=self._demanda_insatisfecha(carga),
+            equipos_asignados=len(self.db.asignaciones),
+        )
+        self._ciclo += 1
+        return resultado
+
+    def ejecutar(self, ciclos: Optional[int] = None) -> ReporteSimulacion:
+        total = min(ciclos, self.flota.ciclos) if ciclos is not None else self.flota.ciclos
+        logger.info(f"Simulando {total} ciclos. {self.flota.descripcion()}.")
+        resultados = [self.ejecutar_ciclo() for _ in range(total)]
+        self.algoritmo.cerrar()
+        return ReporteSimulacion(self.flota, self.config, resultados)
+
+    def _demanda_insatisfecha(self, carga: Dict[int, int]) -> int:
+        """Equipos que faltan, sumados sobre los robots con carga, según la misma regla del algoritmo."""
+        asignados: Dict[int, int] = {}
+        for a in self.db.asignaciones:
+            asignados[a["RobotId"]] = asignados.get(a["RobotId"], 0) + 1
+        faltantes = 0
+        for robot_id, tickets in carga.items():
+            rcfg = self._config_robots.get(robot_id)
+            if not rcfg or not rcfg.get("EsOnline"):
+                continue
+            necesarios = self.algoritmo._calcular_equipos_necesarios_para_robot(robot_id, tickets, rcfg)
+            faltantes += max(necesarios - asignados.get(robot_id, 0), 0)
+        return faltantes
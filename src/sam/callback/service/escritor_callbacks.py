@@ -0,0 +1,152 @@
+# sam/callback/service/escritor_callbacks.py
+import asyncio
+import logging
+import uuid
+from typing import Any, Dict, List, Optional
+
+from sam.common.database import AsyncDatabaseConnector, UpdateStatus
+from sam.common.diario_persistente import DiarioPersistenteDeProceso
+
+logger = logging.getLogger(__name__)
+
+
+class EscritorCallbacks:
+    """
+    Cola en proceso para el modo de ingesta diferida de callbacks.
+
+    El endpoint solo valida, anota el callback en un diario local y responde; una
+    tarea de fondo aplica los callbacks acumulados en una única transacción cada
+    `intervalo_ms` milisegundos, o antes si se juntan `lote_max` callbacks. Lo que
+    quede en el diario al caer el proceso se aplica al volver a iniciar.
+
+    Con varios workers cada proceso tiene su propio diario (ver DiarioPersistenteDeProceso)
+    y al iniciar adopta los de procesos terminados, así ningún callback se aplica dos veces
+    por reinicio ni se pierde por la reescritura del diario de otro worker.
+    """
+
+    MAX_INTENTOS = 5
+
+    def __init__(self, db_connector: AsyncDatabaseConnector, intervalo_ms: int, lote_max: int, ruta_diario: str):
+        """
+        Args:
+            db_connector: Conector asíncrono a la base de datos de SAM.
+            intervalo_ms: Tiempo máximo que un callback espera en la cola antes de volcarse.
+            lote_max: Cantidad de callbacks que dispara un volcado anticipado.
+            ruta_diario: Ruta base del diario local; cada proceso usa `<nombre>.<pid><sufijo>`.
+        """
+        self._db_connector = db_connector
+        self._intervalo = max(intervalo_ms, 1) / 1000
+        self._lote_max = max(lote_max, 1)
+        self._diario = DiarioPersistenteDeProceso(ruta_diario, campo_clave="Id")
+        self._lock = asyncio.Lock()
+        self._lote_lleno = asyncio.Event()
+        self._tarea: Optional[asyncio.Task] = None
+        self._intentos: Dict[str, int] = {}
+
+        self._pendientes: List[Dict[str, Any]] = self._diario.leer() + self._diario.adoptar_huerfanos()
+        if self._pendientes:
+            logger.warning(f"Se recuperaron {len(self._pendientes)} callbacks sin aplicar de una ejecución anterior.")
+
+    @property
+    def cantidad_pendientes(self) -> int:
+        return len(self._pendientes)
+
+    def iniciar(self) -> None:
+        if self._tarea is None:
+            self._tarea = asyncio.create_task(self._bucle_volcado(), name="EscritorCallbacks")
+            logger.info(
+                f"Escritor de callbacks iniciado (intervalo: {self._intervalo * 1000:.0f} ms, lote: {self._lote_max})."
+            )
+
+    async def detener(self) -> None:
+        """Detiene la tarea de fondo y vuelca lo que quede en la cola."""
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+        while self._pendientes and await self.volcar():
+            pass
+        self._diario.cerrar()
+
+    async def encolar(self, deployment_id: str, estado_callback: str, callback_payload_str: str) -> None:
+        """Anota el callback en el diario y lo deja en cola. No toca la base de datos."""
+        registro = {
+            "Id": uuid.uuid4().hex,
+            "DeploymentId": deployment_id,
+            "Estado": estado_callback,
+            "CallbackInfo": callback_payload_str,
+        }
+        await self._diario.agregar_async([registro])
+        self._pendientes.append(registro)
+        if len(self._pendientes) >= self._lote_max:
+            self._lote_lleno.set()
+
+    async def _bucle_volcado(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._lote_lleno.wait(), timeout=self._intervalo)
+            except asyncio.TimeoutError:
+                pass
+            self._lote_lleno.clear()
+            try:
+                await self.volcar()
+            except Exception as e:
+                logger.error(f"Error inesperado al volcar callbacks: {e}", exc_info=True)
+            if len(self._pendientes) >= self._lote_max:
+                self._lote_lleno.set()
+
+    async def volcar(self) -> int:
+        """
+        Aplica hasta `lote_max` callbacks pendientes en una sola transacción. Si el lote
+        falla, se reintenta de a uno; los que sigan fallando se reintentan en el próximo
+        volcado hasta MAX_INTENTOS veces. Si fallan todos, se asume que la base no está
+        disponible y se conservan sin contar el intento.
+        """
+        async with self._lock:
+            lote, self._pendientes = self._pendientes[: self._lote_max], self._pendientes[self._lote_max :]
+            if not lote:
+                return 0
+
+            parametros = [(r["DeploymentId"], r["Estado"], r["CallbackInfo"]) for r in lote]
+            try:
+                resultados = await self._db_connector.actualizar_ejecuciones_desde_callback_lote(parametros)
+            except Exception as e:
+                logger.error(f"Error al aplicar un lote de {len(lote)} callbacks. Reintentando de a uno: {e}")
+                resultados = []
+                for deployment_id, estado, payload in parametros:
+                    resultados.append(
+                        await self._db_connector.actualizar_ejecucion_desde_callback(deployment_id, estado, payload)
+                    )
+
+            if all(resultado == UpdateStatus.ERROR for resultado in resultados):
+                self._pendientes = lote + self._pendientes
+                return 0
+
+            confirmados, reintentar = [], []
+            for registro, resultado in zip(lote, resultados):
+                if resultado != UpdateStatus.ERROR:
+                    if resultado == UpdateStatus.NOT_FOUND:
+                        logger.warning(
+                            f"DeploymentId '{registro['DeploymentId']}' no fue encontrado en la base de datos."
+                        )
+                    confirmados.append(registro)
+                    continue
+                intentos = self._intentos.get(registro["Id"], 0) + 1
+                if intentos >= self.MAX_INTENTOS:
+                    logger.error(
+                        f"Se descarta el callback de {registro['DeploymentId']} tras {intentos} intentos fallidos."
+                    )
+                    confirmados.append(registro)
+                else:
+                    self._intentos[registro["Id"]] = intentos
+                    reintentar.append(registro)
+
+            for registro in confirmados:
+                self._intentos.pop(registro["Id"], None)
+            self._pendientes = reintentar + self._pendientes
+            await self._diario.confirmar_async([r["Id"] for r in confirmados])
+            logger.debug(f"Volcados {len(confirmados)} de {len(lote)} callbacks. Pendientes: {len(self._pendientes)}.")
+            return len(confirmados)
@@ -11,9 +11,11 @@ from pydantic import BaseModel, Field
 
 from sam.common.config_loader import ConfigLoader
 from sam.common.config_manager import ConfigManager
-from sam.common.database import DatabaseConnector, UpdateStatus
+from sam.common.database import AsyncDatabaseConnector, DatabaseConnector, UpdateStatus
 from sam.common.logging_setup import setup_logging
 
+from .escritor_callbacks import EscritorCallbacks
+
 logger = logging.getLogger(__name__)
 
 
@@ -47,14 +49,28 @@ async def lifespan(app: FastAPI):
         usuario=sql_config["usuario"],
         contrasena=sql_config["contrasena"],
     )
-    app_state["db_connector"] = db_connector
+    app_state["db_connector"] = AsyncDatabaseConnector(db_connector)
     logger.info("DatabaseConnector creado y disponible.")
 
+    callback_config = ConfigManager.get_callback_server_config()
+    if callback_config["modo_ingesta"] == "cola":
+        escritor = EscritorCallbacks(
+            db_connector=app_state["db_connector"],
+            intervalo_ms=callback_config["cola_intervalo_ms"],
+            lote_max=callback_config["cola_lote_max"],
+            ruta_diario=callback_config["cola_archivo"],
+        )
+        escritor.iniciar()
+        app_state["escritor_callbacks"] = escritor
+
     yield
 
     logger.info("Cerrando recursos del worker...")
+    escritor = app_state.pop("escritor_callbacks", None)
+    if escritor:
+        await escritor.detener()
     if "db_connector" in app_state:
-        app_state["db_connector"].cerrar_conexiones_pool()
+        app_state["db_connector"].cerrar()
 
 
 app = FastAPI(
@@ -65,13 +81,17 @@ app = FastAPI(
 )
 
 
-def get_db() -> DatabaseConnector:
+def get_db() -> AsyncDatabaseConnector:
     db = app_state.get("db_connector")
     if db is None:
         raise HTTPException(status_code=503, detail="La conexión a la base de datos no está disponible.")
     return db
 
 
+def get_escritor_callbacks() -> Optional[EscritorCallbacks]:
+    return app_state.get("escritor_callbacks")
+
+
 async def verify_api_key(x_authorization: str = Header(...)):
     server_api_key = ConfigManager.get_callback_server_config().get("token", "")
     if not hmac.compare_digest(server_api_key, x_authorization):
@@ -85,11 +105,24 @@ async def verify_api_key(x_authorization: str = Header(...)):
     response_model=SuccessResponse,
     dependencies=[Depends(verify_api_key)],
 )
-async def handle_callback(payload: CallbackPayload, db: DatabaseConnector = Depends(get_db)):
+async def handle_callback(
+    payload: CallbackPayload,
+    db: AsyncDatabaseConnector = Depends(get_db),
+    escritor: Optional[EscritorCallbacks] = Depends(get_escritor_callbacks),
+):
     logger.info(f"Callback recibido para DeploymentId: {payload.deployment_id} con estado: {payload.status}")
     try:
+        if escritor is not None:
+            # Modo cola: se confirma la recepción y el escritor de fondo actualiza la BD.
+            await escritor.encolar(
+                deployment_id=payload.deployment_id,
+                estado_callback=payload.status,
+                callback_payload_str=payload.model_dump_json(by_alias=True),
+            )
+            return SuccessResponse(message="Callback recibido y encolado para su procesamiento.")
+
         # CORRECCIÓN: Usar model_dump_json(by_alias=True) para que el JSON guardado use camelCase
-        update_result = db.actualizar_ejecucion_desde_callback(
+        update_result = await db.actualizar_ejecucion_desde_callback(
             deployment_id=payload.deployment_id,
             estado_callback=payload.status,
             callback_payload_str=payload.model_dump_json(by_alias=True),
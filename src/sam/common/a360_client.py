@@ -1,8 +1,9 @@
 # common/a360_client.py
 import asyncio
+import copy
 import logging
 import re
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 import httpx
 import urllib3
@@ -21,6 +22,14 @@ class AutomationAnywhereClient:
     _ENDPOINT_FILES_LIST_V2 = "/v2/repository/workspaces/public/files/list"
 
     CONCILIADOR_BATCH_SIZE = 50  # Procesar de 50 en 50 para evitar timeouts
+    CONCILIADOR_BATCH_SIZE_MINIMO = 5  # Por debajo de este tamaño, un lote con timeout se omite
+
+    # Tamaño de página por endpoint; los listados livianos toleran páginas más grandes.
+    _TAMANO_PAGINA_POR_ENDPOINT = {
+        _ENDPOINT_USERS_LIST_V2: 200,
+        _ENDPOINT_DEVICES_LIST_V2: 200,
+        _ENDPOINT_FILES_LIST_V2: 100,
+    }
 
     def __init__(self, control_room_url: str, username: str, password: Optional[str] = None, **kwargs):
         self.url_base = control_room_url.strip("/")
@@ -29,6 +38,13 @@ class AutomationAnywhereClient:
         self.api_key = kwargs.get("api_key")
         self.api_timeout = kwargs.get("api_timeout_seconds", 60)
         self.callback_url_deploy = kwargs.get("callback_url_deploy")
+        self.page_size_default = kwargs.get("page_size_default") or 100
+        self.max_paginas = kwargs.get("max_paginas") or 1000
+        self.paginacion_concurrencia = max(kwargs.get("paginacion_concurrencia") or 4, 1)
+        self.tamano_pagina_por_endpoint = {**self._TAMANO_PAGINA_POR_ENDPOINT, **(kwargs.get("page_size_por_endpoint") or {})}
+        self.conciliador_concurrencia = max(kwargs.get("conciliador_concurrencia") or 4, 1)
+        # Tamaño de lote adaptativo: se reduce tras un timeout y se recupera en ciclos sin timeouts.
+        self._tamano_lote_conciliador = self.CONCILIADOR_BATCH_SIZE
 
         self._token: Optional[str] = None
         self._token_lock = asyncio.Lock()
@@ -114,27 +130,80 @@ class AutomationAnywhereClient:
                 # Si es otro error HTTP, simplemente lo relanzamos
                 raise
 
+    async def _solicitar_pagina(self, endpoint: str, payload: Dict, offset: int, page_size: int) -> Dict:
+        """Pide una página concreta sin modificar el payload compartido entre páginas."""
+        payload_pagina = copy.deepcopy(payload)
+        payload_pagina["page"] = {**payload_pagina.get("page", {}), "offset": offset, "length": page_size}
+        return await self._realizar_peticion_api("POST", endpoint, json=payload_pagina)
+
+    @staticmethod
+    def _extraer_total(response_json: Dict) -> Optional[int]:
+        """Lee el total de entidades que informa A360 en la sección `page` de la respuesta."""
+        page_info = response_json.get("page") or {}
+        total = page_info.get("totalFilter", page_info.get("total"))
+        try:
+            return int(total) if total is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    async def _iterar_entidades_paginadas(
+        self, endpoint: str, payload: Dict, page_size: Optional[int] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Generador asíncrono de las entidades de un endpoint paginado.
+
+        La primera página informa el total; el resto se pide en paralelo (hasta
+        `paginacion_concurrencia` peticiones a la vez) y cada página se entrega apenas
+        llega, sin esperar a las demás. Si la API no informa el total, se pagina en serie.
+        """
+        page_size = page_size or self.tamano_pagina_por_endpoint.get(endpoint, self.page_size_default)
+        primera_pagina = await self._solicitar_pagina(endpoint, payload, 0, page_size)
+        entidades = primera_pagina.get("list", [])
+        total = self._extraer_total(primera_pagina)
+
+        if total is None:
+            for entidad in entidades:
+                yield entidad
+            offset = page_size
+            paginas = 1
+            while len(entidades) >= page_size and paginas < self.max_paginas:
+                response_json = await self._solicitar_pagina(endpoint, payload, offset, page_size)
+                entidades = response_json.get("list", [])
+                for entidad in entidades:
+                    yield entidad
+                offset += page_size
+                paginas += 1
+            return
+
+        semaforo = asyncio.Semaphore(self.paginacion_concurrencia)
+
+        async def pedir(offset: int) -> Dict:
+            async with semaforo:
+                return await self._solicitar_pagina(endpoint, payload, offset, page_size)
+
+        # Las páginas restantes se lanzan antes de entregar la primera, para que
+        # estén en vuelo mientras el llamador procesa lo ya recibido.
+        offsets = list(range(page_size, total, page_size))[: max(self.max_paginas - 1, 0)]
+        tareas = [asyncio.create_task(pedir(offset)) for offset in offsets]
+        try:
+            for entidad in entidades:
+                yield entidad
+            for tarea_completada in asyncio.as_completed(tareas):
+                response_json = await tarea_completada
+                for entidad in response_json.get("list", []):
+                    yield entidad
+        finally:
+            # Si el llamador corta la iteración o una página falla, las pendientes se cancelan
+            # y se esperan, para no dejar tareas ni excepciones sin recoger en el event loop.
+            for tarea in tareas:
+                tarea.cancel()
+            await asyncio.gather(*tareas, return_exceptions=True)
+
     async def _obtener_lista_paginada_entidades(self, endpoint: str, payload: Dict) -> List[Dict]:
         """
         Obtiene todas las entidades de un endpoint que soporta paginación.
         """
-        lista_completa = []
-        offset = 0
-        page_size = 100
-        payload["page"] = payload.get("page", {})
-
-        while True:
-            payload["page"]["offset"] = offset
-            payload["page"]["length"] = page_size
-            response_json = await self._realizar_peticion_api("POST", endpoint, json=payload)
-            entidades_pagina = response_json.get("list", [])
-            if not entidades_pagina:
-                break
-            lista_completa.extend(entidades_pagina)
-            if len(entidades_pagina) < page_size:
-                break
-            offset += page_size
-
+        lista_completa = [entidad async for entidad in self._iterar_entidades_paginadas(endpoint, payload)]
         logger.info(f"Paginación: Se obtuvieron un total de {len(lista_completa)} entidades de {endpoint}.")
         return lista_completa
 
@@ -215,12 +284,11 @@ class AutomationAnywhereClient:
             },
             "sort": [{"field": "id", "direction": "desc"}],
         }
-        robots_api = await self._obtener_lista_paginada_entidades(self._ENDPOINT_FILES_LIST_V2, payload)
-
         expression = r"^P[A-Z0-9]*[0-9].*_.*"  # ^(P|CP)\S+[0-9]+_.+$
         patron_nombre = re.compile(expression)
         robots_mapeados = []
-        for bot in robots_api:
+        # Se filtra a medida que llegan las páginas, sin esperar el listado completo.
+        async for bot in self._iterar_entidades_paginadas(self._ENDPOINT_FILES_LIST_V2, payload):
             nombre = bot.get("name")
             if nombre and patron_nombre.match(nombre) and "loop" not in nombre.lower():
                 robots_mapeados.append(
@@ -230,38 +298,65 @@ class AutomationAnywhereClient:
         return robots_mapeados
 
     async def obtener_detalles_por_deployment_ids(self, deployment_ids: List[str]) -> List[Dict]:
-        """Obtiene detalles de deployments procesando los IDs en lotes para evitar timeouts."""
+        """
+        Obtiene detalles de deployments procesando los IDs en lotes concurrentes.
+        Un lote que excede el timeout se divide a la mitad en lugar de descartarse.
+        """
         if not deployment_ids:
             return []
-        all_details = []
+        tamano_lote = self._tamano_lote_conciliador
+        lotes = [deployment_ids[i : i + tamano_lote] for i in range(0, len(deployment_ids), tamano_lote)]
         logger.info(
-            f"Obteniendo detalles de {len(deployment_ids)} deployments en lotes de {self.CONCILIADOR_BATCH_SIZE}..."
+            f"Obteniendo detalles de {len(deployment_ids)} deployments en {len(lotes)} lotes de hasta {tamano_lote} "
+            f"(concurrencia: {self.conciliador_concurrencia})..."
         )
 
-        for i in range(0, len(deployment_ids), self.CONCILIADOR_BATCH_SIZE):
-            batch_ids = deployment_ids[i : i + self.CONCILIADOR_BATCH_SIZE]
-            logger.debug(f"Procesando lote {i // self.CONCILIADOR_BATCH_SIZE + 1} con {len(batch_ids)} IDs.")
-            payload = self._crear_filtro_deployment_ids(batch_ids)
-            # payload = {
-            #     "sort": [{"field": "startDateTime", "direction": "desc"}],
-            #     "filter": {
-            #         "operator": "or",
-            #         "operands": [{"operator": "eq", "field": "deploymentId", "value": dep_id} for dep_id in batch_ids],
-            #     },
-            # }
-            try:
+        semaforo = asyncio.Semaphore(self.conciliador_concurrencia)
+        resultados = await asyncio.gather(*(self._consultar_lote_deployments(lote, semaforo) for lote in lotes))
+        all_details = [detalle for resultado in resultados for detalle in resultado]
+
+        if self._tamano_lote_conciliador == tamano_lote and tamano_lote < self.CONCILIADOR_BATCH_SIZE:
+            self._tamano_lote_conciliador = min(tamano_lote + self.CONCILIADOR_BATCH_SIZE_MINIMO, self.CONCILIADOR_BATCH_SIZE)
+            logger.info(f"Sin timeouts en el ciclo. Tamaño de lote del conciliador ajustado a {self._tamano_lote_conciliador}.")
+
+        logger.info(f"Se obtuvieron detalles para {len(all_details)} de {len(deployment_ids)} deployments solicitados.")
+        return all_details
+
+    async def _consultar_lote_deployments(
+        self, batch_ids: List[str], semaforo: asyncio.Semaphore, reintentos_restantes: int = 1
+    ) -> List[Dict]:
+        """Consulta un lote; ante un timeout lo divide y ante otro error lo reintenta por separado."""
+        payload = self._crear_filtro_deployment_ids(batch_ids)
+        try:
+            # El semáforo se libera antes de dividir o reintentar, para no retener el cupo mientras se espera a los sub-lotes.
+            async with semaforo:
                 response_json = await self._realizar_peticion_api("POST", self._ENDPOINT_ACTIVITY_LIST_V3, json=payload)
-                all_details.extend(response_json.get("list", []))
-            except httpx.ReadTimeout as e:
+            return response_json.get("list", [])
+        except httpx.ReadTimeout:
+            if len(batch_ids) <= self.CONCILIADOR_BATCH_SIZE_MINIMO:
                 logger.error(
-                    f"Timeout ({self.api_timeout}s) al procesar un lote de {len(batch_ids)} deployment IDs. Lote omitido. IDs: {batch_ids}."
+                    f"Timeout ({self.api_timeout}s) al procesar un lote mínimo de {len(batch_ids)} deployment IDs. Lote omitido. IDs: {batch_ids}."
                 )
-            except Exception as e:
-                logger.error(
-                    f"Error al procesar un lote de deployment IDs. Lote omitido. Error: {e}", exc_info=True
-                )
-        logger.info(f"Se obtuvieron detalles para {len(all_details)} de {len(deployment_ids)} deployments solicitados.")
-        return all_details
+                return []
+            mitad = len(batch_ids) // 2
+            self._tamano_lote_conciliador = max(
+                self.CONCILIADOR_BATCH_SIZE_MINIMO, min(self._tamano_lote_conciliador, mitad)
+            )
+            logger.warning(
+                f"Timeout ({self.api_timeout}s) con un lote de {len(batch_ids)} deployment IDs. "
+                f"Se divide en dos y el tamaño de lote pasa a {self._tamano_lote_conciliador}."
+            )
+            mitades = await asyncio.gather(
+                self._consultar_lote_deployments(batch_ids[:mitad], semaforo, reintentos_restantes),
+                self._consultar_lote_deployments(batch_ids[mitad:], semaforo, reintentos_restantes),
+            )
+            return mitades[0] + mitades[1]
+        except Exception as e:
+            if reintentos_restantes > 0:
+                logger.warning(f"Error al procesar un lote de {len(batch_ids)} deployment IDs. Reintentando: {e}")
+                return await self._consultar_lote_deployments(batch_ids, semaforo, reintentos_restantes - 1)
+            logger.error(f"Error al procesar un lote de deployment IDs. Lote omitido. Error: {e}", exc_info=True)
+            return []
 
     async def desplegar_bot_v3(
         self,
@@ -2,6 +2,7 @@
 import json
 import logging
 import os
+import socket
 import sys
 from typing import Any, Dict, Optional
 
@@ -91,6 +92,12 @@ class ConfigManager:
             "max_retries": int(cls._get_env_with_warning(f"{prefix}_MAX_REINTENTOS_QUERY", 3)),
             "initial_delay": float(cls._get_env_with_warning(f"{prefix}_DELAY_REINTENTO_QUERY_BASE_SEG", 2)),
             "retryable_sqlstates": cls._get_env_with_warning(f"{prefix}_CODIGOS_SQLSTATE_REINTENTABLES", "40001,HYT00,HYT01,08S01").split(","),
+            "pool_min_size": int(cls._get_env_with_warning(f"{prefix}_POOL_MIN_CONEXIONES", 1)),
+            "pool_max_size": int(cls._get_env_with_warning(f"{prefix}_POOL_MAX_CONEXIONES", 10)),
+            "pool_timeout_espera": float(cls._get_env_with_warning(f"{prefix}_POOL_TIMEOUT_ESPERA_SEG", 30)),
+            "pool_max_inactividad": float(cls._get_env_with_warning(f"{prefix}_POOL_MAX_INACTIVIDAD_SEG", 300)),
+            "pool_vida_max_conexion": float(cls._get_env_with_warning(f"{prefix}_POOL_VIDA_MAX_CONEXION_SEG", 1800)),
+            "pool_validar_tras": float(cls._get_env_with_warning(f"{prefix}_POOL_VALIDAR_TRAS_SEG", 5)),
         }
 
     # --- CONFIGURACIONES ESPECÍFICAS POR SERVICIO ---
@@ -114,10 +121,24 @@ class ConfigManager:
             "intervalo_lanzamiento": int(cls._get_env_with_warning("LANZADOR_INTERVALO_LANZAMIENTO_SEG", 120)),
             "intervalo_sincronizacion": int(cls._get_env_with_warning("LANZADOR_INTERVALO_SINCRONIZACION_SEG", 3600)),
             "intervalo_conciliacion": int(cls._get_env_with_warning("LANZADOR_INTERVALO_CONCILIACION_SEG", 300)),
+            "motor_programaciones": cls._get_env_with_warning("LANZADOR_MOTOR_PROGRAMACIONES", "calendario").lower(),
+            "calendario_revision_seg": float(cls._get_env_with_warning("LANZADOR_CALENDARIO_REVISION_SEG", 60)),
+            "eventos_habilitado": cls._get_env_with_warning("LANZADOR_EVENTOS_HABILITADO", "False").lower() == "true",
+            "eventos_sondeo_seg": float(cls._get_env_with_warning("LANZADOR_EVENTOS_SONDEO_SEG", 2)),
+            "eventos_retencion_min": int(cls._get_env_with_warning("LANZADOR_EVENTOS_RETENCION_MIN", 60)),
             "pausa_lanzamiento": (pausa_inicio, pausa_fin),
             "max_workers_lanzador": int(cls._get_env_with_warning("LANZADOR_MAX_WORKERS", 10)),
             "conciliador_max_intentos_fallidos": int(cls._get_env_with_warning("CONCILIADOR_MAX_INTENTOS_FALLIDOS", 3)),
+            "conciliador_espera_inicial": int(cls._get_env_with_warning("CONCILIADOR_ESPERA_INICIAL_SEG", 120)),
+            "conciliador_intervalo_max": int(cls._get_env_with_warning("CONCILIADOR_INTERVALO_MAX_SEG", 1800)),
+            "conciliador_duracion_por_defecto": int(cls._get_env_with_warning("CONCILIADOR_DURACION_POR_DEFECTO_SEG", 600)),
+            "conciliador_max_consultas_por_ciclo": int(cls._get_env_with_warning("CONCILIADOR_MAX_CONSULTAS_POR_CICLO", 500)),
             "parametros_default": default_params,
+            "lote_registro_ejecuciones": int(cls._get_env_with_warning("LANZADOR_LOTE_REGISTRO_EJECUCIONES", 50)),
+            "archivo_ejecuciones_pendientes": cls._get_env_with_warning(
+                "LANZADOR_ARCHIVO_EJECUCIONES_PENDIENTES",
+                os.path.join(cls.get_log_config()["directory"], "sam_lanzador_ejecuciones_pendientes.jsonl"),
+            ),
         }
 
     @classmethod
@@ -125,11 +146,57 @@ class ConfigManager:
         """Obtiene la configuración específica para el servicio Balanceador."""
         return {
             "cooling_period_seg": int(cls._get_env_with_warning("BALANCEADOR_COOLING_PERIOD_SEG", 300)),
+            "cooling_backend": cls._get_env_with_warning("BALANCEADOR_COOLING_BACKEND", "memoria").lower(),
+            "cooling_archivo": cls._get_env_with_warning(
+                "BALANCEADOR_COOLING_ARCHIVO", os.path.join(cls.get_log_config()["directory"], "sam_balanceador_enfriamiento.json")
+            ),
             "intervalo_ciclo_seg": int(cls._get_env_with_warning("BALANCEADOR_INTERVALO_CICLO_SEG", 120)),
+            "espera_cierre_seg": float(cls._get_env_with_warning("BALANCEADOR_ESPERA_CIERRE_SEG", 30)),
+            "modo_disparo": cls._get_env_with_warning("BALANCEADOR_MODO_DISPARO", "intervalo").lower(),
+            "muestreo_seg": float(cls._get_env_with_warning("BALANCEADOR_MUESTREO_SEG", 30)),
+            "disparo_umbral_tickets": int(cls._get_env_with_warning("BALANCEADOR_DISPARO_UMBRAL_TICKETS", 5)),
+            "disparo_umbral_relativo": float(cls._get_env_with_warning("BALANCEADOR_DISPARO_UMBRAL_RELATIVO", 0.2)),
+            "disparo_antirrebote_seg": float(cls._get_env_with_warning("BALANCEADOR_DISPARO_ANTIRREBOTE_SEG", 5)),
+            "disparo_intervalo_min_seg": float(cls._get_env_with_warning("BALANCEADOR_DISPARO_INTERVALO_MIN_SEG", 15)),
             "aislamiento_estricto_pool": cls._get_env_with_warning("BALANCEADOR_POOL_AISLAMIENTO_ESTRICTO", "True").lower() == "true",
             "proveedores_carga": [p.strip() for p in cls._get_env_with_warning("BALANCEADOR_PROVEEDORES_CARGA", "clouders,rpa360").split(",")],
+            "proveedores_timeout_seg": float(cls._get_env_with_warning("BALANCEADOR_PROVEEDORES_TIMEOUT_SEG", 20)),
+            "proveedores_timeouts": cls._get_timeouts_proveedores(),
+            "indice_robots_refresco_seg": float(cls._get_env_with_warning("BALANCEADOR_INDICE_ROBOTS_REFRESCO_SEG", 60)),
+            "carga_max_antiguedad_seg": float(cls._get_env_with_warning("BALANCEADOR_CARGA_MAX_ANTIGUEDAD_SEG", 600)),
+            "solver": cls._get_env_with_warning("BALANCEADOR_SOLVER", "greedy").lower(),
+            "ampliacion_completa_por_ciclo": cls._get_env_with_warning("BALANCEADOR_AMPLIACION_COMPLETA_POR_CICLO", "False").lower() == "true",
+            "cache_estado": cls._get_env_with_warning("BALANCEADOR_CACHE_ESTADO", "True").lower() == "true",
+            "cache_recarga_completa_seg": int(cls._get_env_with_warning("BALANCEADOR_CACHE_RECARGA_COMPLETA_SEG", 3600)),
+            "coordinacion": cls._get_env_with_warning("BALANCEADOR_COORDINACION", "ninguna").lower(),
+            "instancia": cls._get_env_with_warning("BALANCEADOR_INSTANCIA", f"{socket.gethostname()}:{os.getpid()}"),
+            "arrendamiento_ttl_seg": float(cls._get_env_with_warning("BALANCEADOR_ARRENDAMIENTO_TTL_SEG", 60)),
+            "historico_habilitado": cls._get_env_with_warning("BALANCEADOR_HISTORICO_HABILITADO", "True").lower() == "true",
+            "historico_capacidad": int(cls._get_env_with_warning("BALANCEADOR_HISTORICO_CAPACIDAD", 10000)),
+            "historico_lote": int(cls._get_env_with_warning("BALANCEADOR_HISTORICO_LOTE", 500)),
+            "historico_politica": cls._get_env_with_warning("BALANCEADOR_HISTORICO_POLITICA", "descartar").lower(),
+            "pronostico_habilitado": cls._get_env_with_warning("BALANCEADOR_PRONOSTICO_HABILITADO", "False").lower() == "true",
+            "pronostico_horizonte_min": float(cls._get_env_with_warning("BALANCEADOR_PRONOSTICO_HORIZONTE_MIN", 15)),
+            "pronostico_constante_nivel_min": float(cls._get_env_with_warning("BALANCEADOR_PRONOSTICO_CONSTANTE_NIVEL_MIN", 2)),
+            "pronostico_constante_tendencia_min": float(cls._get_env_with_warning("BALANCEADOR_PRONOSTICO_CONSTANTE_TENDENCIA_MIN", 10)),
+            "pronostico_minutos_franja": int(cls._get_env_with_warning("BALANCEADOR_PRONOSTICO_MINUTOS_FRANJA", 15)),
+            "pronostico_dias_fin_de_mes": int(cls._get_env_with_warning("BALANCEADOR_PRONOSTICO_DIAS_FIN_DE_MES", 2)),
         }
 
+    @classmethod
+    def _get_timeouts_proveedores(cls) -> Dict[str, float]:
+        """Plazos por proveedor de carga, como JSON en BALANCEADOR_PROVEEDORES_TIMEOUTS (ej. {"rpa360": 30})."""
+        timeouts_str = cls._get_env_with_warning("BALANCEADOR_PROVEEDORES_TIMEOUTS", "{}")
+        try:
+            timeouts = json.loads(timeouts_str)
+            if not isinstance(timeouts, dict):
+                logger.warning("BALANCEADOR_PROVEEDORES_TIMEOUTS no es un diccionario JSON válido. Se ignorará.")
+                return {}
+            return {str(nombre).strip(): float(valor) for nombre, valor in timeouts.items()}
+        except (json.JSONDecodeError, TypeError, ValueError):
+            logger.error("Error al decodificar BALANCEADOR_PROVEEDORES_TIMEOUTS. Se usará el plazo por defecto.", exc_info=True)
+            return {}
+
     @classmethod
     def get_callback_server_config(cls) -> Dict[str, Any]:
         """Obtiene la configuración para el servidor de Callbacks."""
@@ -141,6 +208,12 @@ class ConfigManager:
             "auth_mode": cls._get_env_with_warning("CALLBACK_AUTH_MODE", "strict").lower(),
             "public_host": cls._get_env_with_warning("CALLBACK_SERVER_PUBLIC_HOST", os.getenv("CALLBACK_SERVER_HOST", "localhost")),
             "endpoint_path": cls._get_env_with_warning("CALLBACK_ENDPOINT_PATH", "/api/callback").strip("/"),
+            "modo_ingesta": cls._get_env_with_warning("CALLBACK_MODO_INGESTA", "sincrono").lower(),
+            "cola_intervalo_ms": int(cls._get_env_with_warning("CALLBACK_COLA_INTERVALO_MS", 200)),
+            "cola_lote_max": int(cls._get_env_with_warning("CALLBACK_COLA_LOTE_MAX", 200)),
+            "cola_archivo": cls._get_env_with_warning(
+                "CALLBACK_COLA_ARCHIVO", os.path.join(cls.get_log_config()["directory"], "sam_callback_cola.jsonl")
+            ),
         }
 
     @classmethod
@@ -192,6 +265,10 @@ class ConfigManager:
             "verify_ssl": cls._get_env_with_warning("AA_VERIFY_SSL", "false").lower() == "false",
             "api_timeout_seconds": int(cls._get_env_with_warning("AA_API_TIMEOUT_SECONDS", 60)),
             "callback_url_deploy": cls._get_env_with_warning("AA_URL_CALLBACK"),
+            "page_size_default": int(cls._get_env_with_warning("AA_DEFAULT_PAGE_SIZE", 100)),
+            "max_paginas": int(cls._get_env_with_warning("AA_MAX_PAGINATION_PAGES", 1000)),
+            "paginacion_concurrencia": int(cls._get_env_with_warning("AA_PAGINACION_CONCURRENCIA", 4)),
+            "conciliador_concurrencia": int(cls._get_env_with_warning("AA_CONCILIADOR_CONCURRENCIA", 4)),
         }
 
     @classmethod
@@ -1,9 +1,12 @@
 # src/sam/common/database.py
 # MODIFICADO: Se añade el método `cerrar_conexiones_pool` para el cierre limpio en FastAPI.
 
+import asyncio
+import functools
 import logging
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from datetime import datetime
 from datetime import time as time_obj
@@ -20,6 +23,36 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 
+# Estados en los que una ejecución ya no cambia.
+ESTADOS_FINALES_EJECUCION = ("COMPLETED", "RUN_COMPLETED", "RUN_FAILED", "DEPLOY_FAILED", "RUN_ABORTED", "UNKNOWN")
+_SQL_ESTADOS_FINALES = ", ".join(f"'{estado}'" for estado in ESTADOS_FINALES_EJECUCION)
+# Estados en los que la ejecución ocupa su equipo.
+ESTADOS_ACTIVOS_EJECUCION = ("DEPLOYED", "QUEUED", "PENDING_EXECUTION", "RUNNING", "UPDATE", "RUN_PAUSED")
+_SQL_ESTADOS_ACTIVOS = ", ".join(f"'{estado}'" for estado in ESTADOS_ACTIVOS_EJECUCION)
+
+# Un único lote: el UPDATE condicional evita la carrera con el conciliador entre la
+# lectura y la escritura, y el SELECT final distingue por qué no se actualizó.
+# Si el nuevo estado es final, el equipo liberado se anota en dbo.EventosLanzador (migración 8)
+# para que el lanzador lo reocupe sin esperar su próximo ciclo; sin la tabla, el aviso se omite.
+_SQL_ACTUALIZAR_DESDE_CALLBACK = f"""
+    SET NOCOUNT ON;
+    DECLARE @Actualizadas TABLE (EjecucionId INT, EquipoId INT, Estado NVARCHAR(50));
+    UPDATE dbo.Ejecuciones
+    SET Estado = ?, FechaFin = GETDATE(), FechaActualizacion = GETDATE(), CallbackInfo = ?
+    OUTPUT inserted.EjecucionId, inserted.EquipoId, inserted.Estado INTO @Actualizadas
+    WHERE DeploymentId = ? AND Estado NOT IN ({_SQL_ESTADOS_FINALES});
+    IF OBJECT_ID(N'dbo.EventosLanzador', N'U') IS NOT NULL
+        INSERT INTO dbo.EventosLanzador (EquipoId)
+        SELECT EquipoId FROM @Actualizadas
+        WHERE EquipoId IS NOT NULL AND Estado IN ({_SQL_ESTADOS_FINALES});
+    SELECT CASE
+        WHEN EXISTS (SELECT 1 FROM @Actualizadas) THEN 'UPDATED'
+        WHEN EXISTS (SELECT 1 FROM dbo.Ejecuciones WHERE DeploymentId = ?) THEN 'ALREADY_PROCESSED'
+        ELSE 'NOT_FOUND'
+    END;
+"""
+
+
 class UpdateStatus(Enum):
     UPDATED = 1
     ALREADY_PROCESSED = 2
@@ -27,7 +60,33 @@ class UpdateStatus(Enum):
     ERROR = 4
 
 
+class PoolAgotadoError(Exception):
+    """Se lanza cuando no se obtiene una conexión del pool dentro del tiempo de espera."""
+
+
+def es_error_de_conexion(error: BaseException) -> bool:
+    """True si el error indica que la BD no está disponible (SQLSTATE 08* o pool agotado), no un problema del dato."""
+    if isinstance(error, PoolAgotadoError):
+        return True
+    sqlstate = str(error.args[0]) if isinstance(error, pyodbc.Error) and error.args else ""
+    return sqlstate.startswith(DatabaseConnector._PREFIJO_SQLSTATE_CONEXION_ROTA)
+
+
+class _ConexionPool:
+    """Conexión pyodbc gestionada por el pool, con sus marcas de tiempo de vida y de uso."""
+
+    __slots__ = ("conn", "creada_en", "ultimo_uso")
+
+    def __init__(self, conn: pyodbc.Connection):
+        self.conn = conn
+        self.creada_en = time.monotonic()
+        self.ultimo_uso = self.creada_en
+
+
 class DatabaseConnector:
+    # SQLSTATE de clase 08 (errores de comunicación): la conexión ya no es reutilizable.
+    _PREFIJO_SQLSTATE_CONEXION_ROTA = "08"
+
     def __init__(
         self, servidor: str, base_datos: str, usuario: str, contrasena: str, db_config_prefix: str = "SQL_SAM"
     ):
@@ -46,25 +105,185 @@ class DatabaseConnector:
             "TrustServerCertificate=yes;"
             f"Timeout={sql_config['timeout']};"
         )
+        self.pool_min_size = sql_config["pool_min_size"]
+        self.pool_max_size = max(sql_config["pool_max_size"], 1)
+        self.pool_timeout_espera = sql_config["pool_timeout_espera"]
+        self.pool_max_inactividad = sql_config["pool_max_inactividad"]
+        self.pool_vida_max_conexion = sql_config["pool_vida_max_conexion"]
+        self.pool_validar_tras = sql_config["pool_validar_tras"]
+
         self._thread_local = threading.local()
-        self._pool = []
+        self._pool: List[_ConexionPool] = []
         self._pool_lock = threading.Lock()
+        self._pool_disponible = threading.Condition(self._pool_lock)
+        self._conexiones_abiertas = 0
+        self._conexiones_en_uso = 0
+        self._estadisticas_pool = {"esperas": 0, "timeouts": 0, "creaciones": 0, "descartes": 0}
+        self._precalentar_pool()
 
-    def _obtener_conexion_del_pool(self):
-        with self._pool_lock:
-            if not self._pool:
-                logger.info(f"Pool de conexiones vacío. Creando nueva conexión para {self.db_config_prefix}...")
-                return self.conectar_base_datos()
-            return self._pool.pop()
+    def _precalentar_pool(self):
+        """
+        Abre `pool_min_size` conexiones al construir el conector, para que las primeras
+        consultas no paguen el handshake. Un fallo no impide arrancar: el pool sigue creando
+        conexiones a demanda y el desalojo por inactividad conserva el mínimo.
+        """
+        objetivo = min(self.pool_min_size, self.pool_max_size)
+        entradas = []
+        for _ in range(objetivo):
+            try:
+                entradas.append(_ConexionPool(self.conectar_base_datos()))
+            except Exception as e:
+                logger.warning(
+                    f"No se pudo precalentar el pool de {self.db_config_prefix} "
+                    f"({len(entradas)} de {objetivo} conexiones abiertas): {e}"
+                )
+                break
+        if not entradas:
+            return
+        with self._pool_disponible:
+            self._pool.extend(entradas)
+            self._conexiones_abiertas += len(entradas)
+            self._estadisticas_pool["creaciones"] += len(entradas)
+            self._pool_disponible.notify(len(entradas))
+
+    def _reservar_conexion(self) -> Optional[_ConexionPool]:
+        """
+        Toma una conexión inactiva del pool o reserva un cupo para crear una nueva (retorna None).
+        Si el pool está agotado, espera hasta `pool_timeout_espera` segundos.
+        """
+        limite = time.monotonic() + self.pool_timeout_espera
+        with self._pool_disponible:
+            ha_esperado = False
+            while True:
+                vencidas = self._extraer_conexiones_vencidas()
+                if self._pool:
+                    entrada = self._pool.pop()
+                    self._conexiones_en_uso += 1
+                    break
+                if self._conexiones_abiertas < self.pool_max_size:
+                    self._conexiones_abiertas += 1
+                    self._conexiones_en_uso += 1
+                    entrada = None
+                    break
+
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    self._estadisticas_pool["timeouts"] += 1
+                    raise PoolAgotadoError(
+                        f"Pool de conexiones de {self.db_config_prefix} agotado ({self.pool_max_size} en uso) "
+                        f"tras esperar {self.pool_timeout_espera}s."
+                    )
+                if not ha_esperado:
+                    self._estadisticas_pool["esperas"] += 1
+                    ha_esperado = True
+                self._pool_disponible.wait(restante)
+
+        self._cerrar_conexiones(vencidas)
+        return entrada
+
+    def _extraer_conexiones_vencidas(self) -> List[_ConexionPool]:
+        """Retira del pool las conexiones inactivas o con vida excedida. Debe llamarse con el lock tomado."""
+        ahora = time.monotonic()
+        conservadas, vencidas = [], []
+        # El pool es LIFO: las conexiones más antiguas quedan al principio de la lista.
+        for entrada in self._pool:
+            inactiva = ahora - entrada.ultimo_uso > self.pool_max_inactividad
+            expirada = ahora - entrada.creada_en > self.pool_vida_max_conexion
+            quedan = len(self._pool) - len(vencidas)
+            if expirada or (inactiva and quedan > self.pool_min_size):
+                vencidas.append(entrada)
+            else:
+                conservadas.append(entrada)
+        if vencidas:
+            self._pool = conservadas
+            self._conexiones_abiertas -= len(vencidas)
+            self._estadisticas_pool["descartes"] += len(vencidas)
+            self._pool_disponible.notify(len(vencidas))
+        return vencidas
+
+    def _cerrar_conexiones(self, entradas: List[_ConexionPool]):
+        for entrada in entradas:
+            try:
+                entrada.conn.close()
+            except pyodbc.Error as e:
+                logger.debug(f"Error al cerrar una conexión descartada del pool: {e}")
+
+    def _conexion_sigue_viva(self, entrada: _ConexionPool) -> bool:
+        """Sondeo barato de vida, solo si la conexión estuvo inactiva más de `pool_validar_tras` segundos."""
+        if time.monotonic() - entrada.ultimo_uso < self.pool_validar_tras:
+            return True
+        cursor = None
+        try:
+            cursor = entrada.conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            return True
+        except pyodbc.Error as e:
+            logger.warning(f"Conexión del pool de {self.db_config_prefix} no responde y será descartada: {e}")
+            return False
+        finally:
+            if cursor:
+                try:
+                    cursor.close()
+                except pyodbc.Error:
+                    pass
+
+    def _obtener_conexion_del_pool(self) -> _ConexionPool:
+        while True:
+            entrada = self._reservar_conexion()
+            if entrada is None:
+                logger.info(f"Creando nueva conexión para el pool de {self.db_config_prefix}...")
+                try:
+                    entrada = _ConexionPool(self.conectar_base_datos())
+                except Exception:
+                    with self._pool_disponible:
+                        self._conexiones_abiertas -= 1
+                        self._conexiones_en_uso -= 1
+                        self._pool_disponible.notify()
+                    raise
+                with self._pool_lock:
+                    self._estadisticas_pool["creaciones"] += 1
+                return entrada
+            if self._conexion_sigue_viva(entrada):
+                return entrada
+            self._descartar_conexion(entrada)
+
+    def _devolver_conexion_al_pool(self, entrada: _ConexionPool):
+        entrada.ultimo_uso = time.monotonic()
+        expirada = entrada.ultimo_uso - entrada.creada_en > self.pool_vida_max_conexion
+        if expirada:
+            self._descartar_conexion(entrada)
+            return
+        with self._pool_disponible:
+            self._conexiones_en_uso -= 1
+            self._pool.append(entrada)
+            self._pool_disponible.notify()
 
-    def _devolver_conexion_al_pool(self, conn):
+    def _descartar_conexion(self, entrada: _ConexionPool):
+        self._cerrar_conexiones([entrada])
+        with self._pool_disponible:
+            self._conexiones_en_uso -= 1
+            self._conexiones_abiertas -= 1
+            self._estadisticas_pool["descartes"] += 1
+            self._pool_disponible.notify()
+
+    def obtener_estadisticas_pool(self) -> Dict[str, int]:
+        """Retorna una instantánea del estado del pool de conexiones."""
         with self._pool_lock:
-            self._pool.append(conn)
+            return {
+                "en_uso": self._conexiones_en_uso,
+                "inactivas": len(self._pool),
+                "abiertas": self._conexiones_abiertas,
+                "max": self.pool_max_size,
+                **self._estadisticas_pool,
+            }
 
     @contextmanager
     def obtener_cursor(self):
-        conn = self._obtener_conexion_del_pool()
+        entrada = self._obtener_conexion_del_pool()
+        conn = entrada.conn
         cursor = None
+        conexion_rota = False
         try:
             cursor = conn.cursor()
             yield cursor
@@ -72,17 +291,23 @@ class DatabaseConnector:
         except pyodbc.Error as ex:
             sqlstate = ex.args[0]
             logger.error(f"Error de base de datos (SQLSTATE: {sqlstate}): {ex}")
-            if conn:
-                try:
-                    conn.rollback()
-                except pyodbc.Error as rb_ex:
-                    logger.error(f"Error durante el rollback: {rb_ex}")
+            conexion_rota = str(sqlstate).startswith(self._PREFIJO_SQLSTATE_CONEXION_ROTA)
+            try:
+                conn.rollback()
+            except pyodbc.Error as rb_ex:
+                logger.error(f"Error durante el rollback: {rb_ex}")
+                conexion_rota = True
             raise
         finally:
             if cursor:
-                cursor.close()
-            if conn:
-                self._devolver_conexion_al_pool(conn)
+                try:
+                    cursor.close()
+                except pyodbc.Error:
+                    conexion_rota = True
+            if conexion_rota:
+                self._descartar_conexion(entrada)
+            else:
+                self._devolver_conexion_al_pool(entrada)
 
     def conectar_base_datos(self) -> pyodbc.Connection:
         try:
@@ -103,11 +328,12 @@ class DatabaseConnector:
 
     def cerrar_conexiones_pool(self):
         with self._pool_lock:
-            for conn in self._pool:
+            for entrada in self._pool:
                 try:
-                    conn.close()
+                    entrada.conn.close()
                 except pyodbc.Error as e:
                     logger.error(f"Error al cerrar una conexión del pool: {e}")
+            self._conexiones_abiertas -= len(self._pool)
             self._pool = []
             logger.info(f"Todas las conexiones en el pool para {self.db_config_prefix} han sido cerradas.")
 
@@ -162,6 +388,30 @@ class DatabaseConnector:
     def obtener_robots_ejecutables(self) -> List[Dict]:
         return self.ejecutar_consulta("{CALL dbo.ObtenerRobotsEjecutables}", es_select=True) or []
 
+    def obtener_equipos_ocupados(self) -> List[int]:
+        """Equipos con una ejecución activa (lo que ObtenerRobotsEjecutables considera ocupado)."""
+        query = f"SELECT DISTINCT EquipoId FROM dbo.Ejecuciones WHERE Estado IN ({_SQL_ESTADOS_ACTIVOS});"
+        return [fila["EquipoId"] for fila in self.ejecutar_consulta(query, es_select=True) or []]
+
+    def obtener_robots_online_disponibles(self, equipo_ids: Optional[List[int]] = None) -> List[Dict]:
+        """
+        Parte online de ObtenerRobotsEjecutables: asignaciones no programadas de robots online en equipos libres.
+        Con `equipo_ids` se limita a esos equipos.
+        """
+        filtro_equipos = f"AND A.EquipoId IN ({', '.join('?' for _ in equipo_ids)})" if equipo_ids else ""
+        query = f"""
+            SELECT R.RobotId, A.EquipoId, E.UserId, NULL AS Hora
+            FROM dbo.Robots R
+            INNER JOIN dbo.Asignaciones A ON R.RobotId = A.RobotId
+            INNER JOIN dbo.Equipos E ON A.EquipoId = E.EquipoId
+            WHERE R.EsOnline = 1 AND R.Activo = 1 AND A.EsProgramado = 0 {filtro_equipos}
+              AND NOT EXISTS (
+                  SELECT 1 FROM dbo.Ejecuciones Ej
+                  WHERE Ej.EquipoId = A.EquipoId AND Ej.Estado IN ({_SQL_ESTADOS_ACTIVOS})
+              );
+        """
+        return self.ejecutar_consulta(query, tuple(equipo_ids or ()), es_select=True) or []
+
     def insertar_registro_ejecucion(
         self, id_despliegue, db_robot_id, db_equipo_id, a360_user_id, marca_tiempo_programada, estado
     ):
@@ -172,10 +422,31 @@ class DatabaseConnector:
         params = (id_despliegue, db_robot_id, db_equipo_id, a360_user_id, marca_tiempo_programada, estado)
         self.ejecutar_consulta(query, params, es_select=False)
 
+    def insertar_registros_ejecucion(self, registros: List[tuple]) -> int:
+        """
+        Inserta varias ejecuciones en una sola llamada con `fast_executemany`.
+        Cada tupla es (DeploymentId, RobotId, EquipoId, UserId, Hora, Estado).
+        Es idempotente por DeploymentId y, a diferencia de `ejecutar_consulta_multiple`,
+        propaga el error para que el llamador decida cómo reintentar.
+        """
+        if not registros:
+            return 0
+        query = """
+            INSERT INTO dbo.Ejecuciones (DeploymentId, RobotId, EquipoId, UserId, Hora, Estado)
+            SELECT ?, ?, ?, ?, ?, ?
+            WHERE NOT EXISTS (SELECT 1 FROM dbo.Ejecuciones WHERE DeploymentId = ?);
+        """
+        params_list = [tuple(registro) + (registro[0],) for registro in registros]
+        with self.obtener_cursor() as cursor:
+            cursor.fast_executemany = True
+            cursor.executemany(query, params_list)
+        return len(params_list)
+
     def obtener_ejecuciones_en_curso(self) -> List[Dict]:
         return (
             self.ejecutar_consulta(
-                "SELECT EjecucionId, DeploymentId FROM dbo.Ejecuciones WHERE Estado NOT IN ('COMPLETED', 'RUN_COMPLETED', 'RUN_FAILED', 'DEPLOY_FAILED', 'RUN_ABORTED', 'UNKNOWN')",
+                "SELECT EjecucionId, DeploymentId, RobotId, FechaInicio, IntentosConciliadorFallidos FROM dbo.Ejecuciones "
+                f"WHERE Estado NOT IN ({_SQL_ESTADOS_FINALES})",
                 es_select=True,
             )
             or []
@@ -186,32 +457,32 @@ class DatabaseConnector:
     ) -> UpdateStatus:
         try:
             with self.obtener_cursor() as cursor:
-                # 1. Verificar el estado actual
-                cursor.execute("SELECT Estado FROM dbo.Ejecuciones WHERE DeploymentId = ?", (deployment_id,))
+                cursor.execute(
+                    _SQL_ACTUALIZAR_DESDE_CALLBACK,
+                    (estado_callback, callback_payload_str, deployment_id, deployment_id),
+                )
                 row = cursor.fetchone()
-                if not row:
-                    return UpdateStatus.NOT_FOUND
-
-                current_status = row[0]
-                if current_status in (
-                    "COMPLETED",
-                    "RUN_COMPLETED",
-                    "RUN_FAILED",
-                    "DEPLOY_FAILED",
-                    "RUN_ABORTED",
-                    "UNKNOWN",
-                ):
-                    return UpdateStatus.ALREADY_PROCESSED
-
-                # 2. Si no es un estado final, actualizar
-                query = "UPDATE dbo.Ejecuciones SET Estado = ?, FechaFin = GETDATE(), FechaActualizacion = GETDATE(), CallbackInfo = ? WHERE DeploymentId = ?;"
-                params = (estado_callback, callback_payload_str, deployment_id)
-                cursor.execute(query, params)
-                return UpdateStatus.UPDATED
+                return UpdateStatus[row[0]] if row else UpdateStatus.ERROR
         except Exception as e:
             logger.error(f"Error en DB al actualizar callback para {deployment_id}: {e}", exc_info=True)
             return UpdateStatus.ERROR
 
+    def actualizar_ejecuciones_desde_callback_lote(self, callbacks: List[tuple]) -> List[UpdateStatus]:
+        """
+        Aplica varios callbacks (deployment_id, estado, payload) en una sola transacción.
+        A diferencia de la versión individual, propaga la excepción si el lote falla.
+        """
+        resultados = []
+        with self.obtener_cursor() as cursor:
+            for deployment_id, estado_callback, callback_payload_str in callbacks:
+                cursor.execute(
+                    _SQL_ACTUALIZAR_DESDE_CALLBACK,
+                    (estado_callback, callback_payload_str, deployment_id, deployment_id),
+                )
+                row = cursor.fetchone()
+                resultados.append(UpdateStatus[row[0]] if row else UpdateStatus.ERROR)
+        return resultados
+
     def merge_robots(self, lista_robots: List[Dict]):
         if not lista_robots:
             return 0
@@ -250,3 +521,89 @@ class DatabaseConnector:
         except Exception as e:
             logger.error(f"Error en merge_equipos: {e}", exc_info=True)
             return -1
+
+
+class AsyncDatabaseConnector:
+    """
+    Fachada asíncrona sobre `DatabaseConnector`.
+
+    Expone la misma API pero cada llamada se ejecuta en un executor dedicado y
+    acotado al tamaño del pool de conexiones, de modo que las consultas pyodbc
+    no bloquean el event loop de los servicios asíncronos.
+    """
+
+    def __init__(self, db_connector: DatabaseConnector, max_workers: Optional[int] = None):
+        """
+        Args:
+            db_connector: Conector síncrono que realiza el trabajo real.
+            max_workers: Hilos del executor. Por defecto, el tamaño máximo del pool.
+        """
+        self.db_connector = db_connector
+        self.db_config_prefix = db_connector.db_config_prefix
+        self.max_workers = max_workers or db_connector.pool_max_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix=f"sam-db-{self.db_config_prefix}"
+        )
+
+    async def _ejecutar_en_executor(self, func, *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def ejecutar_consulta(self, query: str, params: tuple = None, es_select: bool = True) -> Any:
+        return await self._ejecutar_en_executor(self.db_connector.ejecutar_consulta, query, params, es_select)
+
+    async def ejecutar_consulta_multiple(self, query: str, params_list: List[tuple]) -> int:
+        return await self._ejecutar_en_executor(self.db_connector.ejecutar_consulta_multiple, query, params_list)
+
+    async def obtener_robots_ejecutables(self) -> List[Dict]:
+        return await self._ejecutar_en_executor(self.db_connector.obtener_robots_ejecutables)
+
+    async def obtener_equipos_ocupados(self) -> List[int]:
+        return await self._ejecutar_en_executor(self.db_connector.obtener_equipos_ocupados)
+
+    async def obtener_robots_online_disponibles(self, equipo_ids: Optional[List[int]] = None) -> List[Dict]:
+        return await self._ejecutar_en_executor(self.db_connector.obtener_robots_online_disponibles, equipo_ids)
+
+    async def insertar_registro_ejecucion(
+        self, id_despliegue, db_robot_id, db_equipo_id, a360_user_id, marca_tiempo_programada, estado
+    ):
+        return await self._ejecutar_en_executor(
+            self.db_connector.insertar_registro_ejecucion,
+            id_despliegue=id_despliegue,
+            db_robot_id=db_robot_id,
+            db_equipo_id=db_equipo_id,
+            a360_user_id=a360_user_id,
+            marca_tiempo_programada=marca_tiempo_programada,
+            estado=estado,
+        )
+
+    async def insertar_registros_ejecucion(self, registros: List[tuple]) -> int:
+        return await self._ejecutar_en_executor(self.db_connector.insertar_registros_ejecucion, registros)
+
+    async def obtener_ejecuciones_en_curso(self) -> List[Dict]:
+        return await self._ejecutar_en_executor(self.db_connector.obtener_ejecuciones_en_curso)
+
+    async def actualizar_ejecucion_desde_callback(
+        self, deployment_id: str, estado_callback: str, callback_payload_str: str
+    ) -> UpdateStatus:
+        return await self._ejecutar_en_executor(
+            self.db_connector.actualizar_ejecucion_desde_callback,
+            deployment_id=deployment_id,
+            estado_callback=estado_callback,
+            callback_payload_str=callback_payload_str,
+        )
+
+    async def actualizar_ejecuciones_desde_callback_lote(self, callbacks: List[tuple]) -> List[UpdateStatus]:
+        return await self._ejecutar_en_executor(self.db_connector.actualizar_ejecuciones_desde_callback_lote, callbacks)
+
+    async def merge_robots(self, lista_robots: List[Dict]):
+        return await self._ejecutar_en_executor(self.db_connector.merge_robots, lista_robots)
+
+    async def merge_equipos(self, lista_equipos_procesados: List[Dict]):
+        return await self._ejecutar_en_executor(self.db_connector.merge_equipos, lista_equipos_procesados)
+
+    def cerrar(self):
+        """Detiene el executor y cierra las conexiones del pool subyacente."""
+        self._executor.shutdown(wait=True)
+        self.db_connector.cerrar_conexiones_pool()
+        logger.info(f"AsyncDatabaseConnector ({self.db_config_prefix}) cerrado.")
@@ -0,0 +1,171 @@
+# sam/common/diario_persistente.py
+import asyncio
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, List, Optional
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+logger = logging.getLogger(__name__)
+
+
+async def _en_executor(funcion, *args):
+    # El diario hace fsync y reescribe el archivo: no debe bloquear el event loop.
+    return await asyncio.get_running_loop().run_in_executor(None, funcion, *args)
+
+
+def _bloquear_sin_esperar(archivo: IO) -> bool:
+    """Bloqueo exclusivo entre procesos sobre `archivo`; el sistema lo libera si el proceso muere."""
+    try:
+        if os.name == "nt":
+            archivo.seek(0)
+            msvcrt.locking(archivo.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(archivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+class DiarioPersistente:
+    """
+    Archivo local de solo-anexado (JSON Lines) que guarda trabajo todavía no
+    persistido en la base de datos, para poder recuperarlo tras una caída del proceso.
+
+    Cada registro es un diccionario identificado por `campo_clave`. Los registros
+    se agregan con fsync y se eliminan con `confirmar` una vez persistidos.
+    """
+
+    def __init__(self, ruta: str, campo_clave: str):
+        """
+        Args:
+            ruta: Ruta del archivo del diario. El directorio se crea si no existe.
+            campo_clave: Campo que identifica de forma única a cada registro.
+        """
+        self.ruta = Path(ruta)
+        self.campo_clave = campo_clave
+        self._lock = threading.Lock()
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+
+    def agregar(self, registros: List[Dict[str, Any]]) -> None:
+        """Anexa los registros al diario y fuerza su escritura a disco."""
+        if not registros:
+            return
+        lineas = "".join(json.dumps(r, default=str, ensure_ascii=False) + "\n" for r in registros)
+        with self._lock:
+            with open(self.ruta, "a", encoding="utf-8") as f:
+                f.write(lineas)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def leer(self) -> List[Dict[str, Any]]:
+        """Retorna los registros pendientes. Ignora líneas truncadas por una escritura interrumpida."""
+        with self._lock:
+            return self._leer_sin_lock()
+
+    def confirmar(self, claves: Iterable[Any]) -> None:
+        """Elimina del diario los registros cuyas claves ya fueron persistidas."""
+        claves_confirmadas = set(claves)
+        if not claves_confirmadas:
+            return
+        with self._lock:
+            restantes = [r for r in self._leer_sin_lock() if r.get(self.campo_clave) not in claves_confirmadas]
+            ruta_temporal = self.ruta.with_suffix(self.ruta.suffix + ".tmp")
+            with open(ruta_temporal, "w", encoding="utf-8") as f:
+                for registro in restantes:
+                    f.write(json.dumps(registro, default=str, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(ruta_temporal, self.ruta)
+
+    async def agregar_async(self, registros: List[Dict[str, Any]]) -> None:
+        """Versión de `agregar` para código asíncrono."""
+        await _en_executor(self.agregar, registros)
+
+    async def confirmar_async(self, claves: Iterable[Any]) -> None:
+        """Versión de `confirmar` para código asíncrono."""
+        await _en_executor(self.confirmar, list(claves))
+
+    def _leer_sin_lock(self) -> List[Dict[str, Any]]:
+        if not self.ruta.exists():
+            return []
+        registros = []
+        with open(self.ruta, "r", encoding="utf-8") as f:
+            for numero_linea, linea in enumerate(f, start=1):
+                linea = linea.strip()
+                if not linea:
+                    continue
+                try:
+                    registros.append(json.loads(linea))
+                except json.JSONDecodeError:
+                    logger.warning(f"Línea {numero_linea} corrupta en el diario {self.ruta}. Será ignorada.")
+        return registros
+
+
+class DiarioPersistenteDeProceso(DiarioPersistente):
+    """
+    Diario propio de cada proceso, para servicios con varios workers (p.ej. Uvicorn con
+    workers > 1) que comparten la misma ruta configurada: cada uno escribe en
+    `<nombre>.<pid><sufijo>`, así el `confirmar` de un proceso no pisa lo que otro anexó.
+
+    Cada proceso mantiene bloqueado un archivo `.lock` junto a su diario mientras vive.
+    Al iniciar, `adoptar_huerfanos` toma los diarios cuyo `.lock` está libre (su proceso
+    terminó): el bloqueo garantiza que un diario vivo no se adopta y que un huérfano lo
+    adopta un solo proceso. También se adopta el diario sin pid de versiones anteriores.
+    """
+
+    def __init__(self, ruta_base: str, campo_clave: str):
+        base = Path(ruta_base)
+        self._base = base
+        super().__init__(str(base.with_name(f"{base.stem}.{os.getpid()}{base.suffix}")), campo_clave)
+        self._archivo_bloqueo: Optional[IO] = open(self._ruta_bloqueo(self.ruta), "a+b")
+        if not _bloquear_sin_esperar(self._archivo_bloqueo):
+            # Solo puede tenerlo este mismo proceso (otra instancia del diario con el mismo pid).
+            logger.warning(f"El bloqueo del diario {self.ruta} ya lo tiene este proceso.")
+
+    @staticmethod
+    def _ruta_bloqueo(ruta: Path) -> Path:
+        return ruta.with_name(ruta.name + ".lock")
+
+    def _candidatos(self) -> List[Path]:
+        candidatos = [self._base] if self._base.exists() else []
+        for ruta in self._base.parent.glob(f"{self._base.stem}.*{self._base.suffix}"):
+            pid = ruta.name[len(self._base.stem) + 1 : len(ruta.name) - len(self._base.suffix)]
+            if pid.isdigit() and ruta != self.ruta:
+                candidatos.append(ruta)
+        return candidatos
+
+    def adoptar_huerfanos(self) -> List[Dict[str, Any]]:
+        """Pasa a este diario los registros de los diarios de procesos terminados y los retorna."""
+        adoptados: List[Dict[str, Any]] = []
+        for ruta in self._candidatos():
+            ruta_bloqueo = self._ruta_bloqueo(ruta)
+            with open(ruta_bloqueo, "a+b") as bloqueo:
+                if not _bloquear_sin_esperar(bloqueo):
+                    continue
+                # Otro proceso pudo adoptarlo entre el listado y el bloqueo.
+                if not ruta.exists():
+                    continue
+                huerfano = DiarioPersistente(str(ruta), self.campo_clave).leer()
+                # Primero se anexan (con fsync) y recién después se borra el original.
+                self.agregar(huerfano)
+                ruta.unlink()
+                adoptados += huerfano
+                logger.warning(f"Se adoptaron {len(huerfano)} registros del diario huérfano {ruta}.")
+            try:
+                ruta_bloqueo.unlink()
+            except OSError:
+                pass
+        return adoptados
+
+    def cerrar(self) -> None:
+        """Libera el bloqueo del diario; lo pendiente queda para que otro proceso lo adopte."""
+        if self._archivo_bloqueo is not None:
+            self._archivo_bloqueo.close()
+            self._archivo_bloqueo = None
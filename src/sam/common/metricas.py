@@ -0,0 +1,24 @@
+# sam/common/metricas.py
+import math
+from typing import Dict, Iterable, Sequence
+
+
+def calcular_percentiles(valores: Iterable[float], percentiles: Sequence[int] = (50, 90, 99)) -> Dict[str, float]:
+    """
+    Calcula percentiles por el método del rango más cercano, más el máximo y la cantidad de muestras.
+
+    Retorna un diccionario del tipo {"p50": ..., "p90": ..., "p99": ..., "max": ..., "muestras": n}.
+    Con una lista vacía, todos los valores son 0.
+    """
+    ordenados = sorted(valores)
+    n = len(ordenados)
+    resultado: Dict[str, float] = {}
+    for p in percentiles:
+        if n == 0:
+            resultado[f"p{p}"] = 0.0
+            continue
+        rango = max(math.ceil(p / 100 * n), 1)
+        resultado[f"p{p}"] = round(ordenados[rango - 1], 3)
+    resultado["max"] = round(ordenados[-1], 3) if n else 0.0
+    resultado["muestras"] = n
+    return resultado
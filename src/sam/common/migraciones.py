@@ -0,0 +1,348 @@
+# sam/common/migraciones.py
+"""
+Migraciones versionadas del esquema de la base de datos de SAM.
+
+Cada migración se aplica una sola vez y queda registrada en dbo.MigracionesEsquema.
+Además, cada sentencia verifica por sí misma si el objeto ya existe, de modo que el
+runner puede ejecutarse sobre bases donde los índices se crearon a mano.
+
+Uso:
+    python -m sam.common.migraciones            # aplica las migraciones pendientes
+    python -m sam.common.migraciones --listar   # muestra el estado sin aplicar nada
+"""
+
+import argparse
+import logging
+import sys
+from typing import List, NamedTuple, Set
+
+from sam.common.database import ESTADOS_ACTIVOS_EJECUCION, ESTADOS_FINALES_EJECUCION, DatabaseConnector
+
+logger = logging.getLogger(__name__)
+
+# Estados que ObtenerRobotsEjecutables considera "equipo ocupado".
+ESTADOS_ACTIVOS = ESTADOS_ACTIVOS_EJECUCION
+
+
+class Migracion(NamedTuple):
+    version: int
+    descripcion: str
+    sentencias: List[str]
+
+
+def _crear_indice_si_no_existe(tabla: str, nombre: str, definicion: str) -> str:
+    return f"""
+        IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = '{nombre}' AND object_id = OBJECT_ID('{tabla}'))
+            {definicion};
+    """
+
+
+_FILTRO_ACTIVOS = "Estado IN (" + ", ".join(f"'{e}'" for e in ESTADOS_ACTIVOS) + ")"
+# Los índices filtrados no admiten NOT IN; se expresa como una conjunción de <>, que el optimizador
+# empareja con el NOT IN de obtener_ejecuciones_en_curso.
+_FILTRO_NO_FINALES = " AND ".join(f"Estado <> '{e}'" for e in ESTADOS_FINALES_EJECUCION)
+
+MIGRACIONES: List[Migracion] = [
+    Migracion(
+        version=1,
+        descripcion="Índice único sobre Ejecuciones.DeploymentId (callback y conciliador)",
+        sentencias=[
+            """
+            IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'UX_Ejecuciones_DeploymentId' AND object_id = OBJECT_ID('dbo.Ejecuciones'))
+                AND EXISTS (SELECT DeploymentId FROM dbo.Ejecuciones GROUP BY DeploymentId HAVING COUNT(*) > 1)
+                THROW 50001, 'Existen DeploymentId duplicados en dbo.Ejecuciones. Depúrelos antes de crear el índice único.', 1;
+            """,
+            _crear_indice_si_no_existe(
+                "dbo.Ejecuciones",
+                "UX_Ejecuciones_DeploymentId",
+                "CREATE UNIQUE NONCLUSTERED INDEX UX_Ejecuciones_DeploymentId ON dbo.Ejecuciones (DeploymentId) INCLUDE (Estado)",
+            ),
+        ],
+    ),
+    Migracion(
+        version=2,
+        descripcion="Índices filtrados sobre las ejecuciones en curso",
+        sentencias=[
+            _crear_indice_si_no_existe(
+                "dbo.Ejecuciones",
+                "IX_Ejecuciones_EnCurso",
+                "CREATE NONCLUSTERED INDEX IX_Ejecuciones_EnCurso ON dbo.Ejecuciones (Estado) "
+                "INCLUDE (DeploymentId, RobotId, FechaInicio, IntentosConciliadorFallidos) "
+                f"WHERE {_FILTRO_NO_FINALES}",
+            ),
+            _crear_indice_si_no_existe(
+                "dbo.Ejecuciones",
+                "IX_Ejecuciones_EquipoId_Activas",
+                f"CREATE NONCLUSTERED INDEX IX_Ejecuciones_EquipoId_Activas ON dbo.Ejecuciones (EquipoId, Estado) WHERE {_FILTRO_ACTIVOS}",
+            ),
+        ],
+    ),
+    Migracion(
+        version=3,
+        descripcion="Índice de cobertura para la verificación de programaciones ya ejecutadas en el día",
+        sentencias=[
+            _crear_indice_si_no_existe(
+                "dbo.Ejecuciones",
+                "IX_Ejecuciones_RobotId_EquipoId_FechaInicio",
+                "CREATE NONCLUSTERED INDEX IX_Ejecuciones_RobotId_EquipoId_FechaInicio ON dbo.Ejecuciones (RobotId, EquipoId, FechaInicio) INCLUDE (Hora)",
+            ),
+        ],
+    ),
+    Migracion(
+        version=4,
+        descripcion="Tipo PlanBalanceoType y procedimiento AplicarPlanBalanceo para aplicar el plan del balanceador",
+        sentencias=[
+            """
+            IF TYPE_ID('dbo.PlanBalanceoType') IS NULL
+                CREATE TYPE dbo.PlanBalanceoType AS TABLE (
+                    RobotId INT NOT NULL,
+                    EquipoId INT NOT NULL,
+                    Accion NVARCHAR(10) NOT NULL,
+                    Motivo NVARCHAR(100) NULL,
+                    PRIMARY KEY (RobotId, EquipoId, Accion)
+                );
+            """,
+            """
+            CREATE OR ALTER PROCEDURE dbo.AplicarPlanBalanceo
+                @Plan dbo.PlanBalanceoType READONLY
+            AS
+            BEGIN
+                SET NOCOUNT ON;
+                SET XACT_ABORT ON;
+
+                DECLARE @Cambios TABLE (Accion NVARCHAR(10));
+
+                BEGIN TRANSACTION;
+
+                MERGE dbo.Asignaciones WITH (HOLDLOCK) AS T
+                USING @Plan AS S
+                    ON T.RobotId = S.RobotId AND T.EquipoId = S.EquipoId
+                WHEN MATCHED AND S.Accion = 'QUITAR'
+                    AND ISNULL(T.EsProgramado, 0) = 0 AND ISNULL(T.Reservado, 0) = 0 THEN
+                    DELETE
+                WHEN NOT MATCHED BY TARGET AND S.Accion = 'AGREGAR' THEN
+                    INSERT (RobotId, EquipoId, EsProgramado, Reservado, AsignadoPor)
+                    VALUES (S.RobotId, S.EquipoId, 0, 0, S.Motivo)
+                OUTPUT $action INTO @Cambios;
+
+                COMMIT TRANSACTION;
+
+                SELECT
+                    SUM(CASE WHEN Accion = 'INSERT' THEN 1 ELSE 0 END) AS Agregadas,
+                    SUM(CASE WHEN Accion = 'DELETE' THEN 1 ELSE 0 END) AS Quitadas
+                FROM @Cambios;
+            END
+            """,
+        ],
+    ),
+    Migracion(
+        version=5,
+        descripcion="Columna VersionFila (rowversion) en Robots, Equipos y Asignaciones para el refresco incremental del balanceador",
+        sentencias=[
+            f"""
+            IF COL_LENGTH('{tabla}', 'VersionFila') IS NULL
+                ALTER TABLE {tabla} ADD VersionFila ROWVERSION;
+            """
+            for tabla in ("dbo.Robots", "dbo.Equipos", "dbo.Asignaciones")
+        ],
+    ),
+    Migracion(
+        version=6,
+        descripcion="Tabla EnfriamientoBalanceo con el estado compartido del CoolingManager del balanceador",
+        sentencias=[
+            """
+            IF OBJECT_ID('dbo.EnfriamientoBalanceo', 'U') IS NULL
+                CREATE TABLE dbo.EnfriamientoBalanceo (
+                    RobotId INT NOT NULL,
+                    Operacion NVARCHAR(10) NOT NULL,
+                    FechaOperacion DATETIME2(3) NOT NULL,
+                    Tickets INT NOT NULL,
+                    CONSTRAINT PK_EnfriamientoBalanceo PRIMARY KEY (RobotId, Operacion)
+                );
+            """,
+            _crear_indice_si_no_existe(
+                "dbo.EnfriamientoBalanceo",
+                "IX_EnfriamientoBalanceo_FechaOperacion",
+                "CREATE NONCLUSTERED INDEX IX_EnfriamientoBalanceo_FechaOperacion ON dbo.EnfriamientoBalanceo (FechaOperacion)",
+            ),
+        ],
+    ),
+    Migracion(
+        version=7,
+        descripcion="Tabla ArrendamientosBalanceador para la coordinación entre instancias del balanceador",
+        sentencias=[
+            """
+            IF OBJECT_ID('dbo.ArrendamientosBalanceador', 'U') IS NULL
+                CREATE TABLE dbo.ArrendamientosBalanceador (
+                    Recurso NVARCHAR(200) NOT NULL PRIMARY KEY,
+                    Instancia NVARCHAR(200) NOT NULL,
+                    VenceEn DATETIME2(3) NOT NULL
+                );
+            """,
+        ],
+    ),
+    Migracion(
+        version=8,
+        descripcion="Tabla EventosLanzador para avisar al lanzador de los equipos liberados por un callback",
+        sentencias=[
+            """
+            IF OBJECT_ID('dbo.EventosLanzador', 'U') IS NULL
+                CREATE TABLE dbo.EventosLanzador (
+                    EventoId BIGINT IDENTITY(1,1) NOT NULL PRIMARY KEY,
+                    EquipoId INT NOT NULL,
+                    FechaEvento DATETIME2(3) NOT NULL DEFAULT SYSDATETIME()
+                );
+            """,
+        ],
+    ),
+    Migracion(
+        version=9,
+        descripcion="AplicarPlanBalanceo verifica los arrendamientos de la instancia en la misma transacción que el MERGE",
+        sentencias=[
+            """
+            CREATE OR ALTER PROCEDURE dbo.AplicarPlanBalanceo
+                @Plan dbo.PlanBalanceoType READONLY,
+                @Instancia NVARCHAR(200) = NULL,
+                @Recursos NVARCHAR(MAX) = NULL
+            AS
+            BEGIN
+                SET NOCOUNT ON;
+                SET XACT_ABORT ON;
+
+                DECLARE @Cambios TABLE (Accion NVARCHAR(10));
+
+                BEGIN TRANSACTION;
+
+                -- Cerco: con @Instancia, cada recurso de @Recursos (separados por coma) debe seguir
+                -- siendo de la instancia. UPDLOCK/HOLDLOCK impide que otra instancia los tome
+                -- antes de que termine el MERGE.
+                IF @Instancia IS NOT NULL
+                BEGIN
+                    DECLARE @Esperados INT = LEN(@Recursos) - LEN(REPLACE(@Recursos, ',', '')) + 1;
+                    DECLARE @Vigentes INT = (
+                        SELECT COUNT(*) FROM dbo.ArrendamientosBalanceador WITH (UPDLOCK, HOLDLOCK)
+                        WHERE Instancia = @Instancia
+                          AND VenceEn > SYSUTCDATETIME()
+                          AND ',' + @Recursos + ',' LIKE '%,' + Recurso + ',%'
+                    );
+                    IF @Vigentes < @Esperados
+                        THROW 50002, 'ArrendamientoPerdido: la instancia ya no tiene los arrendamientos del plan.', 1;
+                END
+
+                MERGE dbo.Asignaciones WITH (HOLDLOCK) AS T
+                USING @Plan AS S
+                    ON T.RobotId = S.RobotId AND T.EquipoId = S.EquipoId
+                WHEN MATCHED AND S.Accion = 'QUITAR'
+                    AND ISNULL(T.EsProgramado, 0) = 0 AND ISNULL(T.Reservado, 0) = 0 THEN
+                    DELETE
+                WHEN NOT MATCHED BY TARGET AND S.Accion = 'AGREGAR' THEN
+                    INSERT (RobotId, EquipoId, EsProgramado, Reservado, AsignadoPor)
+                    VALUES (S.RobotId, S.EquipoId, 0, 0, S.Motivo)
+                OUTPUT $action INTO @Cambios;
+
+                COMMIT TRANSACTION;
+
+                SELECT
+                    SUM(CASE WHEN Accion = 'INSERT' THEN 1 ELSE 0 END) AS Agregadas,
+                    SUM(CASE WHEN Accion = 'DELETE' THEN 1 ELSE 0 END) AS Quitadas
+                FROM @Cambios;
+            END
+            """,
+        ],
+    ),
+]
+
+
+class EsquemaDesactualizadoError(RuntimeError):
+    """Se lanza cuando un servicio arranca sobre una base a la que le faltan migraciones que necesita."""
+
+
+class MigradorEsquema:
+    """Aplica en orden las migraciones pendientes, cada una en su propia transacción."""
+
+    TABLA_CONTROL = "dbo.MigracionesEsquema"
+
+    def __init__(self, db_connector: DatabaseConnector, migraciones: List[Migracion] = None):
+        self._db_connector = db_connector
+        self._migraciones = sorted(migraciones if migraciones is not None else MIGRACIONES, key=lambda m: m.version)
+        versiones = [m.version for m in self._migraciones]
+        if len(versiones) != len(set(versiones)):
+            raise ValueError("Hay migraciones con versiones repetidas.")
+
+    def _asegurar_tabla_control(self):
+        query = f"""
+            IF OBJECT_ID('{self.TABLA_CONTROL}', 'U') IS NULL
+                CREATE TABLE {self.TABLA_CONTROL} (
+                    Version INT NOT NULL PRIMARY KEY,
+                    Descripcion NVARCHAR(255) NOT NULL,
+                    FechaAplicacion DATETIME2(0) NOT NULL DEFAULT GETDATE()
+                );
+        """
+        self._db_connector.ejecutar_consulta(query, es_select=False)
+
+    def obtener_versiones_aplicadas(self) -> Set[int]:
+        self._asegurar_tabla_control()
+        filas = self._db_connector.ejecutar_consulta(f"SELECT Version FROM {self.TABLA_CONTROL}", es_select=True) or []
+        return {fila["Version"] for fila in filas}
+
+    def obtener_pendientes(self) -> List[Migracion]:
+        aplicadas = self.obtener_versiones_aplicadas()
+        return [m for m in self._migraciones if m.version not in aplicadas]
+
+    def aplicar_pendientes(self) -> List[int]:
+        """Aplica las migraciones pendientes y retorna las versiones aplicadas. Se detiene en el primer error."""
+        aplicadas = []
+        for migracion in self.obtener_pendientes():
+            logger.info(f"Aplicando migración {migracion.version}: {migracion.descripcion}...")
+            with self._db_connector.obtener_cursor() as cursor:
+                for sentencia in migracion.sentencias:
+                    cursor.execute(sentencia)
+                cursor.execute(
+                    f"INSERT INTO {self.TABLA_CONTROL} (Version, Descripcion) VALUES (?, ?)",
+                    (migracion.version, migracion.descripcion),
+                )
+            aplicadas.append(migracion.version)
+            logger.info(f"Migración {migracion.version} aplicada.")
+        if not aplicadas:
+            logger.info("El esquema ya está al día. No hay migraciones pendientes.")
+        return aplicadas
+
+
+def main():
+    """Punto de entrada de línea de comandos para aplicar las migraciones sobre SQL_SAM."""
+    from sam.common.config_loader import ConfigLoader
+    from sam.common.config_manager import ConfigManager
+
+    parser = argparse.ArgumentParser(description="Aplica las migraciones pendientes del esquema de SAM.")
+    parser.add_argument("--listar", action="store_true", help="Muestra las migraciones pendientes sin aplicarlas.")
+    args = parser.parse_args()
+
+    if not ConfigLoader.is_initialized():
+        ConfigLoader.initialize_service("migraciones")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    cfg_sql_sam = ConfigManager.get_sql_server_config("SQL_SAM")
+    db_connector = DatabaseConnector(
+        servidor=cfg_sql_sam["servidor"],
+        base_datos=cfg_sql_sam["base_datos"],
+        usuario=cfg_sql_sam["usuario"],
+        contrasena=cfg_sql_sam["contrasena"],
+    )
+    try:
+        migrador = MigradorEsquema(db_connector)
+        if args.listar:
+            pendientes = migrador.obtener_pendientes()
+            for migracion in pendientes:
+                print(f"  [pendiente] {migracion.version}: {migracion.descripcion}")
+            print(f"{len(pendientes)} migración(es) pendiente(s).")
+            return
+        migrador.aplicar_pendientes()
+    except Exception as e:
+        logger.critical(f"Error al aplicar las migraciones: {e}", exc_info=True)
+        sys.exit(1)
+    finally:
+        db_connector.cerrar_conexiones_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,7 @@ import logging
 from typing import Dict, List
 
 from .a360_client import AutomationAnywhereClient
-from .database import DatabaseConnector
+from .database import AsyncDatabaseConnector
 
 logger = logging.getLogger(__name__)
 
@@ -15,12 +15,12 @@ class SincronizadorComun:
     de sincronización de entidades entre SAM y Automation Anywhere.
     """
 
-    def __init__(self, db_connector: DatabaseConnector, aa_client: AutomationAnywhereClient):
+    def __init__(self, db_connector: AsyncDatabaseConnector, aa_client: AutomationAnywhereClient):
         """
         Inicializa el Sincronizador con sus dependencias.
 
         Args:
-            db_connector: Conector a la base de datos de SAM.
+            db_connector: Conector asíncrono a la base de datos de SAM.
             aa_client: Cliente para la API de Automation Anywhere.
         """
         self._db_connector = db_connector
@@ -46,8 +46,8 @@ class SincronizadorComun:
             equipos_finales = self._procesar_y_mapear_equipos(devices_api, users_api)
 
             logger.info("Actualizando base de datos de SAM...")
-            self._db_connector.merge_robots(robots_api)
-            self._db_connector.merge_equipos(equipos_finales)
+            await self._db_connector.merge_robots(robots_api)
+            await self._db_connector.merge_equipos(equipos_finales)
 
             logger.info(
                 f"Sincronización completada. {len(robots_api)} robots y {len(equipos_finales)} equipos procesados."
@@ -10,11 +10,12 @@ from sam.common.a360_client import AutomationAnywhereClient
 from sam.common.apigw_client import ApiGatewayClient
 from sam.common.config_loader import ConfigLoader
 from sam.common.config_manager import ConfigManager
-from sam.common.database import DatabaseConnector
+from sam.common.database import AsyncDatabaseConnector, DatabaseConnector
 from sam.common.logging_setup import setup_logging
 from sam.common.mail_client import EmailAlertClient
 from sam.lanzador.service.conciliador import Conciliador
 from sam.lanzador.service.desplegador import Desplegador
+from sam.lanzador.service.eventos_lanzador import VigilanteEventosLanzador
 from sam.lanzador.service.main import LanzadorService
 from sam.lanzador.service.sincronizador import Sincronizador
 
@@ -40,6 +41,7 @@ async def main_async():
     logging.info(f"Iniciando el servicio: {SERVICE_NAME.capitalize()}...")
 
     db_connector = None
+    async_db_connector = None
     aa_client = None
     gateway_client = None
 
@@ -62,6 +64,8 @@ async def main_async():
             usuario=cfg_sql_sam["usuario"],
             contrasena=cfg_sql_sam["contrasena"],
         )
+        # Los ciclos asíncronos usan la fachada para no bloquear el event loop con pyodbc.
+        async_db_connector = AsyncDatabaseConnector(db_connector)
 
         # Se pasan los argumentos de forma explícita y correcta.
         # 'password' es opcional y 'api_key' se pasa como keyword argument.
@@ -72,26 +76,40 @@ async def main_async():
             api_key=aa_cfg.get("api_key"),  # Se pasa explícitamente
             api_timeout_seconds=aa_cfg.get("api_timeout_seconds"),
             callback_url_deploy=aa_cfg.get("callback_url_deploy"),
+            page_size_default=aa_cfg.get("page_size_default"),
+            max_paginas=aa_cfg.get("max_paginas"),
+            paginacion_concurrencia=aa_cfg.get("paginacion_concurrencia"),
+            conciliador_concurrencia=aa_cfg.get("conciliador_concurrencia"),
         )
 
         gateway_client = ApiGatewayClient(ConfigManager.get_apigw_config())
         notificador = EmailAlertClient(service_name=SERVICE_NAME)
 
         # Componentes de Lógica ("Cerebros")
-        sincronizador = Sincronizador(db_connector=db_connector, aa_client=aa_client)
+        sincronizador = Sincronizador(db_connector=async_db_connector, aa_client=aa_client)
         desplegador = Desplegador(
-            db_connector=db_connector,
+            db_connector=async_db_connector,
             aa_client=aa_client,
             api_gateway_client=gateway_client,
             lanzador_config=lanzador_cfg,
             callback_token=callback_token,
         )
         conciliador = Conciliador(
-            db_connector=db_connector,
+            db_connector=async_db_connector,
             aa_client=aa_client,
             max_intentos_fallidos=lanzador_cfg["conciliador_max_intentos_fallidos"],
+            espera_inicial_seg=lanzador_cfg["conciliador_espera_inicial"],
+            intervalo_max_seg=lanzador_cfg["conciliador_intervalo_max"],
+            duracion_por_defecto_seg=lanzador_cfg["conciliador_duracion_por_defecto"],
+            max_consultas_por_ciclo=lanzador_cfg["conciliador_max_consultas_por_ciclo"],
         )
 
+        vigilante_eventos = None
+        if lanzador_cfg["eventos_habilitado"]:
+            vigilante_eventos = VigilanteEventosLanzador(
+                db_connector=async_db_connector, retencion_min=lanzador_cfg["eventos_retencion_min"]
+            )
+
         # Orquestador
         service_instance = LanzadorService(
             sincronizador=sincronizador,
@@ -100,6 +118,7 @@ async def main_async():
             notificador=notificador,
             lanzador_config=lanzador_cfg,
             sync_enabled=sync_enabled,
+            vigilante_eventos=vigilante_eventos,
         )
 
         # --- Ejecución del Servicio ---
@@ -119,7 +138,9 @@ async def main_async():
             await gateway_client.close()
         if aa_client:
             await aa_client.close()
-        if db_connector:
+        if async_db_connector:
+            async_db_connector.cerrar()
+        elif db_connector:
             db_connector.cerrar_conexion_hilo_actual()
         logging.info(f"El servicio {SERVICE_NAME} ha concluido su ejecución y liberado recursos.")
 
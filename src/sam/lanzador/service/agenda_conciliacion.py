@@ -0,0 +1,114 @@
+# sam/lanzador/service/agenda_conciliacion.py
+import heapq
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class AgendaConciliacion:
+    """
+    Cola de prioridad con la próxima revisión de cada ejecución en curso.
+
+    La próxima revisión se calcula a partir de la antigüedad de la ejecución, la
+    duración esperada de su robot y los intentos fallidos acumulados: una ejecución
+    recién desplegada no se consulta hasta que debería haber terminado (el callback
+    casi siempre la cierra antes) y las que no aparecen en A360 se espacian con
+    backoff exponencial.
+    """
+
+    def __init__(self, espera_inicial_seg: int, intervalo_max_seg: int, duracion_por_defecto_seg: int):
+        """
+        Args:
+            espera_inicial_seg: Margen mínimo antes de la primera revisión y base del backoff.
+            intervalo_max_seg: Tope de espera entre dos revisiones de una misma ejecución.
+            duracion_por_defecto_seg: Duración esperada para robots sin historial.
+        """
+        self._espera_inicial = timedelta(seconds=max(espera_inicial_seg, 1))
+        self._intervalo_max = timedelta(seconds=max(intervalo_max_seg, espera_inicial_seg, 1))
+        self._duracion_por_defecto = timedelta(seconds=max(duracion_por_defecto_seg, 0))
+        self._duraciones_por_robot: Dict[int, timedelta] = {}
+
+        # Entradas (vencimiento, EjecucionId). Las obsoletas se descartan al extraerlas.
+        self._heap: List[Tuple[datetime, int]] = []
+        self._vencimientos: Dict[int, datetime] = {}
+        self._ejecuciones: Dict[int, Dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._ejecuciones)
+
+    def actualizar_duraciones(self, duraciones_seg: Dict[int, float]) -> None:
+        """Reemplaza las duraciones esperadas por robot (en segundos)."""
+        self._duraciones_por_robot = {
+            robot_id: timedelta(seconds=seg) for robot_id, seg in duraciones_seg.items() if seg
+        }
+
+    def sincronizar(self, ejecuciones_en_curso: List[Dict], ahora: datetime) -> None:
+        """Agenda las ejecuciones nuevas y olvida las que ya no están en curso."""
+        vigentes = {e["EjecucionId"]: e for e in ejecuciones_en_curso if e.get("EjecucionId") and e.get("DeploymentId")}
+        for ejecucion_id in set(self._ejecuciones) - set(vigentes):
+            del self._ejecuciones[ejecucion_id]
+            self._vencimientos.pop(ejecucion_id, None)
+
+        for ejecucion_id, ejecucion in vigentes.items():
+            nueva = ejecucion_id not in self._ejecuciones
+            self._ejecuciones[ejecucion_id] = ejecucion
+            if nueva:
+                self._agendar(ejecucion_id, self._calcular_proxima_revision(ejecucion, ahora, revisada=False))
+
+    def extraer_vencidas(self, ahora: datetime, limite: Optional[int] = None) -> List[Dict]:
+        """Retira de la agenda las ejecuciones cuya revisión venció, de la más atrasada a la más reciente."""
+        vencidas = []
+        while self._heap and self._heap[0][0] <= ahora and (limite is None or len(vencidas) < limite):
+            vencimiento, ejecucion_id = heapq.heappop(self._heap)
+            if self._vencimientos.get(ejecucion_id) != vencimiento:
+                continue
+            del self._vencimientos[ejecucion_id]
+            vencidas.append(self._ejecuciones[ejecucion_id])
+        return vencidas
+
+    def reagendar(self, ejecucion: Dict, ahora: datetime, intentos_fallidos: Optional[int] = None) -> None:
+        """Vuelve a agendar una ejecución revisada que sigue en curso."""
+        ejecucion_id = ejecucion["EjecucionId"]
+        if ejecucion_id not in self._ejecuciones:
+            return
+        if intentos_fallidos is not None:
+            ejecucion["IntentosConciliadorFallidos"] = intentos_fallidos
+        self._agendar(ejecucion_id, self._calcular_proxima_revision(ejecucion, ahora, revisada=True))
+
+    def proximo_vencimiento(self) -> Optional[datetime]:
+        return min(self._vencimientos.values()) if self._vencimientos else None
+
+    def _agendar(self, ejecucion_id: int, vencimiento: datetime) -> None:
+        self._vencimientos[ejecucion_id] = vencimiento
+        heapq.heappush(self._heap, (vencimiento, ejecucion_id))
+        # Compacta el heap si las entradas obsoletas superan a las vigentes.
+        if len(self._heap) > 2 * len(self._vencimientos) + 64:
+            self._heap = [(v, e) for e, v in self._vencimientos.items()]
+            heapq.heapify(self._heap)
+
+    def _calcular_proxima_revision(self, ejecucion: Dict, ahora: datetime, revisada: bool) -> datetime:
+        intentos = ejecucion.get("IntentosConciliadorFallidos") or 0
+        if intentos > 0 and revisada:
+            espera = min(self._espera_inicial * (2**intentos), self._intervalo_max)
+            return ahora + espera
+
+        fecha_inicio = ejecucion.get("FechaInicio")
+        if not isinstance(fecha_inicio, datetime):
+            return ahora + self._espera_inicial
+        if fecha_inicio.tzinfo is not None:
+            fecha_inicio = fecha_inicio.replace(tzinfo=None)
+
+        duracion = self._duraciones_por_robot.get(ejecucion.get("RobotId"), self._duracion_por_defecto)
+        fin_esperado = fecha_inicio + duracion + self._espera_inicial
+        if fin_esperado > ahora:
+            # Todavía dentro de su duración normal: se revisa cuando debería haber terminado.
+            return min(fin_esperado, ahora + self._intervalo_max)
+
+        if not revisada:
+            # Excedió su duración y nunca se revisó en este proceso: se revisa de inmediato.
+            return ahora
+        # Ya excedió su duración: la frecuencia de revisión baja a medida que envejece.
+        edad = ahora - fecha_inicio
+        return ahora + min(max(edad / 4, self._espera_inicial), self._intervalo_max)
@@ -0,0 +1,275 @@
+# sam/lanzador/service/calendario_programaciones.py
+import heapq
+import logging
+import time
+import unicodedata
+from datetime import date, datetime, timedelta
+from datetime import time as time_obj
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+import pytz
+
+from sam.common.database import AsyncDatabaseConnector
+
+logger = logging.getLogger(__name__)
+
+# Mismo origen que la parte programada de dbo.ObtenerRobotsEjecutables.
+_SQL_ORIGEN = """
+    FROM dbo.Programaciones P
+    INNER JOIN dbo.Robots R ON R.RobotId = P.RobotId
+    INNER JOIN dbo.Asignaciones A ON A.RobotId = R.RobotId
+    INNER JOIN dbo.Equipos E ON E.EquipoId = A.EquipoId
+    WHERE A.EsProgramado = 1 AND R.Activo = 1
+"""
+
+_SQL_HUELLA = f"""
+    SELECT COUNT_BIG(*) AS Filas,
+           CHECKSUM_AGG(BINARY_CHECKSUM(
+               P.ProgramacionId, P.TipoProgramacion, P.HoraInicio, P.DiasSemana, P.DiaDelMes,
+               P.FechaEspecifica, P.Tolerancia, A.EquipoId, E.UserId
+           )) AS Huella
+    {_SQL_ORIGEN};
+"""
+
+_SQL_PROGRAMACIONES = f"""
+    SELECT P.ProgramacionId, P.RobotId, P.TipoProgramacion, P.HoraInicio, P.DiasSemana, P.DiaDelMes,
+           P.FechaEspecifica, P.Tolerancia, A.EquipoId, E.UserId
+    {_SQL_ORIGEN};
+"""
+
+# Abreviaturas que ObtenerRobotsEjecutables busca en DiasSemana (LEFT(DATENAME(WEEKDAY), 2) en español),
+# indexadas por date.weekday().
+_ABREVIATURAS_DIAS = ("lu", "ma", "mi", "ju", "vi", "sa", "do")
+_DIAS_BUSQUEDA = 366
+
+ZONA_HORARIA = pytz.timezone("America/Argentina/Buenos_Aires")
+
+
+def _hora_local() -> datetime:
+    return datetime.now(ZONA_HORARIA).replace(tzinfo=None)
+
+
+def _normalizar(texto: str) -> str:
+    """Minúsculas y sin acentos, para que 'Sá' y 'Sa' coincidan."""
+    return "".join(c for c in unicodedata.normalize("NFKD", texto or "") if not unicodedata.combining(c)).lower()
+
+
+class _Programacion(NamedTuple):
+    programacion_id: int
+    robot_id: int
+    tipo: str
+    hora: time_obj
+    dias_semana: str  # normalizado
+    dia_del_mes: Optional[int]
+    fecha_especifica: Optional[date]
+    tolerancia: timedelta
+    equipos: Tuple[Tuple[int, int], ...]  # (EquipoId, UserId)
+
+    def corresponde(self, fecha: date) -> bool:
+        if self.tipo == "Diaria":
+            return True
+        if self.tipo == "Semanal":
+            return _ABREVIATURAS_DIAS[fecha.weekday()] in self.dias_semana
+        if self.tipo == "Mensual":
+            return self.dia_del_mes == fecha.day
+        if self.tipo == "Especifica":
+            return self.fecha_especifica == fecha
+        return False
+
+
+class _Disparo(NamedTuple):
+    inicio: datetime
+    vence: datetime
+    programacion: _Programacion
+
+
+class CalendarioProgramaciones:
+    """
+    Expande las Programaciones en un heap con el próximo inicio de cada una, de modo que
+    cada ciclo del lanzador solo mira las que vencieron en lugar de evaluar todas en SQL.
+
+    - El heap se reconstruye cuando cambia la huella (COUNT + CHECKSUM_AGG) de las
+      programaciones y sus asignaciones programadas, que se consulta cada `intervalo_revision_seg`.
+    - Una programación que vence pasa a "disparo activo" durante su ventana
+      [HoraInicio, HoraInicio + Tolerancia] y se entrega en cada ciclo hasta que el Desplegador
+      confirma el lanzamiento en cada equipo. Para que una tolerancia menor que el intervalo del
+      lanzador no se pierda entre dos ciclos, la ventana dura al menos `gracia_seg`.
+    - Al activar disparos se descartan los (robot, equipo) que ya tienen una Ejecución registrada
+      para ese inicio, así un reinicio del servicio no repite lanzamientos.
+
+    Las fechas son locales (hora de Buenos Aires, como la ventana de pausa del Desplegador).
+    """
+
+    def __init__(
+        self,
+        db_connector: AsyncDatabaseConnector,
+        intervalo_revision_seg: float = 60,
+        gracia_seg: float = 120,
+        reloj: Callable[[], datetime] = _hora_local,
+    ):
+        self._db_connector = db_connector
+        self.intervalo_revision_seg = intervalo_revision_seg
+        self.gracia = timedelta(seconds=gracia_seg)
+        self._reloj = reloj
+
+        self._programaciones: Dict[int, _Programacion] = {}
+        self._heap: List[Tuple[datetime, int]] = []
+        self._activos: Dict[Tuple[int, datetime], _Disparo] = {}
+        # (RobotId, EquipoId, inicio) ya lanzados o registrados en Ejecuciones.
+        self._lanzados: Set[Tuple[int, int, datetime]] = set()
+        self._huella: Optional[Tuple[int, Optional[int]]] = None
+        self._ultima_revision: Optional[float] = None
+
+    # --- Reconstrucción ---
+
+    async def sincronizar(self, ahora: Optional[datetime] = None, forzar: bool = False) -> bool:
+        """Reconstruye el calendario si cambiaron las programaciones. Retorna si se reconstruyó."""
+        ahora = ahora or self._reloj()
+        if not forzar and self._ultima_revision is not None:
+            if time.monotonic() - self._ultima_revision < self.intervalo_revision_seg:
+                return False
+        filas = await self._db_connector.ejecutar_consulta(_SQL_HUELLA, es_select=True) or []
+        huella = (filas[0]["Filas"], filas[0]["Huella"]) if filas else (0, None)
+        self._ultima_revision = time.monotonic()
+        if not forzar and huella == self._huella:
+            return False
+
+        filas = await self._db_connector.ejecutar_consulta(_SQL_PROGRAMACIONES, es_select=True) or []
+        self._reconstruir(filas, ahora)
+        self._huella = huella
+        return True
+
+    def _reconstruir(self, filas: List[Dict], ahora: datetime):
+        equipos: Dict[int, List[Tuple[int, int]]] = {}
+        datos: Dict[int, Dict] = {}
+        for fila in filas:
+            datos[fila["ProgramacionId"]] = fila
+            equipos.setdefault(fila["ProgramacionId"], []).append((fila["EquipoId"], fila["UserId"]))
+
+        self._programaciones = {
+            pid: _Programacion(
+                programacion_id=pid,
+                robot_id=fila["RobotId"],
+                tipo=fila["TipoProgramacion"],
+                hora=fila["HoraInicio"],
+                dias_semana=_normalizar(fila["DiasSemana"]),
+                dia_del_mes=fila["DiaDelMes"],
+                fecha_especifica=fila["FechaEspecifica"],
+                tolerancia=timedelta(minutes=fila["Tolerancia"] or 0),
+                equipos=tuple(equipos[pid]),
+            )
+            for pid, fila in datos.items()
+        }
+        self._heap = []
+        for programacion in self._programaciones.values():
+            inicio = self._proximo_inicio(programacion, (ahora - self._ventana(programacion)).date(), ahora)
+            if inicio is not None:
+                self._heap.append((inicio, programacion.programacion_id))
+        heapq.heapify(self._heap)
+        # Los disparos activos se regeneran desde el heap con los datos nuevos; lo ya lanzado se conserva.
+        self._activos = {}
+        logger.info(
+            f"Calendario de programaciones reconstruido: {len(self._programaciones)} programaciones, {len(filas)} pares robot-equipo."
+        )
+
+    def _ventana(self, programacion: _Programacion) -> timedelta:
+        return max(programacion.tolerancia, self.gracia)
+
+    def _proximo_inicio(self, programacion: _Programacion, desde: date, no_vencido_en: datetime) -> Optional[datetime]:
+        """Primer inicio a partir del día `desde` cuya ventana sigue abierta en `no_vencido_en`."""
+        if programacion.tipo == "Especifica":
+            fechas = (
+                [programacion.fecha_especifica]
+                if programacion.fecha_especifica and programacion.fecha_especifica >= desde
+                else []
+            )
+        else:
+            fechas = (desde + timedelta(days=d) for d in range(_DIAS_BUSQUEDA))
+        for fecha in fechas:
+            if programacion.corresponde(fecha):
+                inicio = datetime.combine(fecha, programacion.hora)
+                if inicio + self._ventana(programacion) >= no_vencido_en:
+                    return inicio
+        return None
+
+    # --- Consulta por ciclo ---
+
+    async def robots_programados_pendientes(self, ahora: Optional[datetime] = None) -> List[Dict]:
+        """
+        Retorna los pares robot-equipo cuya programación está en ventana y todavía no se lanzaron,
+        con las mismas claves que ObtenerRobotsEjecutables más `InicioProgramado`.
+        """
+        ahora = ahora or self._reloj()
+        await self.sincronizar(ahora)
+
+        vencidos: List[Tuple[datetime, int]] = []
+        while self._heap and self._heap[0][0] <= ahora:
+            vencidos.append(heapq.heappop(self._heap))
+        if vencidos:
+            try:
+                await self._descartar_ya_ejecutados(vencidos)
+            except Exception:
+                # Sin poder verificar no se activan: se reintentan en el próximo ciclo.
+                for entrada in vencidos:
+                    heapq.heappush(self._heap, entrada)
+                raise
+            for inicio, pid in vencidos:
+                programacion = self._programaciones[pid]
+                self._activos[(pid, inicio)] = _Disparo(inicio, inicio + self._ventana(programacion), programacion)
+                siguiente = self._proximo_inicio(programacion, inicio.date() + timedelta(days=1), ahora)
+                if siguiente is not None:
+                    heapq.heappush(self._heap, (siguiente, pid))
+
+        self._expirar(ahora)
+
+        pendientes: Dict[Tuple[int, int, datetime], Dict] = {}
+        for disparo in sorted(self._activos.values(), key=lambda d: d.inicio):
+            programacion = disparo.programacion
+            for equipo_id, user_id in programacion.equipos:
+                clave = (programacion.robot_id, equipo_id, disparo.inicio)
+                if clave in self._lanzados or clave in pendientes:
+                    continue
+                pendientes[clave] = {
+                    "RobotId": programacion.robot_id,
+                    "EquipoId": equipo_id,
+                    "UserId": user_id,
+                    "Hora": programacion.hora,
+                    "InicioProgramado": disparo.inicio,
+                }
+        return list(pendientes.values())
+
+    def confirmar_lanzamiento(self, robot_info: Dict) -> None:
+        """Marca un par robot-equipo como lanzado para su inicio programado."""
+        self._lanzados.add((robot_info["RobotId"], robot_info["EquipoId"], robot_info["InicioProgramado"]))
+
+    async def _descartar_ya_ejecutados(self, vencidos: List[Tuple[datetime, int]]):
+        robot_ids = sorted({self._programaciones[pid].robot_id for _, pid in vencidos})
+        desde = min(inicio for inicio, _ in vencidos)
+        query = f"""
+            SELECT RobotId, EquipoId, Hora, FechaInicio FROM dbo.Ejecuciones
+            WHERE RobotId IN ({", ".join("?" for _ in robot_ids)}) AND FechaInicio >= ? AND Hora IS NOT NULL;
+        """
+        filas = await self._db_connector.ejecutar_consulta(query, (*robot_ids, desde), es_select=True) or []
+        registradas = [(f["RobotId"], f["EquipoId"], f["Hora"], f["FechaInicio"]) for f in filas]
+        for inicio, pid in vencidos:
+            programacion = self._programaciones[pid]
+            for robot_id, equipo_id, hora, fecha_inicio in registradas:
+                if robot_id == programacion.robot_id and hora == programacion.hora and fecha_inicio >= inicio:
+                    self._lanzados.add((robot_id, equipo_id, inicio))
+
+    def _expirar(self, ahora: datetime):
+        vencidos = [clave for clave, disparo in self._activos.items() if disparo.vence < ahora]
+        for clave in vencidos:
+            disparo = self._activos.pop(clave)
+            programacion = disparo.programacion
+            sin_lanzar = [
+                e for e, _ in programacion.equipos if (programacion.robot_id, e, disparo.inicio) not in self._lanzados
+            ]
+            if sin_lanzar:
+                logger.warning(
+                    f"La programación {programacion.programacion_id} (robot {programacion.robot_id}, {disparo.inicio:%Y-%m-%d %H:%M}) "
+                    f"cerró su ventana sin lanzarse en los equipos {sin_lanzar}."
+                )
+        if vencidos:
+            limite = ahora - timedelta(days=1)
+            self._lanzados = {clave for clave in self._lanzados if clave[2] >= limite}
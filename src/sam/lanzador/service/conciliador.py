@@ -1,13 +1,15 @@
 # sam/lanzador/service/conciliador.py
 import logging
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Dict, List, Optional
 
 import pytz
 from dateutil import parser as dateutil_parser
 
 from sam.common.a360_client import AutomationAnywhereClient
-from sam.common.database import DatabaseConnector
+from sam.common.database import AsyncDatabaseConnector
+
+from .agenda_conciliacion import AgendaConciliacion
 
 logger = logging.getLogger(__name__)
 
@@ -18,18 +20,37 @@ class Conciliador:
     de ejecuciones entre SAM y Automation Anywhere.
     """
 
-    def __init__(self, db_connector: DatabaseConnector, aa_client: AutomationAnywhereClient, max_intentos_fallidos: int):
+    INTERVALO_REFRESCO_DURACIONES = timedelta(hours=1)
+    DIAS_HISTORIAL_DURACIONES = 14
+
+    def __init__(
+        self,
+        db_connector: AsyncDatabaseConnector,
+        aa_client: AutomationAnywhereClient,
+        max_intentos_fallidos: int,
+        espera_inicial_seg: int = 120,
+        intervalo_max_seg: int = 1800,
+        duracion_por_defecto_seg: int = 600,
+        max_consultas_por_ciclo: int = 500,
+    ):
         """
         Inicializa el Conciliador con sus dependencias.
 
         Args:
-            db_connector: Conector a la base de datos de SAM.
+            db_connector: Conector asíncrono a la base de datos de SAM.
             aa_client: Cliente para la API de Automation Anywhere.
             max_intentos_fallidos: Umbral para marcar una ejecución como UNKNOWN.
+            espera_inicial_seg: Margen antes de la primera revisión y base del backoff.
+            intervalo_max_seg: Tope de espera entre dos revisiones de una misma ejecución.
+            duracion_por_defecto_seg: Duración esperada para robots sin historial.
+            max_consultas_por_ciclo: Máximo de deployments consultados a A360 por ciclo.
         """
         self._db_connector = db_connector
         self._aa_client = aa_client
         self._max_intentos_fallidos = max_intentos_fallidos
+        self._max_consultas_por_ciclo = max(max_consultas_por_ciclo, 1)
+        self._agenda = AgendaConciliacion(espera_inicial_seg, intervalo_max_seg, duracion_por_defecto_seg)
+        self._duraciones_actualizadas_en: Optional[datetime] = None
         self.ESTADOS_VALIDOS_API = {
             "COMPLETED",
             "DEPLOYED",
@@ -51,30 +72,79 @@ class Conciliador:
         """
         logger.info("Iniciando conciliación de ejecuciones en curso...")
         try:
-            ejecuciones_en_curso = self._db_connector.obtener_ejecuciones_en_curso()
-            if not ejecuciones_en_curso:
+            ahora = datetime.now()
+            await self._refrescar_duraciones_esperadas(ahora)
+
+            ejecuciones_en_curso = await self._db_connector.obtener_ejecuciones_en_curso()
+            self._agenda.sincronizar(ejecuciones_en_curso, ahora)
+            if not len(self._agenda):
                 logger.info("No hay ejecuciones activas para conciliar.")
                 return
 
-            mapa_deploy_a_ejecucion = {
-                imp["DeploymentId"]: imp["EjecucionId"] for imp in ejecuciones_en_curso if imp.get("DeploymentId") and imp.get("EjecucionId")
-            }
-            deployment_ids = list(mapa_deploy_a_ejecucion.keys())
-
-            if not deployment_ids:
-                logger.info("No se encontraron DeploymentIds válidos en las ejecuciones activas.")
+            # Solo se consultan a A360 las ejecuciones cuya revisión ya venció.
+            vencidas = self._agenda.extraer_vencidas(ahora, limite=self._max_consultas_por_ciclo)
+            if not vencidas:
+                logger.info(
+                    f"Ninguna de las {len(self._agenda)} ejecuciones activas requiere revisión. "
+                    f"Próxima revisión: {self._agenda.proximo_vencimiento()}."
+                )
                 return
 
-            logger.info(f"Consultando estado de {len(deployment_ids)} deployment(s) en A360...")
-            detalles_api = await self._aa_client.obtener_detalles_por_deployment_ids(deployment_ids)
+            mapa_deploy_a_ejecucion = {imp["DeploymentId"]: imp["EjecucionId"] for imp in vencidas}
+            deployment_ids = list(mapa_deploy_a_ejecucion.keys())
+
+            logger.info(f"Consultando estado de {len(deployment_ids)} de {len(self._agenda)} deployment(s) activos en A360...")
+            detalles_api = None
+            try:
+                detalles_api = await self._aa_client.obtener_detalles_por_deployment_ids(deployment_ids)
 
-            self._actualizar_estados_encontrados(detalles_api, mapa_deploy_a_ejecucion)
-            self._gestionar_deployments_perdidos(deployment_ids, detalles_api, mapa_deploy_a_ejecucion)
+                await self._actualizar_estados_encontrados(detalles_api, mapa_deploy_a_ejecucion)
+                await self._gestionar_deployments_perdidos(deployment_ids, detalles_api, mapa_deploy_a_ejecucion)
+            finally:
+                self._reagendar_revisadas(vencidas, detalles_api, ahora)
 
         except Exception as e:
             logger.error(f"Error grave durante el ciclo de conciliación: {e}", exc_info=True)
 
-    def _actualizar_estados_encontrados(self, detalles_api: list, mapa_deploy_a_ejecucion: dict):
+    def _reagendar_revisadas(self, revisadas: List[Dict], detalles_api: Optional[list], ahora: datetime):
+        """
+        Reagenda las ejecuciones revisadas. Las que ya quedaron en un estado final
+        salen de la agenda en la próxima sincronización con la BD.
+        """
+        if detalles_api is None:
+            for ejecucion in revisadas:
+                self._agenda.reagendar(ejecucion, ahora)
+            return
+
+        ids_encontrados_api = {item.get("deploymentId") for item in detalles_api}
+        for ejecucion in revisadas:
+            if ejecucion["DeploymentId"] in ids_encontrados_api:
+                self._agenda.reagendar(ejecucion, ahora, intentos_fallidos=0)
+            else:
+                intentos = (ejecucion.get("IntentosConciliadorFallidos") or 0) + 1
+                self._agenda.reagendar(ejecucion, ahora, intentos_fallidos=intentos)
+
+    async def _refrescar_duraciones_esperadas(self, ahora: datetime):
+        """Recalcula periódicamente la duración típica de cada robot a partir de su historial."""
+        if self._duraciones_actualizadas_en and ahora - self._duraciones_actualizadas_en < self.INTERVALO_REFRESCO_DURACIONES:
+            return
+        query = """
+            SELECT RobotId, AVG(CAST(DATEDIFF(SECOND, FechaInicio, FechaFin) AS FLOAT)) AS DuracionPromedioSeg
+            FROM dbo.Ejecuciones
+            WHERE Estado IN ('COMPLETED', 'RUN_COMPLETED')
+              AND FechaFin IS NOT NULL AND FechaFin > FechaInicio
+              AND FechaInicio >= DATEADD(DAY, -?, GETDATE())
+            GROUP BY RobotId;
+        """
+        try:
+            filas = await self._db_connector.ejecutar_consulta(query, (self.DIAS_HISTORIAL_DURACIONES,), es_select=True) or []
+            self._agenda.actualizar_duraciones({f["RobotId"]: f["DuracionPromedioSeg"] for f in filas})
+            logger.debug(f"Duraciones esperadas actualizadas para {len(filas)} robots.")
+        except Exception as e:
+            logger.warning(f"No se pudieron actualizar las duraciones esperadas de los robots: {e}")
+        self._duraciones_actualizadas_en = ahora
+
+    async def _actualizar_estados_encontrados(self, detalles_api: list, mapa_deploy_a_ejecucion: dict):
         """Actualiza la BD con los estados de los deployments encontrados en la API."""
         if not detalles_api:
             return
@@ -102,10 +172,10 @@ class Conciliador:
                 SET Estado = ?, FechaFin = ?, FechaActualizacion = GETDATE(), IntentosConciliadorFallidos = 0
                 WHERE EjecucionId = ? AND CallbackInfo IS NULL;
             """
-            affected_count = self._db_connector.ejecutar_consulta_multiple(query, updates_params)
+            affected_count = await self._db_connector.ejecutar_consulta_multiple(query, updates_params)
             logger.info(f"Se actualizaron {affected_count} registros de ejecuciones desde la API.")
 
-    def _gestionar_deployments_perdidos(self, deployment_ids_en_db: list, detalles_api: list, mapa_deploy_a_ejecucion: dict):
+    async def _gestionar_deployments_perdidos(self, deployment_ids_en_db: list, detalles_api: list, mapa_deploy_a_ejecucion: dict):
         """Gestiona los deployments que no fueron devueltos por la API de A360."""
         ids_encontrados_api = {item.get("deploymentId") for item in detalles_api}
         ids_perdidos = [dep_id for dep_id in deployment_ids_en_db if dep_id not in ids_encontrados_api]
@@ -119,12 +189,12 @@ class Conciliador:
 
         placeholders = ",".join("?" * len(ejecucion_ids_perdidos))
         query_increment = f"UPDATE dbo.Ejecuciones SET IntentosConciliadorFallidos = IntentosConciliadorFallidos + 1, FechaActualizacion = GETDATE() WHERE EjecucionId IN ({placeholders}) AND CallbackInfo IS NULL;"
-        self._db_connector.ejecutar_consulta(query_increment, tuple(ejecucion_ids_perdidos), es_select=False)
+        await self._db_connector.ejecutar_consulta(query_increment, tuple(ejecucion_ids_perdidos), es_select=False)
         logger.info(f"Incrementado contador de intentos para {len(ejecucion_ids_perdidos)} deployment(s) no encontrados en la API.")
 
         query_unknown = f"UPDATE dbo.Ejecuciones SET Estado = 'UNKNOWN', FechaFin = GETDATE(), FechaActualizacion = GETDATE() WHERE EjecucionId IN ({placeholders}) AND IntentosConciliadorFallidos >= ?;"
         params_unknown = tuple(ejecucion_ids_perdidos) + (self._max_intentos_fallidos,)
-        count_unknown = self._db_connector.ejecutar_consulta(query_unknown, params_unknown, es_select=False)
+        count_unknown = await self._db_connector.ejecutar_consulta(query_unknown, params_unknown, es_select=False)
 
         if count_unknown > 0:
             logger.warning(
@@ -1,15 +1,20 @@
 # sam/lanzador/service/desplegador.py
 import asyncio
 import logging
+import time
 from datetime import datetime
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, List, Optional
 
 import httpx
 import pytz
 
 from sam.common.a360_client import AutomationAnywhereClient
 from sam.common.apigw_client import ApiGatewayClient
-from sam.common.database import DatabaseConnector
+from sam.common.database import AsyncDatabaseConnector
+from sam.common.metricas import calcular_percentiles
+
+from .calendario_programaciones import CalendarioProgramaciones
+from .registrador_ejecuciones import RegistradorEjecuciones
 
 logger = logging.getLogger(__name__)
 
@@ -23,7 +28,7 @@ class Desplegador:
 
     def __init__(
         self,
-        db_connector: DatabaseConnector,
+        db_connector: AsyncDatabaseConnector,
         aa_client: AutomationAnywhereClient,
         api_gateway_client: ApiGatewayClient,
         lanzador_config: Dict[str, Any],
@@ -33,7 +38,7 @@ class Desplegador:
         Inicializa el Desplegador con sus dependencias.
 
         Args:
-            db_connector: Conector a la base de datos de SAM.
+            db_connector: Conector asíncrono a la base de datos de SAM.
             aa_client: Cliente para la API de Automation Anywhere.
             api_gateway_client: Cliente para el API Gateway.
             lanzador_config: Diccionario con la configuración específica del lanzador.
@@ -44,17 +49,46 @@ class Desplegador:
         self._api_gateway_client = api_gateway_client
         self._lanzador_cfg = lanzador_config
         self._static_callback_api_key = callback_token
+        self._registrador = RegistradorEjecuciones(
+            db_connector=db_connector,
+            tamano_lote=lanzador_config.get("lote_registro_ejecuciones", 50),
+            ruta_diario=lanzador_config.get("archivo_ejecuciones_pendientes", "sam_lanzador_ejecuciones_pendientes.jsonl"),
+        )
+        # Con el motor "calendario" las programaciones se evalúan en memoria y la BD solo
+        # informa disponibilidad; con "procedimiento" se usa dbo.ObtenerRobotsEjecutables.
+        self._calendario = None
+        if lanzador_config.get("motor_programaciones", "procedimiento") == "calendario":
+            self._calendario = CalendarioProgramaciones(
+                db_connector=db_connector,
+                intervalo_revision_seg=lanzador_config.get("calendario_revision_seg", 60),
+                gracia_seg=lanzador_config.get("intervalo_lanzamiento", 120),
+            )
+        # Entre la consulta de disponibilidad y el INSERT de cada despliegue, dos ciclos
+        # simultáneos (periódico y por evento) verían libres los mismos equipos.
+        self._lock_ciclo = asyncio.Lock()
+        # Métricas del último ciclo de despliegue (latencias en segundos por robot).
+        self.metricas_ultimo_ciclo: Dict[str, Any] = {}
 
-    async def desplegar_robots_pendientes(self):
+    async def desplegar_robots_pendientes(self, equipo_ids: Optional[Iterable[int]] = None):
         """
         Orquesta un ciclo completo de despliegue de robots.
+
+        Args:
+            equipo_ids: Si se indica, el ciclo se limita a esos equipos (p.ej. los recién liberados por un callback).
         """
+        async with self._lock_ciclo:
+            await self._desplegar(set(equipo_ids) if equipo_ids is not None else None)
+
+    async def _desplegar(self, equipo_ids: Optional[set]):
+        # Reintenta registrar despliegues de ciclos anteriores que no llegaron a la BD.
+        await self._registrador.volcar()
+
         if self._esta_en_pausa():
             logger.info("El servicio se encuentra en la ventana de pausa operacional. No se lanzarán robots.")
             return
 
         logger.info("Buscando robots para ejecutar...")
-        robots_a_ejecutar = self._db_connector.obtener_robots_ejecutables()
+        robots_a_ejecutar = await self._obtener_robots_a_ejecutar(equipo_ids)
 
         if not robots_a_ejecutar:
             logger.info("No hay robots para ejecutar en este ciclo.")
@@ -66,17 +100,73 @@ class Desplegador:
 
         logger.info(f"{len(robots_a_ejecutar)} robots encontrados. Desplegando en paralelo (límite: {concurrency_limit})...")
 
-        tasks = [asyncio.create_task(self._desplegar_y_registrar_robot(robot_info, bot_input, auth_headers)) for robot_info in robots_a_ejecutar]
+        inicio_ciclo = time.monotonic()
+        cola_robots: asyncio.Queue = asyncio.Queue()
+        for robot_info in robots_a_ejecutar:
+            cola_robots.put_nowait(robot_info)
 
-        successful_deploys = 0
-        failed_deploys = 0
-        for i in range(0, len(tasks), concurrency_limit):
-            batch = tasks[i : i + concurrency_limit]
-            results = await asyncio.gather(*batch)
-            successful_deploys += sum(1 for _, success in results if success)
-            failed_deploys += sum(1 for _, success in results if not success)
+        resultados: List[bool] = []
+        latencias: List[float] = []
+        # Ventana deslizante: cada worker toma el siguiente robot apenas termina el anterior,
+        # así un despliegue lento ocupa un solo cupo en lugar de frenar un lote entero.
+        workers = [
+            asyncio.create_task(self._worker_despliegue(cola_robots, bot_input, auth_headers, resultados, latencias))
+            for _ in range(min(max(concurrency_limit, 1), len(robots_a_ejecutar)))
+        ]
+        await asyncio.gather(*workers)
 
+        successful_deploys = sum(1 for success in resultados if success)
+        failed_deploys = len(resultados) - successful_deploys
+
+        await self._registrador.esperar_volcado_en_curso()
+        await self._registrador.volcar()
+        self.metricas_ultimo_ciclo = {
+            "duracion_seg": round(time.monotonic() - inicio_ciclo, 3),
+            "exitosos": successful_deploys,
+            "fallidos": failed_deploys,
+            "latencia_despliegue_seg": calcular_percentiles(latencias),
+        }
         logger.info(f"Ciclo de despliegue completado. Exitosos: {successful_deploys}, Fallidos: {failed_deploys}.")
+        logger.info(f"Métricas del ciclo de despliegue: {self.metricas_ultimo_ciclo}")
+
+    async def _obtener_robots_a_ejecutar(self, equipo_ids: Optional[set] = None) -> List[Dict]:
+        """
+        Mismo resultado que dbo.ObtenerRobotsEjecutables: primero los programados en ventana
+        (un robot por equipo libre), después los online en los equipos restantes.
+        """
+        if self._calendario is None:
+            robots = await self._db_connector.obtener_robots_ejecutables()
+            return robots if equipo_ids is None else [r for r in robots if r["EquipoId"] in equipo_ids]
+
+        programados = await self._calendario.robots_programados_pendientes()
+        if equipo_ids is None:
+            online = await self._db_connector.obtener_robots_online_disponibles()
+        else:
+            programados = [r for r in programados if r["EquipoId"] in equipo_ids]
+            online = await self._db_connector.obtener_robots_online_disponibles(sorted(equipo_ids))
+        if not programados:
+            return online
+
+        ocupados = set(await self._db_connector.obtener_equipos_ocupados())
+        elegidos: Dict[int, Dict] = {}
+        for robot_info in programados:
+            if robot_info["EquipoId"] not in ocupados:
+                elegidos.setdefault(robot_info["EquipoId"], robot_info)
+        return list(elegidos.values()) + [r for r in online if r["EquipoId"] not in elegidos]
+
+    async def _worker_despliegue(
+        self, cola_robots: asyncio.Queue, bot_input: Dict, auth_headers: Dict, resultados: List[bool], latencias: List[float]
+    ):
+        """Consume robots de la cola hasta vaciarla, manteniendo como máximo un despliegue en curso por worker."""
+        while True:
+            try:
+                robot_info = cola_robots.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            inicio = time.monotonic()
+            _, success = await self._desplegar_y_registrar_robot(robot_info, bot_input, auth_headers)
+            latencias.append(time.monotonic() - inicio)
+            resultados.append(success)
 
     async def _desplegar_y_registrar_robot(self, robot_info: Dict, bot_input: Dict, auth_headers: Dict) -> tuple[int, bool]:
         """
@@ -94,15 +184,8 @@ class Desplegador:
                 )
 
                 if deployment_result and "deploymentId" in deployment_result:
-                    self._db_connector.insertar_registro_ejecucion(
-                        id_despliegue=deployment_result["deploymentId"],
-                        db_robot_id=robot_id,
-                        db_equipo_id=robot_info.get("EquipoId"),
-                        a360_user_id=robot_info["UserId"],
-                        marca_tiempo_programada=robot_info.get("Hora"),
-                        estado="DEPLOYED",
-                    )
                     logger.info(f"Robot {robot_id} desplegado con ID: {deployment_result['deploymentId']} (Intento {attempt}/{max_attempts})")
+                    await self._registrar_despliegue(robot_info, deployment_result["deploymentId"])
                     return robot_id, True
                 else:
                     error_msg = deployment_result.get("error", "Fallo al obtener deploymentId")
@@ -131,6 +214,27 @@ class Desplegador:
         logger.error(f"El despliegue del robot {robot_id} falló después de {max_attempts} intentos.")
         return robot_id, False
 
+    async def _registrar_despliegue(self, robot_info: Dict, deployment_id: str):
+        """
+        Registra un despliegue que A360 ya aceptó. Un error acá no convierte el despliegue en
+        fallido: lo que no se pudo registrar queda pendiente en el registrador.
+        """
+        if self._calendario is not None and robot_info.get("InicioProgramado") is not None:
+            self._calendario.confirmar_lanzamiento(robot_info)
+        try:
+            await self._registrador.registrar(
+                {
+                    "DeploymentId": deployment_id,
+                    "RobotId": robot_info["RobotId"],
+                    "EquipoId": robot_info.get("EquipoId"),
+                    "UserId": robot_info["UserId"],
+                    "Hora": robot_info.get("Hora"),
+                    "Estado": "DEPLOYED",
+                }
+            )
+        except Exception as e:
+            logger.error(f"El robot {robot_info['RobotId']} se desplegó ({deployment_id}) pero no se pudo registrar: {e}", exc_info=True)
+
     async def _preparar_cabeceras_callback(self) -> Dict[str, str]:
         """Obtiene y combina las cabeceras de autorización para el callback."""
         combined_headers = {}
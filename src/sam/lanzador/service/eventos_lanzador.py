@@ -0,0 +1,66 @@
+# sam/lanzador/service/eventos_lanzador.py
+import logging
+import time
+from typing import Optional, Set
+
+from sam.common.database import AsyncDatabaseConnector
+
+logger = logging.getLogger(__name__)
+
+
+class VigilanteEventosLanzador:
+    """
+    Lee los avisos de equipos liberados que el callback anota en dbo.EventosLanzador
+    (migración 8), en el mismo lote que finaliza la ejecución.
+
+    La tabla se sondea con una marca de agua (el último EventoId leído), que arranca en
+    el máximo existente: los eventos anteriores al inicio ya los cubre el ciclo periódico.
+    Un aviso perdido (p.ej. un EventoId que se confirma después de uno mayor ya leído)
+    solo retrasa el equipo hasta ese ciclo, que sigue siendo la red de seguridad.
+    """
+
+    def __init__(self, db_connector: AsyncDatabaseConnector, lote_max: int = 500, retencion_min: int = 60):
+        """
+        Args:
+            db_connector: Conector asíncrono a la base de datos de SAM.
+            lote_max: Máximo de eventos leídos por sondeo.
+            retencion_min: Minutos que se conservan los eventos antes de purgarlos.
+        """
+        self._db_connector = db_connector
+        self.lote_max = lote_max
+        self.retencion_min = retencion_min
+        self._marca: Optional[int] = None
+        self._ultima_purga = time.monotonic()
+
+    async def obtener_equipos_liberados(self) -> Set[int]:
+        """Retorna los EquipoId avisados desde el sondeo anterior."""
+        if self._marca is None:
+            filas = await self._db_connector.ejecutar_consulta(
+                "SELECT ISNULL(MAX(EventoId), 0) AS Marca FROM dbo.EventosLanzador;", es_select=True
+            )
+            self._marca = filas[0]["Marca"] if filas else 0
+            logger.info(f"Vigilante de eventos del lanzador iniciado desde el EventoId {self._marca}.")
+            return set()
+
+        query = """
+            SELECT TOP (?) EventoId, EquipoId FROM dbo.EventosLanzador
+            WHERE EventoId > ?
+            ORDER BY EventoId;
+        """
+        filas = await self._db_connector.ejecutar_consulta(query, (self.lote_max, self._marca), es_select=True) or []
+        if filas:
+            self._marca = filas[-1]["EventoId"]
+        await self._purgar_si_corresponde()
+        return {fila["EquipoId"] for fila in filas}
+
+    async def _purgar_si_corresponde(self):
+        if time.monotonic() - self._ultima_purga < 60 * max(self.retencion_min, 1) / 4:
+            return
+        self._ultima_purga = time.monotonic()
+        borrados = await self._db_connector.ejecutar_consulta(
+            "DELETE FROM dbo.EventosLanzador WHERE FechaEvento < DATEADD(MINUTE, -?, SYSDATETIME());",
+            (self.retencion_min,),
+            es_select=False,
+        )
+        if borrados:
+            logger.debug(f"Se purgaron {borrados} eventos del lanzador.")
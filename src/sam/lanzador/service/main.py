@@ -1,12 +1,13 @@
 # sam/lanzador/service/main.py
 import asyncio
 import logging
-from typing import List
+from typing import List, Optional
 
 from sam.common.mail_client import EmailAlertClient
 
 from .conciliador import Conciliador
 from .desplegador import Desplegador
+from .eventos_lanzador import VigilanteEventosLanzador
 from .sincronizador import Sincronizador
 
 logger = logging.getLogger(__name__)
@@ -28,6 +29,7 @@ class LanzadorService:
         notificador: EmailAlertClient,
         lanzador_config: dict,
         sync_enabled: bool,
+        vigilante_eventos: Optional[VigilanteEventosLanzador] = None,
     ):
         """
         Inicializa el Orquestador con sus componentes de lógica ya creados (Inyección de Dependencias).
@@ -39,6 +41,7 @@ class LanzadorService:
         self._notificador = notificador
         self._lanzador_cfg = lanzador_config
         self._sync_enabled = sync_enabled
+        self._vigilante_eventos = vigilante_eventos
 
         self._shutdown_event = asyncio.Event()
         self._tasks: List[asyncio.Task] = []
@@ -71,6 +74,8 @@ class LanzadorService:
 
         self._tasks.append(asyncio.create_task(self._run_launcher_cycle(self._lanzador_cfg["intervalo_lanzamiento"])))
         self._tasks.append(asyncio.create_task(self._run_conciliador_cycle(self._lanzador_cfg["intervalo_conciliacion"])))
+        if self._vigilante_eventos is not None:
+            self._tasks.append(asyncio.create_task(self._run_eventos_cycle(self._lanzador_cfg.get("eventos_sondeo_seg", 2))))
 
         # Espera a que todas las tareas finalicen
         await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -105,5 +110,24 @@ class LanzadorService:
     async def _run_launcher_cycle(self, interval: int):
         await self._run_generic_cycle(self._desplegador, "desplegar_robots_pendientes", interval, "Lanzamiento")
 
+    async def _run_eventos_cycle(self, interval: float):
+        """
+        Sondea los avisos de equipos liberados y despliega en ellos sin esperar el ciclo de
+        lanzamiento. No usa la plantilla genérica para no registrar (ni alertar) cada sondeo.
+        """
+        logger.info(f"Lanzamiento por eventos habilitado (sondeo cada {interval}s).")
+        while not self._shutdown_event.is_set():
+            try:
+                equipos = await self._vigilante_eventos.obtener_equipos_liberados()
+                if equipos:
+                    logger.info(f"Equipos liberados por callback: {sorted(equipos)}. Desplegando en ellos...")
+                    await self._desplegador.desplegar_robots_pendientes(equipo_ids=equipos)
+            except Exception as e:
+                logger.error(f"Error en el ciclo de lanzamiento por eventos: {e}", exc_info=True)
+            try:
+                await asyncio.wait_for(self._shutdown_event.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+
     async def _run_conciliador_cycle(self, interval: int):
         await self._run_generic_cycle(self._conciliador, "conciliar_ejecuciones", interval, "Conciliación")
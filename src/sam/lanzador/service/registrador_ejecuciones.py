@@ -0,0 +1,141 @@
+# sam/lanzador/service/registrador_ejecuciones.py
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from sam.common.database import AsyncDatabaseConnector, es_error_de_conexion
+from sam.common.diario_persistente import DiarioPersistente
+
+logger = logging.getLogger(__name__)
+
+
+class RegistradorEjecuciones:
+    """
+    Inserta en dbo.Ejecuciones cada despliegue exitoso apenas A360 lo acepta, para que la
+    fila exista antes de que llegue su callback. `registrar` solo anota y encola: el INSERT
+    corre en una tarea de fondo, y los despliegues que terminan mientras está en curso se
+    agrupan en el siguiente (hasta `tamano_lote` por llamada), así ningún worker de
+    despliegue espera a la BD.
+
+    Cada despliegue se anota primero en un diario local, de modo que un despliegue
+    aceptado por A360 no se pierde aunque la BD no esté disponible o el proceso caiga.
+    Si la BD no responde, los volcados de fondo se suspenden hasta el próximo `volcar`
+    explícito (uno por ciclo del lanzador).
+    """
+
+    def __init__(self, db_connector: AsyncDatabaseConnector, tamano_lote: int, ruta_diario: str):
+        """
+        Args:
+            db_connector: Conector asíncrono a la base de datos de SAM.
+            tamano_lote: Máximo de registros por INSERT.
+            ruta_diario: Archivo local donde se guardan los registros aún no persistidos.
+        """
+        self._db_connector = db_connector
+        self._tamano_lote = max(tamano_lote, 1)
+        self._diario = DiarioPersistente(ruta_diario, campo_clave="DeploymentId")
+        self._lock = asyncio.Lock()
+        self._tarea_volcado: Optional[asyncio.Task] = None
+        self._bd_disponible = True
+
+        # Lo que quedó en el diario es de una ejecución anterior que no llegó a volcarse.
+        self._pendientes: List[Dict[str, Any]] = self._diario.leer()
+        if self._pendientes:
+            logger.warning(
+                f"Se recuperaron {len(self._pendientes)} ejecuciones desplegadas sin registrar en la BD. "
+                "Se registrarán en el próximo volcado."
+            )
+
+    @property
+    def cantidad_pendientes(self) -> int:
+        return len(self._pendientes)
+
+    async def registrar(self, registro: Dict[str, Any]) -> None:
+        """
+        Anota un despliegue exitoso, lo encola y dispara su INSERT sin esperarlo. No lanza
+        excepciones: si el diario o la BD fallan, el despliegue sigue siendo exitoso.
+        """
+        try:
+            await self._diario.agregar_async([registro])
+        except OSError as e:
+            logger.error(f"No se pudo anotar el despliegue {registro['DeploymentId']} en el diario local: {e}")
+        self._pendientes.append(registro)
+        if self._bd_disponible and (self._tarea_volcado is None or self._tarea_volcado.done()):
+            self._tarea_volcado = asyncio.create_task(self._volcar_en_segundo_plano())
+
+    async def _volcar_en_segundo_plano(self):
+        # Lo que llega durante un volcado sale en el siguiente, mientras la BD responda. Si un
+        # volcado no confirma nada, los pendientes esperan al próximo `registrar` o `volcar`.
+        while self._pendientes and self._bd_disponible:
+            if not await self.volcar():
+                break
+
+    async def esperar_volcado_en_curso(self):
+        """Espera a que termine el volcado de fondo, si hay uno."""
+        if self._tarea_volcado is not None:
+            await asyncio.gather(self._tarea_volcado, return_exceptions=True)
+
+    async def volcar(self) -> int:
+        """
+        Inserta los registros pendientes en lotes de hasta `tamano_lote`. Si un lote falla por
+        un error de datos, reintenta fila por fila; si la BD no está disponible, el lote y los
+        siguientes quedan pendientes sin más intentos hasta el próximo volcado.
+        """
+        async with self._lock:
+            # Si otro volcado ya insertó este registro mientras se esperaba el lock, no queda nada.
+            lote, self._pendientes = self._pendientes, []
+            if not lote:
+                return 0
+
+            confirmados: List[Dict[str, Any]] = []
+            self._bd_disponible = True
+            for inicio in range(0, len(lote), self._tamano_lote):
+                if not self._bd_disponible:
+                    self._pendientes.extend(lote[inicio:])
+                    break
+                confirmados += await self._insertar(lote[inicio : inicio + self._tamano_lote])
+
+            if not confirmados:
+                return 0
+            try:
+                await self._diario.confirmar_async([r["DeploymentId"] for r in confirmados])
+            except OSError as e:
+                # Quedan en el diario; tras un reinicio se reinsertan sin duplicar (INSERT idempotente por DeploymentId).
+                logger.error(f"No se pudo depurar el diario local de ejecuciones: {e}")
+            logger.debug(f"Se registraron {len(confirmados)} de {len(lote)} ejecuciones en dbo.Ejecuciones.")
+            return len(confirmados)
+
+    async def _insertar(self, lote: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        try:
+            await self._db_connector.insertar_registros_ejecucion([self._a_parametros(r) for r in lote])
+            return lote
+        except Exception as e:
+            if es_error_de_conexion(e):
+                logger.error(f"BD no disponible al registrar {len(lote)} ejecuciones. Quedan pendientes: {e}")
+                self._bd_disponible = False
+                self._pendientes.extend(lote)
+                return []
+            logger.error(f"Error al registrar un lote de {len(lote)} ejecuciones. Reintentando de a una: {e}")
+        confirmados = []
+        for indice, registro in enumerate(lote):
+            try:
+                await self._db_connector.insertar_registros_ejecucion([self._a_parametros(registro)])
+                confirmados.append(registro)
+            except Exception as inner_e:
+                logger.error(f"No se pudo registrar la ejecución {registro['DeploymentId']}: {inner_e}")
+                if es_error_de_conexion(inner_e):
+                    self._bd_disponible = False
+                    self._pendientes.extend(lote[indice:])
+                    break
+                self._pendientes.append(registro)
+        return confirmados
+
+    @staticmethod
+    def _a_parametros(registro: Dict[str, Any]) -> tuple:
+        return (
+            registro["DeploymentId"],
+            registro["RobotId"],
+            registro.get("EquipoId"),
+            registro.get("UserId"),
+            registro.get("Hora"),
+            registro.get("Estado", "DEPLOYED"),
+        )
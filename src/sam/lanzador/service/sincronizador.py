@@ -2,7 +2,7 @@
 import logging
 
 from sam.common.a360_client import AutomationAnywhereClient
-from sam.common.database import DatabaseConnector
+from sam.common.database import AsyncDatabaseConnector
 # RFR-29: Se importa el nuevo sincronizador común
 from sam.common.sincronizador_comun import SincronizadorComun
 
@@ -15,7 +15,7 @@ class Sincronizador:
     es invocar al componente de sincronización común.
     """
 
-    def __init__(self, db_connector: DatabaseConnector, aa_client: AutomationAnywhereClient):
+    def __init__(self, db_connector: AsyncDatabaseConnector, aa_client: AutomationAnywhereClient):
         """
         Inicializa el Sincronizador con sus dependencias.
         """
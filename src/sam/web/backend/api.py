@@ -4,11 +4,11 @@ from typing import Dict, Optional
 
 from fastapi import APIRouter, Body, Depends, HTTPException, Query
 
-from sam.common.database import DatabaseConnector
+from sam.common.database import AsyncDatabaseConnector, DatabaseConnector
 
 # Importa los servicios desde el archivo local de base de datos
 from . import database as db_service
-from .dependencies import get_db
+from .dependencies import get_async_db, get_db
 
 # Importa los schemas desde el archivo local de schemas
 from .schemas import (
@@ -27,7 +27,7 @@ router = APIRouter()
 
 
 @router.post("/api/sync", tags=["Sincronización"])
-async def trigger_sync(db: DatabaseConnector = Depends(get_db)):
+async def trigger_sync(db: AsyncDatabaseConnector = Depends(get_async_db)):
     """
     Dispara el proceso de sincronización manual con Automation Anywhere A360.
     """
@@ -5,7 +5,7 @@ from typing import Dict, List, Optional
 
 from sam.common.a360_client import AutomationAnywhereClient
 from sam.common.config_manager import ConfigManager
-from sam.common.database import DatabaseConnector
+from sam.common.database import AsyncDatabaseConnector, DatabaseConnector
 
 # RFR-29: Se importa el nuevo sincronizador común
 from sam.common.sincronizador_comun import SincronizadorComun
@@ -105,9 +105,12 @@ def update_robot_details(db: DatabaseConnector, robot_id: int, robot_data: Robot
 
 
 def create_robot(db: DatabaseConnector, robot_data: RobotCreateRequest) -> Dict:
+    # Columnas explícitas: VersionFila (rowversion, migración 5) llega como bytes y no es serializable a JSON.
     query = """
         INSERT INTO dbo.Robots (RobotId, Robot, Descripcion, MinEquipos, MaxEquipos, PrioridadBalanceo, TicketsPorEquipoAdicional)
-        OUTPUT INSERTED.*
+        OUTPUT INSERTED.RobotId, INSERTED.Robot, INSERTED.Descripcion, INSERTED.Parametros, INSERTED.Activo,
+               INSERTED.EsOnline, INSERTED.MinEquipos, INSERTED.MaxEquipos, INSERTED.PrioridadBalanceo,
+               INSERTED.TicketsPorEquipoAdicional, INSERTED.PoolId
         VALUES (?, ?, ?, ?, ?, ?, ?);
     """
     params = (
@@ -350,7 +353,7 @@ def assign_resources_to_pool(db: DatabaseConnector, pool_id: int, robot_ids: Lis
 
 
 # Sincronización con A360
-async def sync_with_a360(db: DatabaseConnector) -> Dict:
+async def sync_with_a360(db: AsyncDatabaseConnector) -> Dict:
     """
     Orquesta la sincronización de las tablas Robots y Equipos con A360
     utilizando el nuevo componente centralizado.
@@ -364,6 +367,9 @@ async def sync_with_a360(db: DatabaseConnector) -> Dict:
             username=aa_config["usuario"],
             password=aa_config.get("pwd"),
             api_key=aa_config.get("api_key"),
+            page_size_default=aa_config.get("page_size_default"),
+            max_paginas=aa_config.get("max_paginas"),
+            paginacion_concurrencia=aa_config.get("paginacion_concurrencia"),
         )
         # Se instancia el sincronizador común, inyectando las dependencias
         sincronizador = SincronizadorComun(db_connector=db, aa_client=aa_client)
@@ -3,7 +3,7 @@ from typing import Optional
 
 from fastapi import HTTPException
 
-from sam.common.database import DatabaseConnector
+from sam.common.database import AsyncDatabaseConnector, DatabaseConnector
 
 
 class DBDependencyProvider:
@@ -15,10 +15,12 @@ class DBDependencyProvider:
 
     def __init__(self):
         self._db_connector: Optional[DatabaseConnector] = None
+        self._async_db_connector: Optional[AsyncDatabaseConnector] = None
 
     def set_db_connector(self, db_connector: DatabaseConnector):
         """Este método es llamado una vez al inicio desde run_dashboard.py."""
         self._db_connector = db_connector
+        self._async_db_connector = AsyncDatabaseConnector(db_connector)
 
     def get_db_connector(self) -> DatabaseConnector:
         """Esta es la función que FastAPI usará con `Depends`."""
@@ -29,6 +31,22 @@ class DBDependencyProvider:
             )
         return self._db_connector
 
+    def get_async_db_connector(self) -> AsyncDatabaseConnector:
+        """Variante para endpoints `async def`, que no deben bloquear el event loop."""
+        if self._async_db_connector is None:
+            raise HTTPException(
+                status_code=503,
+                detail="La conexión a la base de datos no está disponible.",
+            )
+        return self._async_db_connector
+
+    def cerrar(self):
+        """Libera el executor y las conexiones del pool."""
+        if self._async_db_connector:
+            self._async_db_connector.cerrar()
+        elif self._db_connector:
+            self._db_connector.cerrar_conexiones_pool()
+
 
 # Creamos una instancia única que será compartida por toda la aplicación.
 db_dependency_provider = DBDependencyProvider()
@@ -36,3 +54,4 @@ db_dependency_provider = DBDependencyProvider()
 # Creamos el objeto `Depends` para usar en los endpoints.
 # Es una convención útil para no tener que importar la instancia en cada archivo de ruta.
 get_db = db_dependency_provider.get_db_connector
+get_async_db = db_dependency_provider.get_async_db_connector
@@ -10,6 +10,7 @@ from sam.common.config_loader import ConfigLoader
 from sam.common.config_manager import ConfigManager
 from sam.common.database import DatabaseConnector
 from sam.common.logging_setup import setup_logging
+from sam.web.backend.dependencies import db_dependency_provider
 
 # Importamos la app y la fábrica desde main
 from sam.web.main import create_app
@@ -86,7 +87,7 @@ def main():
     finally:
         logger.info("Iniciando limpieza final de recursos...")
         if db_connector:
-            db_connector.cerrar_conexion_hilo_actual()
+            db_dependency_provider.cerrar()
         logger.info(f"El servicio {SERVICE_NAME} ha concluido su ejecución y liberado recursos.")
 
 
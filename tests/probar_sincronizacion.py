@@ -24,7 +24,7 @@ except Exception as e:
 # --- Importaciones de los componentes necesarios ---
 from sam.common.a360_client import AutomationAnywhereClient
 from sam.common.config_manager import ConfigManager
-from sam.common.database import DatabaseConnector
+from sam.common.database import AsyncDatabaseConnector, DatabaseConnector
 from sam.common.logging_setup import setup_logging
 from sam.common.sincronizador_comun import SincronizadorComun
 
@@ -59,7 +59,7 @@ async def main():
             api_timeout_seconds=aa_cfg.get("api_timeout_seconds"),
         )
 
-        sincronizador = SincronizadorComun(db_connector=db_connector, aa_client=aa_client)
+        sincronizador = SincronizadorComun(db_connector=AsyncDatabaseConnector(db_connector), aa_client=aa_client)
 
         logging.info("Ejecutando el método 'sincronizar_entidades' del componente común...")
         resultado = await sincronizador.sincronizar_entidades()
@@ -1,10 +1,36 @@
 """Tests para la lógica de negocio del servicio Balanceador."""
 
-from unittest.mock import MagicMock
+import asyncio
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
 from sam.balanceador.service.algoritmo_balanceo import Balanceo
+from sam.balanceador.service.consolidador_carga import ConsolidadorCarga
+from sam.balanceador.service.cooling_manager import CoolingManager
+from sam.balanceador.service.coordinacion import (
+    AlmacenArrendamientosMemoria,
+    ArrendamientoPerdidoError,
+    CercoArrendamiento,
+    CoordinadorBalanceador,
+)
+from sam.balanceador.service.escritor_historico import DecisionHistorica, EscritorHistoricoBalanceo
+from sam.balanceador.service.estado_enfriamiento import BackendEnfriamientoArchivo
+from sam.balanceador.service.historico_client import HistoricoBalanceoClient
+from sam.balanceador.service.indice_robots import IndiceRobots
+from sam.balanceador.service.main import BalanceadorService
+from sam.balanceador.service.motor_disparos import MotorDisparos
+from sam.balanceador.service.planificador_ciclos import PlanificadorCiclos
+from sam.balanceador.service.pronostico_carga import PronosticadorCarga
+from sam.balanceador.service.proveedores import Rpa360Proveedor
+from sam.balanceador.service.solver_asignacion import EquipoCandidato, RobotDemanda, crear_solver
+from sam.balanceador.simulator import Simulador, cargar_flota_desde_historico, generar_flota_sintetica
+from sam.common.migraciones import EsquemaDesactualizadoError
 
 
 @pytest.fixture
@@ -17,7 +43,7 @@ class TestAlgoritmoBalanceo:
     """Tests unitarios para la clase Balanceo, el 'cerebro' del servicio."""
 
     def test_asignar_equipos_minimos_necesarios(self, mock_db_connector: MagicMock, mock_notificador: MagicMock):
-        """Verifica que se asigna un equipo a un robot por debajo de su mínimo."""
+        """Verifica que se planifica un equipo para un robot por debajo de su mínimo."""
         config = {"cooling_period_seg": 300, "aislamiento_estricto_pool": True}
         # CORRECCIÓN: El constructor de Balanceo ahora recibe las dependencias explícitamente.
         algoritmo = Balanceo(db_connector=mock_db_connector, notificador=mock_notificador, config_balanceador=config)
@@ -34,14 +60,13 @@ class TestAlgoritmoBalanceo:
 
         algoritmo.ejecutar_balanceo_interno_de_pool(pool_id=1, estado_global=estado_global)
 
-        mock_db_connector.ejecutar_consulta.assert_called()
-        args, _ = mock_db_connector.ejecutar_consulta.call_args
-        assert "INSERT INTO dbo.Asignaciones" in args[0]
-        assert args[1][0] == 1
-        assert args[1][1] == 102
+        # Las fases solo construyen el plan; la BD se toca al aplicarlo.
+        mock_db_connector.ejecutar_consulta.assert_not_called()
+        plan = estado_global["plan"]
+        assert [(d.robot_id, d.equipo_id) for d in plan.agregar] == [(1, 102)]
 
     def test_desasignar_equipos_excedentes(self, mock_db_connector: MagicMock, mock_notificador: MagicMock):
-        """Verifica que se desasigna un equipo de un robot sin carga de trabajo."""
+        """Verifica que se planifica la desasignación de un robot sin carga de trabajo."""
         config = {"cooling_period_seg": 300, "aislamiento_estricto_pool": True}
         algoritmo = Balanceo(db_connector=mock_db_connector, notificador=mock_notificador, config_balanceador=config)
 
@@ -55,8 +80,705 @@ class TestAlgoritmoBalanceo:
 
         algoritmo.ejecutar_limpieza_global(estado_global=estado_global)
 
-        mock_db_connector.ejecutar_consulta.assert_called()
-        args, _ = mock_db_connector.ejecutar_consulta.call_args
-        assert "DELETE FROM dbo.Asignaciones" in args[0]
-        assert args[1][0] == 2
-        assert args[1][1] in [201, 202]
+        plan = estado_global["plan"]
+        assert len(plan.quitar) == 1
+        assert plan.quitar[0].robot_id == 2
+        assert plan.quitar[0].equipo_id in [201, 202]
+        assert plan.quitar[0].motivo == "DESASIGNAR_ROBOT_NO_CANDIDATO"
+
+    def test_plan_completo_se_aplica_en_una_sola_llamada(self, mock_notificador: MagicMock):
+        """Verifica que el ciclo completo aplica el plan con un único MERGE vía TVP."""
+        db = MagicMock()
+        db.ejecutar_consulta.side_effect = [
+            [
+                {
+                    "RobotId": 1,
+                    "EsOnline": True,
+                    "MinEquipos": 1,
+                    "MaxEquipos": 3,
+                    "PoolId": None,
+                    "TicketsPorEquipoAdicional": 1,
+                }
+            ],
+            [{"EquipoId": 101, "PoolId": None}, {"EquipoId": 102, "PoolId": None}],
+            [{"RobotId": 1, "EquipoId": 101, "EsProgramado": 0, "Reservado": 0}],
+            [{"Agregadas": 1, "Quitadas": 0}],
+        ]
+        algoritmo = Balanceo(
+            db_connector=db,
+            notificador=mock_notificador,
+            config_balanceador={"aislamiento_estricto_pool": True, "cache_estado": False},
+        )
+
+        plan = algoritmo.ejecutar_algoritmo_completo({1: 5}, pools_activos=[])
+
+        assert [(d.robot_id, d.equipo_id, d.motivo) for d in plan.agregar] == [(1, 102, "ASIGNAR_DEMANDA_POOL")]
+        assert [(d.robot_id, d.equipo_id) for d in plan.mantener] == [(1, 101)]
+        query, params = db.ejecutar_consulta.call_args.args
+        assert "dbo.AplicarPlanBalanceo" in query
+        assert params == ([(1, 102, "AGREGAR", "ASIGNAR_DEMANDA_POOL")],)
+        assert algoritmo.cooling_manager.puede_ampliar(1)[0] is False
+
+    def test_historico_se_registra_en_lote_tras_aplicar_el_plan(self, mock_notificador: MagicMock):
+        """Las decisiones aplicadas se insertan en dbo.HistoricoBalanceo en una sola llamada por lote."""
+        db = MagicMock()
+        db.ejecutar_consulta.side_effect = [
+            [
+                {
+                    "RobotId": 1,
+                    "EsOnline": True,
+                    "MinEquipos": 1,
+                    "MaxEquipos": 3,
+                    "PoolId": None,
+                    "TicketsPorEquipoAdicional": 1,
+                }
+            ],
+            [{"EquipoId": e, "PoolId": None} for e in (101, 102, 103)],
+            [{"RobotId": 1, "EquipoId": 101, "EsProgramado": 0, "Reservado": 0}],
+            [{"Agregadas": 2, "Quitadas": 0}],
+        ]
+        config = {
+            "aislamiento_estricto_pool": True,
+            "cache_estado": False,
+            "historico_lote": 100,
+            "ampliacion_completa_por_ciclo": True,
+        }
+        algoritmo = Balanceo(db_connector=db, notificador=mock_notificador, config_balanceador=config)
+
+        algoritmo.ejecutar_algoritmo_completo({1: 5}, pools_activos=[])
+        algoritmo.cerrar()
+
+        cursor = db.obtener_cursor.return_value.__enter__.return_value
+        assert cursor.executemany.call_count == 1
+        assert cursor.fast_executemany is True
+        query, filas = cursor.executemany.call_args.args
+        assert "dbo.HistoricoBalanceo" in query
+        assert [(f[1], f[4], f[5], f[6]) for f in filas] == [
+            (1, 1, 2, "ASIGNAR_DEMANDA_POOL"),
+            (1, 2, 3, "ASIGNAR_DEMANDA_POOL"),
+        ]
+
+    @pytest.mark.parametrize("completa, esperados", [(False, 1), (True, 3)])
+    def test_un_equipo_por_ciclo_salvo_ampliacion_completa(self, mock_notificador: MagicMock, completa, esperados):
+        """Por defecto un robot amplía de a un equipo por ciclo; con ampliación completa, toda su necesidad."""
+        config = {
+            "cooling_period_seg": 300,
+            "aislamiento_estricto_pool": True,
+            "ampliacion_completa_por_ciclo": completa,
+        }
+        algoritmo = Balanceo(db_connector=MagicMock(), notificador=mock_notificador, config_balanceador=config)
+        estado_global = {
+            "mapa_config_robots": {
+                1: {
+                    "RobotId": 1,
+                    "EsOnline": True,
+                    "MinEquipos": 1,
+                    "MaxEquipos": 4,
+                    "PoolId": 1,
+                    "TicketsPorEquipoAdicional": 1,
+                }
+            },
+            "mapa_equipos_validos_por_pool": {1: {101, 102, 103, 104}},
+            "mapa_asignaciones_dinamicas": {1: [101]},
+            "equipos_con_asignacion_fija": set(),
+            "carga_trabajo_por_robot": {1: 10},
+        }
+
+        algoritmo.ejecutar_balanceo_interno_de_pool(pool_id=1, estado_global=estado_global)
+
+        agregar = estado_global["plan"].agregar
+        assert len(agregar) == esperados
+        assert {d.robot_id for d in agregar} == {1}
+
+    def test_escritor_historico_descarta_con_la_cola_llena(self):
+        escritor = EscritorHistoricoBalanceo(MagicMock(), capacidad=2, politica="descartar")
+        decision = DecisionHistorica(datetime(2025, 10, 1), 1, None, 5, 0, 1, "ASIGNAR_DEMANDA_POOL")
+
+        resultados = [escritor.registrar(decision) for _ in range(3)]
+
+        assert resultados == [True, True, False]
+        assert escritor.estadisticas["descartadas"] == 1
+        assert escritor.volcar() == 2
+        assert escritor.cantidad_pendientes == 0
+
+    def test_escritor_historico_cuenta_los_lotes_fallidos(self):
+        """Un error de la BD en el INSERT en lote llega al escritor, que descarta el lote y lo contabiliza."""
+        db = MagicMock()
+        db.obtener_cursor.return_value.__enter__.return_value.executemany.side_effect = Exception("BD no disponible")
+        escritor = EscritorHistoricoBalanceo(HistoricoBalanceoClient(db), tamano_lote=2)
+        decision = DecisionHistorica(datetime(2025, 10, 1), 1, None, 5, 0, 1, "ASIGNAR_DEMANDA_POOL")
+        for _ in range(3):
+            escritor.registrar(decision)
+
+        assert escritor.volcar() == 0
+        assert escritor.estadisticas["lotes_fallidos"] == 2
+        assert escritor.estadisticas["descartadas"] == 3
+
+
+class TestSolverAsignacion:
+    """Tests de los solvers de asignación de equipos libres."""
+
+    def test_flujo_cubre_minimos_y_evita_equipos_recien_liberados(self):
+        """El solver de flujo cubre primero los mínimos y usa los equipos liberados solo si hacen falta."""
+        pytest.importorskip("numpy")
+        solver = crear_solver("flujo")
+        robots = [
+            RobotDemanda(robot_id=1, pool_id=10, prioridad=1, necesidad=3),
+            RobotDemanda(robot_id=2, pool_id=10, prioridad=50, necesidad=1, faltan_para_minimo=1),
+        ]
+        equipos = [
+            EquipoCandidato(101, 10, liberado_en_ciclo=True),
+            EquipoCandidato(102, 10),
+            EquipoCandidato(103, 10),
+        ]
+
+        asignaciones = solver.resolver(robots, equipos)
+
+        assert len(asignaciones) == 3
+        assert len({equipo for _, equipo in asignaciones}) == 3
+        # El robot 2 tiene menor prioridad pero está por debajo de su mínimo.
+        assert sum(1 for rid, _ in asignaciones if rid == 2) == 1
+        # Con un equipo menos, el liberado en el ciclo es el que queda sin usar.
+        asignaciones = solver.resolver(robots[:1] + [robots[1]._replace(necesidad=0)], equipos)
+        assert sorted(equipo for _, equipo in asignaciones) == [101, 102, 103]
+        asignaciones = solver.resolver([robots[0]._replace(necesidad=2)], equipos)
+        assert sorted(equipo for _, equipo in asignaciones) == [102, 103]
+
+    def test_solver_desconocido_usa_greedy(self):
+        solver = crear_solver("inexistente")
+        robots = [RobotDemanda(1, None, 10, 2), RobotDemanda(2, None, 1, 1)]
+        asignaciones = solver.resolver(robots, [EquipoCandidato(e, None) for e in (1, 2)])
+        assert solver.nombre == "greedy"
+        assert asignaciones == [(2, 1), (1, 2)]
+
+
+class TestEstadoBalanceoCache:
+    def _control(self, marca, asignaciones):
+        suma = sum(r * 100003 + e for r, e in asignaciones)
+        return [
+            {
+                "Marca": marca,
+                "FilasRobots": 1,
+                "SumaRobots": 1,
+                "FilasEquipos": 2,
+                "SumaEquipos": 203,
+                "FilasAsignaciones": len(asignaciones),
+                "SumaAsignaciones": suma,
+            }
+        ]
+
+    def test_refresco_incremental_y_recarga_por_deriva(self):
+        """Solo se leen filas modificadas mientras la huella coincide; si no, se recarga todo."""
+        from sam.balanceador.service.estado_balanceo_cache import EstadoBalanceoCache
+
+        robot = {"RobotId": 1, "Activo": True, "EsOnline": True, "PoolId": None}
+        equipos = [
+            {"EquipoId": 101, "PoolId": None, "Activo_SAM": True, "PermiteBalanceoDinamico": True},
+            {"EquipoId": 102, "PoolId": None, "Activo_SAM": True, "PermiteBalanceoDinamico": True},
+        ]
+        nueva = {"RobotId": 1, "EquipoId": 102, "EsProgramado": False, "Reservado": False}
+        db = MagicMock()
+        db.ejecutar_consulta.side_effect = [
+            # 1) Recarga completa inicial.
+            self._control(b"m1", []),
+            [robot],
+            equipos,
+            [],
+            # 2) Refresco incremental: solo llega la asignación nueva.
+            self._control(b"m2", [(1, 102)]),
+            [],
+            [],
+            [nueva],
+            # 3) La asignación se borró fuera del balanceador: la huella no coincide y se recarga.
+            self._control(b"m3", []),
+            [],
+            [],
+            [],
+            [robot],
+            equipos,
+            [],
+        ]
+        cache = EstadoBalanceoCache(db, intervalo_recarga_completa_seg=3600)
+
+        assert cache.obtener_estado()["mapa_asignaciones_dinamicas"] == {}
+        assert cache.obtener_estado()["mapa_asignaciones_dinamicas"] == {1: [102]}
+        assert db.ejecutar_consulta.call_args_list[5].args[1] == (b"m1",)
+        assert cache.obtener_estado()["mapa_asignaciones_dinamicas"] == {}
+        assert cache.estadisticas == {"recargas_completas": 2, "refrescos_incrementales": 1, "derivas": 1}
+
+
+class _ProveedorFalso:
+    """Proveedor de carga controlable desde el test."""
+
+    def __init__(self, nombre, carga):
+        self.nombre = nombre
+        self.carga = carga
+        self.demora = 0.0
+        self.error = None
+        self.llamadas = 0
+
+    def get_nombre(self):
+        return self.nombre
+
+    async def obtener_carga_async(self):
+        self.llamadas += 1
+        await asyncio.sleep(self.demora)
+        if self.error:
+            raise self.error
+        return dict(self.carga)
+
+    async def close(self):
+        pass
+
+
+class TestConsolidadorCarga:
+    """Tests de la consolidación concurrente de carga entre proveedores."""
+
+    @pytest.mark.asyncio
+    async def test_proveedor_lento_usa_su_ultimo_resultado_sin_frenar_el_ciclo(self):
+        rapido, lento = _ProveedorFalso("rapido", {1: 5}), _ProveedorFalso("lento", {1: 2, 2: 7})
+        consolidador = ConsolidadorCarga([rapido, lento], timeout_seg=0.05, max_antiguedad_seg=60)
+        assert await consolidador.obtener_carga() == {1: 7, 2: 7}
+
+        lento.demora = 10
+        inicio = asyncio.get_running_loop().time()
+        assert await consolidador.obtener_carga() == {1: 7, 2: 7}
+        assert await consolidador.obtener_carga() == {1: 7, 2: 7}
+        assert asyncio.get_running_loop().time() - inicio < 1
+        # La consulta que venció el plazo sigue en curso: no se lanza otra.
+        assert lento.llamadas == 2
+
+        consolidador.max_antiguedad_seg = 0
+        assert await consolidador.obtener_carga() == {1: 5}
+        await consolidador.close()
+
+    @pytest.mark.asyncio
+    async def test_proveedor_con_error_y_sin_resultado_previo_se_omite(self):
+        caido = _ProveedorFalso("caido", {})
+        caido.error = RuntimeError("sin conexión")
+        consolidador = ConsolidadorCarga([caido, _ProveedorFalso("ok", {3: 1})], timeout_seg=1)
+        assert await consolidador.obtener_carga() == {3: 1}
+        await consolidador.close()
+
+
+class TestIndiceRobots:
+    """Tests del índice de nombres de robot compartido por los proveedores de carga."""
+
+    def test_refresco_incremental_alias_y_proveedor(self, caplog):
+        """Un robot creado después del arranque se reconoce sin reiniciar, también por su alias."""
+        db = MagicMock()
+        db.ejecutar_consulta.side_effect = [
+            [{"Marca": 10, "Filas": 1}],
+            [{"RobotId": 1, "Robot": "Robot_Facturas ", "Activo": True, "EsOnline": True, "PoolId": None}],
+            [{"Marca": 12, "Filas": 2}],
+            [{"RobotId": 2, "Robot": "Robot_Pagos", "Activo": True, "EsOnline": True, "PoolId": 3}],
+        ]
+        indice = IndiceRobots(db, mapa_alias={"PAGOS_CLOUDERS": "Robot_Pagos"}, intervalo_refresco_seg=0)
+
+        indice.iniciar()
+        assert indice.buscar("robot_facturas").robot_id == 1
+        assert indice.buscar("PAGOS_CLOUDERS") is None
+
+        indice.refrescar()
+        assert "VersionFila >= ?" in db.ejecutar_consulta.call_args.args[0]
+        assert db.ejecutar_consulta.call_args.args[1] == (10,)
+        assert indice.buscar("pagos_clouders").pool_id == 3
+
+        db_rpa360 = MagicMock()
+        db_rpa360.ejecutar_consulta.return_value = [
+            {"Robot": "PAGOS_CLOUDERS", "CantidadTickets": 4},
+            {"Robot": "Robot_Facturas", "CantidadTickets": 2},
+            {"Robot": "Desconocido", "CantidadTickets": 9},
+        ]
+        proveedor = Rpa360Proveedor(db_rpa360=db_rpa360, indice_robots=indice)
+        with caplog.at_level("WARNING", logger="sam.balanceador.service.proveedores"):
+            assert proveedor.obtener_carga() == {2: 4, 1: 2}
+            assert proveedor.obtener_carga() == {2: 4, 1: 2}
+        # El robot desconocido se avisa una sola vez, no en cada muestra.
+        assert sum("Desconocido" in r.getMessage() for r in caplog.records) == 1
+
+    def test_descarte_se_vuelve_a_avisar_si_el_robot_se_mapeo_entre_medio(self, caplog):
+        """Tras un mapeo exitoso, una nueva rotura del mismo robot vuelve a avisarse como WARNING."""
+        robot = MagicMock(robot_id=1, nombre="Robot_Facturas", activo=True, es_online=True)
+        indice = MagicMock()
+        indice.buscar.side_effect = [None, None, robot, None]
+        db_rpa360 = MagicMock()
+        db_rpa360.ejecutar_consulta.return_value = [{"Robot": "Robot_Facturas", "CantidadTickets": 2}]
+        proveedor = Rpa360Proveedor(db_rpa360=db_rpa360, indice_robots=indice)
+
+        with caplog.at_level("WARNING", logger="sam.balanceador.service.proveedores"):
+            resultados = [proveedor.obtener_carga() for _ in range(4)]
+
+        assert resultados == [{}, {}, {1: 2}, {}]
+        assert sum("Robot_Facturas" in r.getMessage() for r in caplog.records) == 2
+
+
+class TestMotorDisparos:
+    """Tests del disparo de ciclos por cambios de carga."""
+
+    def test_cambio_significativo_dispara_tras_antirrebote(self):
+        motor = MotorDisparos(
+            umbral_tickets=5, umbral_relativo=0.2, latido_seg=120, antirrebote_seg=5, intervalo_min_seg=15
+        )
+        assert motor.evaluar({1: 10}, ahora=0) == MotorDisparos.MOTIVO_LATIDO
+        motor.registrar_ciclo({1: 10, 2: 100}, ahora=0)
+
+        # Ruido por debajo del umbral absoluto o del relativo: no dispara.
+        assert motor.evaluar({1: 13, 2: 100}, ahora=20) is None
+        assert motor.evaluar({1: 10, 2: 110}, ahora=25) is None
+
+        # Ráfaga: se detecta, pero espera el antirrebote antes de disparar.
+        assert motor.evaluar({1: 40, 2: 100}, ahora=30) is None
+        assert motor.evaluar({1: 55, 2: 100}, ahora=35) == MotorDisparos.MOTIVO_CAMBIO_CARGA
+
+        # Un robot que pasa a tener tickets siempre es significativo, respetando la separación mínima.
+        motor.registrar_ciclo({1: 55, 2: 100}, ahora=35)
+        assert motor.evaluar({1: 55, 2: 100, 3: 1}, ahora=40) is None
+        assert motor.evaluar({1: 55, 2: 100, 3: 1}, ahora=50) == MotorDisparos.MOTIVO_CAMBIO_CARGA
+
+    def test_latido_sin_cambios_y_cambio_revertido(self):
+        motor = MotorDisparos(umbral_tickets=5, latido_seg=120, antirrebote_seg=5, intervalo_min_seg=15)
+        motor.registrar_ciclo({1: 10}, ahora=0)
+
+        # Un cambio que se revierte antes del antirrebote no deja un disparo pendiente.
+        assert motor.evaluar({1: 30}, ahora=20) is None
+        assert motor.evaluar({1: 10}, ahora=24) is None
+        assert motor.evaluar({1: 30}, ahora=26) is None
+
+        assert motor.evaluar({1: 10}, ahora=119) is None
+        assert motor.evaluar({1: 10}, ahora=120) == MotorDisparos.MOTIVO_LATIDO
+        assert motor.segundos_hasta_latido(ahora=100) == 20
+
+
+class TestPronosticadorCarga:
+    """Tests del pronóstico de demanda por robot."""
+
+    def test_tendencia_anticipa_demanda(self):
+        pytest.importorskip("numpy")
+        pronosticador = PronosticadorCarga(horizonte_min=10, constante_nivel_min=1, constante_tendencia_min=2)
+        inicio = time.mktime((2024, 3, 12, 14, 0, 0, 0, 0, -1))
+        for minuto in range(10):
+            # El robot 1 crece 5 tickets por minuto; el robot 2 está estable.
+            pronosticador.observar({1: 5 * minuto, 2: 20}, ahora=inicio + 60 * minuto)
+
+        demanda = pronosticador.pronosticar({1: 45, 2: 20, 3: 7}, ahora=inicio + 540)
+        assert demanda[1] > 70
+        assert demanda[2] == 20
+        # Un robot sin historia se dimensiona con su carga actual.
+        assert demanda[3] == 7
+
+    def test_perfil_diario_anticipa_pico_recurrente(self):
+        pytest.importorskip("numpy")
+        pronosticador = PronosticadorCarga(horizonte_min=15, minutos_franja=15, dias_minimos_estacional=2)
+        for dia in (10, 11, 12):
+            for minuto in range(8 * 60, 10 * 60):
+                # Pico de 9:00 a 9:15 (10 tickets por minuto) que se drena hasta las 9:30.
+                if 9 * 60 <= minuto < 9 * 60 + 15:
+                    tickets = 10 * (minuto - 9 * 60)
+                elif 9 * 60 + 15 <= minuto < 9 * 60 + 30:
+                    tickets = 150 - 10 * (minuto - 9 * 60 - 15)
+                else:
+                    tickets = 0
+                ahora = time.mktime((2024, 3, dia, minuto // 60, minuto % 60, 0, 0, 0, -1))
+                pronosticador.observar({1: tickets, 2: 0}, ahora=ahora)
+
+        # Día siguiente a las 8:50, todavía sin tickets: el pico de las 9 se anticipa.
+        antes_del_pico = time.mktime((2024, 3, 13, 8, 50, 0, 0, 0, -1))
+        pronosticador.observar({1: 0, 2: 0}, ahora=antes_del_pico)
+        demanda = pronosticador.pronosticar({1: 0, 2: 0}, ahora=antes_del_pico)
+        assert demanda[1] > 0
+        assert demanda[2] == 0
+
+    def test_pico_recurrente_de_robot_con_cola_vacia(self, mock_notificador: MagicMock):
+        """Un robot que no figura en la carga antes de su pico también se pronostica y se amplía."""
+        pytest.importorskip("numpy")
+        pronosticador = PronosticadorCarga(horizonte_min=15, minutos_franja=15, dias_minimos_estacional=2)
+        for dia in (10, 11, 12):
+            for minuto in range(8 * 60, 10 * 60):
+                # El robot 1 solo aparece en la carga mientras tiene tickets (9:00 a 9:30).
+                carga = {2: 5}
+                if 9 * 60 <= minuto < 9 * 60 + 15:
+                    carga[1] = 10 * (minuto - 9 * 60) or 1
+                elif 9 * 60 + 15 <= minuto < 9 * 60 + 30:
+                    carga[1] = 150 - 10 * (minuto - 9 * 60 - 15)
+                ahora = time.mktime((2024, 3, dia, minuto // 60, minuto % 60, 0, 0, 0, -1))
+                pronosticador.observar(carga, ahora=ahora)
+
+        antes_del_pico = time.mktime((2024, 3, 13, 8, 55, 0, 0, 0, -1))
+        pronosticador.observar({2: 5}, ahora=antes_del_pico)
+        demanda = pronosticador.pronosticar({2: 5}, ahora=antes_del_pico)
+        assert demanda[1] > 0
+        assert demanda[2] == 5
+
+        # La fase del pool lo amplía y la limpieza global no le quita el equipo que ya tiene.
+        algoritmo = Balanceo(
+            db_connector=MagicMock(),
+            notificador=mock_notificador,
+            config_balanceador={"cooling_period_seg": 300, "aislamiento_estricto_pool": True},
+        )
+        estado_global = {
+            "mapa_config_robots": {
+                1: {
+                    "RobotId": 1,
+                    "EsOnline": True,
+                    "MinEquipos": 1,
+                    "MaxEquipos": 5,
+                    "PoolId": 1,
+                    "TicketsPorEquipoAdicional": 1,
+                }
+            },
+            "mapa_equipos_validos_por_pool": {1: {101, 102, 103}},
+            "mapa_asignaciones_dinamicas": {1: [101]},
+            "equipos_con_asignacion_fija": set(),
+            "carga_trabajo_por_robot": {2: 5},
+            "demanda_por_robot": demanda,
+        }
+        algoritmo.ejecutar_limpieza_global(estado_global)
+        algoritmo.ejecutar_balanceo_interno_de_pool(pool_id=1, estado_global=estado_global)
+        plan = estado_global["plan"]
+        assert plan.quitar == []
+        assert [d.robot_id for d in plan.agregar] and all(d.robot_id == 1 for d in plan.agregar)
+
+
+class TestEstadoEnfriamiento:
+    """Tests de la persistencia del estado del CoolingManager."""
+
+    def test_estado_sobrevive_reinicio_y_vence(self, tmp_path):
+        ahora = [1000.0]
+        backend = BackendEnfriamientoArchivo(str(tmp_path / "enfriamiento.json"))
+        cooling = CoolingManager(cooling_period_seconds=300, reloj=lambda: ahora[0], backend=backend)
+        cooling.registrar_ampliacion(1, tickets=50, equipos_asignados=2)
+        cooling.registrar_reduccion(2, tickets=10, equipos_desasignados=1)
+        cooling.volcar()
+
+        # Un proceso nuevo conserva los períodos de enfriamiento vigentes.
+        ahora[0] = 1100.0
+        reiniciado = CoolingManager(cooling_period_seconds=300, reloj=lambda: ahora[0], backend=backend)
+        assert reiniciado.puede_ampliar(1)[0] is False
+        assert reiniciado.puede_reducir(2, tickets_actuales=9)[0] is False
+
+        # Pasado el período, el volcado purga el archivo y un nuevo proceso arranca limpio.
+        ahora[0] = 1400.0
+        reiniciado.volcar()
+        assert backend.cargar(desde=0) == []
+        assert CoolingManager(300, reloj=lambda: ahora[0], backend=backend).puede_ampliar(1)[0] is True
+
+    def test_fallo_del_backend_reintenta_en_el_proximo_volcado(self):
+        backend = MagicMock()
+        backend.cargar.return_value = []
+        backend.guardar.side_effect = [ConnectionError("sin conexión"), None]
+        cooling = CoolingManager(cooling_period_seconds=300, reloj=lambda: 1000.0, backend=backend)
+        cooling.registrar_ampliacion(1, tickets=50, equipos_asignados=2)
+
+        cooling.volcar()
+        cooling.volcar()
+
+        assert [r.robot_id for r in backend.guardar.call_args_list[1].args[0]] == [1]
+
+
+class TestCoordinacion:
+    """Tests de la coordinación entre instancias del balanceador."""
+
+    def test_lider_con_relevo_al_vencer_el_arrendamiento(self):
+        ahora = [0.0]
+        almacen = AlmacenArrendamientosMemoria(reloj=lambda: ahora[0])
+        a = CoordinadorBalanceador(almacen, "a", modo="lider", ttl_seg=60)
+        b = CoordinadorBalanceador(almacen, "b", modo="lider", ttl_seg=60)
+
+        assert a.actualizar() is True
+        assert b.actualizar() is False
+        assert a.pools_a_balancear([1, None]) == [1, None]
+        assert b.pools_a_balancear([1, None]) == []
+
+        # "a" deja de renovar: "b" toma el relevo al vencer y "a" ya no puede recuperarlo.
+        ahora[0] = 61.0
+        assert b.actualizar() is True
+        assert a.actualizar() is False
+        assert a.pools_a_balancear([1, None]) == []
+
+        # Una parada ordenada libera el arrendamiento sin esperar el vencimiento.
+        b.liberar_todo()
+        assert a.actualizar() is True
+
+    def test_particionado_reparte_pools_sin_solaparse(self):
+        almacen = AlmacenArrendamientosMemoria()
+        pools = list(range(1, 21)) + [None]
+        instancias = [CoordinadorBalanceador(almacen, nombre, modo="particionado") for nombre in ("a", "b", "c")]
+        for _ in range(2):
+            for coordinador in instancias:
+                coordinador.actualizar(pools)
+
+        asignados = [set(c.pools_a_balancear(pools)) for c in instancias]
+        assert all(asignados)
+        assert set().union(*asignados) == set(pools)
+        assert sum(len(a) for a in asignados) == len(pools)
+
+    def test_sin_renovar_deja_de_balancear_antes_del_vencimiento(self, mock_notificador: MagicMock):
+        """La líder que no logra renovar no aplica planes; con arrendamiento vigente, el SP recibe el cerco."""
+        ahora = [0.0]
+        almacen = MagicMock()
+        almacen.adquirir.return_value = True
+        lider = CoordinadorBalanceador(almacen, "a", modo="lider", ttl_seg=60, reloj=lambda: ahora[0])
+        assert lider.actualizar() is True
+        assert lider.verificar_vigencia([None]) == CercoArrendamiento("a", [CoordinadorBalanceador.RECURSO_LIDER])
+
+        db = MagicMock()
+        db.ejecutar_consulta.side_effect = [
+            [
+                {
+                    "RobotId": 1,
+                    "EsOnline": True,
+                    "MinEquipos": 1,
+                    "MaxEquipos": 3,
+                    "PoolId": None,
+                    "TicketsPorEquipoAdicional": 1,
+                }
+            ],
+            [{"EquipoId": 101, "PoolId": None}, {"EquipoId": 102, "PoolId": None}],
+            [{"RobotId": 1, "EquipoId": 101, "EsProgramado": 0, "Reservado": 0}],
+            [{"Agregadas": 1, "Quitadas": 0}],
+        ]
+        algoritmo = Balanceo(db_connector=db, notificador=mock_notificador, config_balanceador={"cache_estado": False})
+        algoritmo.ejecutar_algoritmo_completo({1: 5}, [], [None], lambda: lider.verificar_vigencia([None]))
+        query, params = db.ejecutar_consulta.call_args.args
+        assert params[1:] == ("a", "balanceador:lider")
+
+        # La renovación falla: antes de los 60s de vigencia (margen de 15s) ya se da por perdido.
+        almacen.adquirir.side_effect = ConnectionError("sin conexión")
+        ahora[0] = 20.0
+        lider.actualizar()
+        ahora[0] = 45.0
+        assert lider.pools_a_balancear([None]) == []
+        with pytest.raises(ArrendamientoPerdidoError):
+            lider.verificar_vigencia([None])
+        # Una instancia pasiva no muestrea la carga.
+        assert lider.tiene_trabajo() is False
+
+    @pytest.mark.parametrize(
+        "coordinacion, aplicadas, faltantes",
+        [
+            ("ninguna", [1, 2, 3], "[4]"),
+            ("ninguna", [4], None),
+            ("lider", [4, 7], "[9]"),
+            ("particionado", [4, 7, 9], None),
+        ],
+    )
+    def test_inicio_exige_las_migraciones_del_balanceador(self, coordinacion, aplicadas, faltantes):
+        """Sin la migración 4, o sin la 7 y la 9 cuando hay coordinación, el servicio no arranca."""
+        servicio = BalanceadorService.__new__(BalanceadorService)
+        servicio.cfg_balanceador_specifics = {"coordinacion": coordinacion}
+        servicio.db_sam = MagicMock()
+        servicio.db_sam.ejecutar_consulta.return_value = [{"Version": v} for v in aplicadas]
+
+        if faltantes is None:
+            servicio._verificar_esquema()
+        else:
+            with pytest.raises(EsquemaDesactualizadoError, match=re.escape(faltantes)):
+                servicio._verificar_esquema()
+
+
+class TestPlanificadorCiclos:
+    """Tests del planificador asíncrono del servicio."""
+
+    @pytest.mark.asyncio
+    async def test_ciclo_lento_no_se_solapa_ni_desplaza_los_ticks(self):
+        planificador = PlanificadorCiclos(intervalo_seg=0.05)
+        parada = asyncio.Event()
+        en_curso = []
+
+        async def ciclo():
+            en_curso.append(1)
+            assert len(en_curso) == 1
+            await asyncio.sleep(0.12)
+            en_curso.pop()
+
+        async def tick():
+            planificador.lanzar_ciclo(ciclo)
+
+        asyncio.get_running_loop().call_later(0.5, parada.set)
+        await planificador.ejecutar(tick, parada)
+        await planificador.esperar_ciclo_en_curso(1)
+
+        metricas = planificador.metricas
+        assert 9 <= metricas["ticks"] <= 11
+        assert metricas["ciclos_omitidos_por_solapamiento"] >= 4
+        assert metricas["ciclos_lanzados"] + metricas["ciclos_omitidos_por_solapamiento"] == metricas["ticks"]
+
+    @pytest.mark.asyncio
+    async def test_parada_interrumpe_el_tick_en_curso(self):
+        planificador = PlanificadorCiclos(intervalo_seg=60)
+        parada = asyncio.Event()
+
+        async def tick_lento():
+            await asyncio.sleep(30)
+
+        asyncio.get_running_loop().call_later(0.05, parada.set)
+        inicio = time.monotonic()
+        await planificador.ejecutar(tick_lento, parada)
+        assert time.monotonic() - inicio < 1
+
+    @pytest.mark.asyncio
+    async def test_cierre_con_ciclo_colgado_cierra_el_algoritmo_al_terminar_el_ciclo(self):
+        """Si el ciclo no termina a tiempo, el cierre no espera, pero el algoritmo se cierra recién después del ciclo."""
+        servicio = BalanceadorService.__new__(BalanceadorService)
+        servicio.espera_cierre_seg = 0
+        servicio.planificador = MagicMock()
+        servicio.planificador.esperar_ciclo_en_curso = AsyncMock(return_value=False)
+        servicio.coordinador = MagicMock()
+        servicio.algoritmo = MagicMock()
+        servicio.indice_robots = MagicMock()
+        servicio.consolidador_carga = AsyncMock()
+        servicio._executor_ciclos = ThreadPoolExecutor(max_workers=1)
+        fin_ciclo = threading.Event()
+        servicio._executor_ciclos.submit(fin_ciclo.wait, 5)
+
+        await servicio._cerrar()
+        servicio.indice_robots.detener.assert_called_once()
+        servicio.algoritmo.cerrar.assert_not_called()
+
+        fin_ciclo.set()
+        servicio._executor_ciclos.shutdown(wait=True)
+        servicio.algoritmo.cerrar.assert_called_once()
+
+
+class TestSimulador:
+    """Tests del simulador fuera de línea del balanceador."""
+
+    def test_simulacion_sintetica_es_reproducible_y_coherente(self):
+        """Dos corridas con la misma semilla dan el mismo reporte, y la caché no altera las decisiones."""
+        reportes = []
+        for cache in (True, True, False):
+            flota = generar_flota_sintetica(robots=40, pools=3, ciclos=8, semilla=7)
+            simulador = Simulador(flota, {"cache_estado": cache})
+            reporte = simulador.ejecutar()
+            resumen = reporte.resumen()
+            resumen.pop("duracion_media_ms"), resumen.pop("duracion_p95_ms"), resumen.pop("duracion_max_ms")
+            reportes.append(resumen)
+
+            asignaciones = simulador.db.asignaciones
+            assert len({a["EquipoId"] for a in asignaciones}) == len(asignaciones)
+            assert reporte.ciclos[-1].equipos_asignados == len(asignaciones)
+
+        assert reportes[0] == reportes[1] == reportes[2]
+        assert reportes[0]["ciclos"] == 8
+        assert reportes[0]["agregadas"] > 0
+
+    def test_reconstruye_la_carga_desde_el_historico(self):
+        """Los tickets de cada robot se mantienen entre filas del histórico y se agrupan por ciclo."""
+        desde = datetime(2025, 10, 1, 8, 0)
+        db = MagicMock()
+        db.ejecutar_consulta.side_effect = [
+            [{"RobotId": 1, "Activo": True, "EsOnline": True, "MinEquipos": 1, "MaxEquipos": 3, "PoolId": None}],
+            [{"EquipoId": 101, "PoolId": None, "Activo_SAM": True, "PermiteBalanceoDinamico": True}],
+            [],
+            [],
+            [
+                {"FechaBalanceo": desde + timedelta(seconds=10), "RobotId": 1, "TicketsPendientes": 30},
+                {"FechaBalanceo": desde + timedelta(seconds=250), "RobotId": 1, "TicketsPendientes": 0},
+            ],
+        ]
+
+        flota = cargar_flota_desde_historico(db, desde, desde + timedelta(minutes=8), intervalo_seg=120)
+
+        assert flota.carga_por_ciclo == [{1: 30}, {1: 30}, {}, {}]
+        assert flota.origen == "historica"
@@ -0,0 +1,48 @@
+"""
+Benchmarks del ciclo de balanceo sobre flotas simuladas de distintos tamaños.
+
+Se ejecutan con pytest-benchmark (extra dev) y se pueden excluir con -m "not benchmark".
+Para comparar contra una corrida anterior:
+    pytest tests/test_balanceador_benchmark.py --benchmark-autosave --benchmark-compare
+"""
+
+import logging
+
+import pytest
+
+from sam.balanceador.simulator import Simulador, generar_flota_sintetica
+
+pytest.importorskip("pytest_benchmark")
+
+pytestmark = pytest.mark.benchmark
+
+TAMANOS_FLOTA = [10, 100, 1000, 10000]
+CICLOS_PREVIOS = 2
+
+
+@pytest.fixture(autouse=True)
+def silenciar_logs():
+    """Los logs por robot del algoritmo dominarían el tiempo medido."""
+    logging.disable(logging.WARNING)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+@pytest.mark.parametrize("solver", ["greedy", "flujo"])
+@pytest.mark.parametrize("robots", TAMANOS_FLOTA)
+def test_ciclo_de_balanceo(benchmark, robots, solver):
+    """Mide un ciclo en régimen (tras CICLOS_PREVIOS ciclos de arranque) para cada tamaño de flota y solver."""
+    if solver == "flujo":
+        pytest.importorskip("numpy")
+    flota = generar_flota_sintetica(robots=robots, ciclos=CICLOS_PREVIOS + 1, semilla=robots)
+
+    def preparar():
+        simulador = Simulador(flota, {"solver": solver})
+        for _ in range(CICLOS_PREVIOS):
+            simulador.ejecutar_ciclo()
+        return (simulador,), {}
+
+    resultado = benchmark.pedantic(lambda s: s.ejecutar_ciclo(), setup=preparar, rounds=3 if robots >= 10000 else 5)
+
+    benchmark.extra_info.update({"robots": robots, "equipos": len(flota.equipos), "churn": resultado.churn})
+    assert resultado.equipos_asignados <= len(flota.equipos)
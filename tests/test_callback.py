@@ -1,5 +1,7 @@
 """Tests para el servicio Callback, adaptados para la arquitectura lifespan."""
 
+from unittest.mock import AsyncMock
+
 import pytest
 from fastapi.testclient import TestClient
 
@@ -38,7 +40,7 @@ class TestCallbackEndpoints:
         assert "X-Authorization header inválido" in response.json()["detail"]
 
     def test_callback_succeeds_and_updates_db(self, client: TestClient, mock_db_connector):
-        mock_db_connector.actualizar_ejecucion_desde_callback.return_value = UpdateStatus.UPDATED
+        mock_db_connector.actualizar_ejecucion_desde_callback = AsyncMock(return_value=UpdateStatus.UPDATED)
         payload = {"deploymentId": "test-123", "status": "COMPLETED"}
         response = client.post("/api/callback", json=payload, headers={"X-Authorization": "test_token_123"})
 
@@ -49,8 +51,61 @@ class TestCallbackEndpoints:
         expected_payload_obj = CallbackPayload(**payload)
         expected_payload_str = expected_payload_obj.model_dump_json(by_alias=True)
 
-        mock_db_connector.actualizar_ejecucion_desde_callback.assert_called_once_with(
+        mock_db_connector.actualizar_ejecucion_desde_callback.assert_awaited_once_with(
             deployment_id="test-123",
             estado_callback="COMPLETED",
             callback_payload_str=expected_payload_str,
         )
+
+
+class TestEscritorCallbacks:
+    @pytest.mark.asyncio
+    async def test_vuelca_callbacks_encolados_en_un_lote(self, tmp_path):
+        """Los callbacks encolados se aplican juntos y salen del diario al confirmarse."""
+        from unittest.mock import MagicMock
+
+        from sam.callback.service.escritor_callbacks import EscritorCallbacks
+
+        db = MagicMock()
+        db.actualizar_ejecuciones_desde_callback_lote = AsyncMock(
+            return_value=[UpdateStatus.UPDATED, UpdateStatus.NOT_FOUND]
+        )
+        ruta = tmp_path / "cola.jsonl"
+        escritor = EscritorCallbacks(db, intervalo_ms=50, lote_max=10, ruta_diario=str(ruta))
+
+        await escritor.encolar("dep-1", "COMPLETED", "{}")
+        await escritor.encolar("dep-2", "RUN_FAILED", "{}")
+        # Un proceso nuevo recupera lo que quedó en el diario.
+        assert EscritorCallbacks(db, 50, 10, str(ruta)).cantidad_pendientes == 2
+
+        await escritor.volcar()
+
+        db.actualizar_ejecuciones_desde_callback_lote.assert_awaited_once_with(
+            [("dep-1", "COMPLETED", "{}"), ("dep-2", "RUN_FAILED", "{}")]
+        )
+        assert escritor.cantidad_pendientes == 0
+        assert EscritorCallbacks(db, 50, 10, str(ruta)).cantidad_pendientes == 0
+
+    @pytest.mark.asyncio
+    async def test_adopta_solo_diarios_de_procesos_terminados(self, tmp_path):
+        """Un worker nuevo adopta el diario de un proceso muerto, pero no el de un worker vivo."""
+        import json
+
+        from sam.callback.service.escritor_callbacks import EscritorCallbacks
+        from sam.common.diario_persistente import _bloquear_sin_esperar
+
+        def anotar(ruta, id_registro):
+            registro = {"Id": id_registro, "DeploymentId": id_registro, "Estado": "COMPLETED", "CallbackInfo": "{}"}
+            ruta.write_text(json.dumps(registro) + "\n", encoding="utf-8")
+
+        anotar(tmp_path / "cola.jsonl", "legado")  # diario sin pid de la versión anterior
+        anotar(tmp_path / "cola.111111.jsonl", "huerfano")
+        anotar(tmp_path / "cola.222222.jsonl", "vivo")
+        with open(tmp_path / "cola.222222.jsonl.lock", "a+b") as bloqueo_vivo:
+            assert _bloquear_sin_esperar(bloqueo_vivo)
+            escritor = EscritorCallbacks(AsyncMock(), 50, 10, str(tmp_path / "cola.jsonl"))
+
+        assert sorted(r["Id"] for r in escritor._pendientes) == ["huerfano", "legado"]
+        assert not (tmp_path / "cola.jsonl").exists() and not (tmp_path / "cola.111111.jsonl").exists()
+        assert (tmp_path / "cola.222222.jsonl").exists()
+        await escritor.detener()
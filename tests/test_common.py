@@ -1,5 +1,6 @@
 """Tests para los módulos de `common`."""
 
+import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import httpx
@@ -60,3 +61,213 @@ class TestAutomationAnywhereClient:
             assert robots is not None
             assert mock_async_client.post.call_count == 1
             assert mock_async_client.request.call_count == 2
+
+
+@pytest.mark.asyncio
+class TestAsyncDatabaseConnector:
+    async def test_delegates_to_sync_connector_in_executor(self):
+        """Verifica que la fachada asíncrona delega en el conector síncrono fuera del event loop."""
+        import threading
+
+        from sam.common.database import AsyncDatabaseConnector
+
+        sync_connector = MagicMock()
+        sync_connector.db_config_prefix = "SQL_SAM"
+        sync_connector.pool_max_size = 2
+        hilos = []
+
+        def fake_query(query, params=None, es_select=True):
+            hilos.append(threading.current_thread().name)
+            return [{"ok": 1}]
+
+        sync_connector.ejecutar_consulta.side_effect = fake_query
+        async_connector = AsyncDatabaseConnector(sync_connector)
+        try:
+            resultado = await async_connector.ejecutar_consulta("SELECT 1", es_select=True)
+        finally:
+            async_connector.cerrar()
+
+        assert resultado == [{"ok": 1}]
+        assert hilos and hilos[0].startswith("sam-db-SQL_SAM")
+        sync_connector.cerrar_conexiones_pool.assert_called_once()
+
+
+class TestPoolConexiones:
+    @pytest.fixture
+    def conector(self, monkeypatch):
+        from sam.common.database import DatabaseConnector
+
+        monkeypatch.setenv("SQL_SAM_POOL_MAX_CONEXIONES", "1")
+        monkeypatch.setenv("SQL_SAM_POOL_TIMEOUT_ESPERA_SEG", "0.05")
+        monkeypatch.setenv("SQL_SAM_POOL_VALIDAR_TRAS_SEG", "0")
+        with patch("sam.common.database.pyodbc.connect", side_effect=lambda *_: MagicMock()) as mock_connect:
+            db = DatabaseConnector("srv", "db", "user", "pwd")
+            db._mock_connect = mock_connect
+            yield db
+
+    def test_pool_acotado_lanza_error_al_agotarse(self, conector):
+        """Verifica que el pool no crea más conexiones que el máximo y que la espera expira."""
+        from sam.common.database import PoolAgotadoError
+
+        with conector.obtener_cursor():
+            with pytest.raises(PoolAgotadoError):
+                with conector.obtener_cursor():
+                    pass
+
+        stats = conector.obtener_estadisticas_pool()
+        assert stats["creaciones"] == 1
+        assert stats["timeouts"] == 1
+        assert stats["en_uso"] == 0 and stats["inactivas"] == 1
+
+    def test_conexion_muerta_se_descarta_al_reutilizar(self, conector):
+        """Verifica que una conexión que no responde al sondeo se descarta y se crea otra."""
+        import pyodbc
+
+        with conector.obtener_cursor():
+            pass
+        conexion_muerta = conector._pool[0].conn
+        conexion_muerta.cursor.return_value.execute.side_effect = pyodbc.Error("08S01", "Communication link failure")
+
+        with conector.obtener_cursor():
+            pass
+
+        conexion_muerta.close.assert_called_once()
+        stats = conector.obtener_estadisticas_pool()
+        assert stats["creaciones"] == 2
+        assert stats["descartes"] == 1
+        assert stats["abiertas"] == 1
+
+    def test_callback_se_resuelve_en_un_solo_round_trip(self, conector):
+        """Verifica que el callback ejecuta un único lote y traduce su resultado."""
+        from sam.common.database import UpdateStatus
+
+        with conector.obtener_cursor():
+            pass
+        cursor = conector._pool[0].conn.cursor.return_value
+        cursor.fetchone.return_value = ("ALREADY_PROCESSED",)
+        cursor.execute.reset_mock()
+
+        resultado = conector.actualizar_ejecucion_desde_callback("dep-1", "COMPLETED", "{}")
+
+        assert resultado == UpdateStatus.ALREADY_PROCESSED
+        # Se ignora el sondeo de validación que el pool hace al reutilizar la conexión.
+        llamadas = [c for c in cursor.execute.call_args_list if c.args[0] != "SELECT 1"]
+        assert len(llamadas) == 1
+        query, params = llamadas[0].args
+        assert "OUTPUT inserted.EjecucionId" in query
+        assert params == ("COMPLETED", "{}", "dep-1", "dep-1")
+
+    def test_precalienta_el_minimo_y_tolera_fallos(self, monkeypatch):
+        """Verifica que se abren las conexiones mínimas al construir y que un fallo no impide arrancar."""
+        import pyodbc
+
+        from sam.common.database import DatabaseConnector
+
+        monkeypatch.setenv("SQL_SAM_POOL_MIN_CONEXIONES", "3")
+        with patch("sam.common.database.pyodbc.connect", side_effect=lambda *_: MagicMock()):
+            db = DatabaseConnector("srv", "db", "user", "pwd")
+        stats = db.obtener_estadisticas_pool()
+        assert stats["inactivas"] == 3 and stats["abiertas"] == 3 and stats["creaciones"] == 3
+
+        errores = [MagicMock(), pyodbc.Error("08001", "Server not found")]
+        with patch("sam.common.database.pyodbc.connect", side_effect=errores):
+            db = DatabaseConnector("srv", "db", "user", "pwd")
+        stats = db.obtener_estadisticas_pool()
+        assert stats["inactivas"] == 1 and stats["abiertas"] == 1
+
+
+@pytest.mark.asyncio
+class TestPaginacionA360:
+    async def test_paginas_restantes_se_piden_en_paralelo_segun_el_total(self):
+        """Verifica que, con el total informado en la primera página, se piden todas las páginas restantes."""
+        with patch("sam.common.a360_client.httpx.AsyncClient"):
+            aa_client = AutomationAnywhereClient(
+                control_room_url="https://fake-cr.com", username="test", api_key="k", paginacion_concurrencia=3
+            )
+        offsets_pedidos = []
+
+        async def fake_request(method, endpoint, json):
+            offset, length = json["page"]["offset"], json["page"]["length"]
+            offsets_pedidos.append(offset)
+            ids = range(offset, min(offset + length, 450))
+            return {"list": [{"id": i} for i in ids], "page": {"offset": offset, "total": 450, "totalFilter": 450}}
+
+        aa_client._realizar_peticion_api = AsyncMock(side_effect=fake_request)
+
+        usuarios = await aa_client.obtener_usuarios_detallados()
+
+        assert sorted(u["id"] for u in usuarios) == list(range(450))
+        assert sorted(offsets_pedidos) == [0, 200, 400]
+
+    async def test_pagina_con_error_cancela_y_espera_las_pendientes(self):
+        """Si una página falla, las demás se cancelan y se esperan antes de propagar el error."""
+        with patch("sam.common.a360_client.httpx.AsyncClient"):
+            aa_client = AutomationAnywhereClient(
+                control_room_url="https://fake-cr.com", username="test", api_key="k", paginacion_concurrencia=5
+            )
+        lentas = []
+
+        async def fake_request(method, endpoint, json):
+            offset = json["page"]["offset"]
+            if offset == 200:
+                raise httpx.ReadTimeout("timeout")
+            if offset > 200:
+                lentas.append(asyncio.current_task())
+                await asyncio.sleep(60)
+            return {"list": [{"id": offset}], "page": {"offset": offset, "total": 1000, "totalFilter": 1000}}
+
+        aa_client._realizar_peticion_api = AsyncMock(side_effect=fake_request)
+
+        with pytest.raises(httpx.ReadTimeout):
+            await aa_client.obtener_usuarios_detallados()
+
+        assert lentas and all(tarea.done() for tarea in lentas)
+
+
+@pytest.mark.asyncio
+class TestConsultaDeploymentsConcurrente:
+    async def test_lote_con_timeout_se_divide_en_lugar_de_omitirse(self):
+        """Verifica que un lote que excede el timeout se divide y sus IDs se recuperan."""
+        with patch("sam.common.a360_client.httpx.AsyncClient"):
+            aa_client = AutomationAnywhereClient(control_room_url="https://fake-cr.com", username="test", api_key="k")
+
+        async def fake_request(method, endpoint, json):
+            ids = [op["value"] for op in json["filter"]["operands"]]
+            if len(ids) > 25:
+                raise httpx.ReadTimeout("timeout")
+            return {"list": [{"deploymentId": dep_id} for dep_id in ids]}
+
+        aa_client._realizar_peticion_api = AsyncMock(side_effect=fake_request)
+        deployment_ids = [f"dep-{i}" for i in range(120)]
+
+        detalles = await aa_client.obtener_detalles_por_deployment_ids(deployment_ids)
+
+        assert sorted(d["deploymentId"] for d in detalles) == sorted(deployment_ids)
+        assert aa_client._tamano_lote_conciliador == 25
+
+
+class TestMigradorEsquema:
+    def test_aplica_solo_las_migraciones_pendientes(self):
+        """Verifica que las versiones ya registradas no se vuelven a aplicar."""
+        from contextlib import contextmanager
+
+        from sam.common.migraciones import Migracion, MigradorEsquema
+
+        db = MagicMock()
+        db.ejecutar_consulta.return_value = [{"Version": 1}]
+        cursor = MagicMock()
+
+        @contextmanager
+        def fake_cursor():
+            yield cursor
+
+        db.obtener_cursor.side_effect = fake_cursor
+        migraciones = [Migracion(2, "dos", ["SELECT 2"]), Migracion(1, "uno", ["SELECT 1"])]
+
+        aplicadas = MigradorEsquema(db, migraciones).aplicar_pendientes()
+
+        assert aplicadas == [2]
+        sentencias = [c.args[0] for c in cursor.execute.call_args_list]
+        assert sentencias[0] == "SELECT 2"
+        assert "INSERT INTO dbo.MigracionesEsquema" in sentencias[1]
+        assert "SELECT 1" not in sentencias
@@ -71,3 +71,363 @@ async def test_sincronizador_updates_running_deployment(mock_db_connector):
     # Assert
     mock_a360_client.get_deployment_status.assert_called_once_with("dep-123")
     mock_db_connector.execute.assert_called_once()
+
+
+async def test_registrador_inserta_al_registrar_y_agrupa_los_concurrentes(tmp_path):
+    """
+    Verifica que cada despliegue se inserta en segundo plano apenas se registra (antes de
+    que llegue su callback), que los que terminan durante un INSERT en curso van juntos en
+    el siguiente y que el diario local queda vacío.
+    """
+    import asyncio
+
+    from sam.lanzador.service.registrador_ejecuciones import RegistradorEjecuciones
+
+    async def insertar(registros):
+        await asyncio.sleep(0.05)
+
+    db = AsyncMock()
+    db.insertar_registros_ejecucion.side_effect = insertar
+    registrador = RegistradorEjecuciones(db, tamano_lote=10, ruta_diario=str(tmp_path / "pendientes.jsonl"))
+
+    await registrador.registrar({"DeploymentId": "dep-0", "RobotId": 0, "EquipoId": 100, "UserId": 7})
+    db.insertar_registros_ejecucion.assert_not_awaited()
+    await registrador.esperar_volcado_en_curso()
+    db.insertar_registros_ejecucion.assert_awaited_once()
+
+    await asyncio.gather(
+        *(
+            registrador.registrar({"DeploymentId": f"dep-{i}", "RobotId": i, "EquipoId": 100 + i, "UserId": 7})
+            for i in (1, 2, 3)
+        )
+    )
+    await registrador.esperar_volcado_en_curso()
+    lotes = [[fila[0] for fila in c.args[0]] for c in db.insertar_registros_ejecucion.call_args_list[1:]]
+    assert sorted(sum(lotes, [])) == ["dep-1", "dep-2", "dep-3"]
+    assert len(lotes) < 3
+    assert registrador.cantidad_pendientes == 0
+    assert (
+        RegistradorEjecuciones(db, tamano_lote=10, ruta_diario=str(tmp_path / "pendientes.jsonl")).cantidad_pendientes
+        == 0
+    )
+
+
+async def test_desplegador_no_reporta_fallido_si_falla_el_diario(tmp_path):
+    """Un error del diario local no convierte en fallido un despliegue que A360 aceptó: igual se registra en la BD."""
+    db = AsyncMock()
+    db.obtener_robots_ejecutables.return_value = [{"RobotId": 1, "UserId": 1, "EquipoId": 1}]
+    config = {"pausa_lanzamiento": (None, None), "archivo_ejecuciones_pendientes": str(tmp_path / "pendientes.jsonl")}
+    gateway = AsyncMock()
+    gateway.get_auth_header.return_value = {}
+    aa_client = AsyncMock(spec=AutomationAnywhereClient)
+    aa_client.desplegar_bot_v4.return_value = {"deploymentId": "dep-1"}
+    desplegador = Desplegador(db, aa_client, gateway, config, callback_token="token")
+    desplegador._registrador._diario.agregar = MagicMock(side_effect=OSError("disco lleno"))
+
+    await desplegador.desplegar_robots_pendientes()
+
+    assert desplegador.metricas_ultimo_ciclo["exitosos"] == 1
+    db.insertar_registros_ejecucion.assert_awaited_once()
+
+
+async def test_registrador_recupera_despliegues_no_registrados(tmp_path):
+    """
+    Verifica que, si la BD falla, los despliegues quedan en el diario y un nuevo
+    registrador (p.ej. tras reiniciar el servicio) los recupera.
+    """
+    from sam.lanzador.service.registrador_ejecuciones import RegistradorEjecuciones
+
+    ruta = str(tmp_path / "pendientes.jsonl")
+    db_caida = AsyncMock()
+    db_caida.insertar_registros_ejecucion.side_effect = Exception("BD no disponible")
+    registrador = RegistradorEjecuciones(db_caida, tamano_lote=10, ruta_diario=ruta)
+    await registrador.registrar({"DeploymentId": "dep-1", "RobotId": 1, "EquipoId": 10, "UserId": 7})
+    assert await registrador.volcar() == 0
+
+    db = AsyncMock()
+    recuperado = RegistradorEjecuciones(db, tamano_lote=10, ruta_diario=ruta)
+    assert recuperado.cantidad_pendientes == 1
+    assert await recuperado.volcar() == 1
+    assert RegistradorEjecuciones(db, tamano_lote=10, ruta_diario=ruta).cantidad_pendientes == 0
+
+
+async def test_registrador_deja_pendiente_el_lote_si_la_bd_no_esta_disponible(tmp_path):
+    """Un error de conexión no dispara reintentos fila por fila: el lote queda pendiente para el próximo volcado."""
+    from sam.common.database import PoolAgotadoError
+    from sam.lanzador.service.registrador_ejecuciones import RegistradorEjecuciones
+
+    db = AsyncMock()
+    db.insertar_registros_ejecucion.side_effect = PoolAgotadoError("sin conexiones")
+    registrador = RegistradorEjecuciones(db, tamano_lote=2, ruta_diario=str(tmp_path / "pendientes.jsonl"))
+    await registrador.registrar({"DeploymentId": "dep-0", "RobotId": 0, "EquipoId": 10, "UserId": 7})
+    await registrador.esperar_volcado_en_curso()
+    db.insertar_registros_ejecucion.assert_awaited_once()
+
+    # Con la BD caída, los siguientes solo se encolan: no hay más volcados de fondo.
+    for i in range(1, 5):
+        await registrador.registrar({"DeploymentId": f"dep-{i}", "RobotId": i, "EquipoId": 10 + i, "UserId": 7})
+    await registrador.esperar_volcado_en_curso()
+    db.insertar_registros_ejecucion.assert_awaited_once()
+
+    # Un volcado explícito prueba el primer lote y deja el resto sin intentar.
+    assert await registrador.volcar() == 0
+    assert db.insertar_registros_ejecucion.await_count == 2
+    assert registrador.cantidad_pendientes == 5
+
+    db.insertar_registros_ejecucion.side_effect = None
+    assert await registrador.volcar() == 5
+    assert registrador.cantidad_pendientes == 0
+
+
+async def test_desplegador_limita_despliegues_en_curso(tmp_path):
+    """
+    Verifica que nunca hay más despliegues simultáneos que `max_workers_lanzador`
+    y que un despliegue lento no impide que los demás cupos sigan avanzando.
+    """
+    import asyncio
+
+    db = AsyncMock()
+    db.obtener_robots_ejecutables.return_value = [{"RobotId": i, "UserId": 1, "EquipoId": i} for i in range(6)]
+    config = {
+        "max_workers_lanzador": 2,
+        "pausa_lanzamiento": (None, None),
+        "archivo_ejecuciones_pendientes": str(tmp_path / "pendientes.jsonl"),
+    }
+    gateway = AsyncMock()
+    gateway.get_auth_header.return_value = {}
+    aa_client = AsyncMock(spec=AutomationAnywhereClient)
+
+    en_curso = 0
+    maximo_en_curso = 0
+
+    async def desplegar(file_id, **kwargs):
+        nonlocal en_curso, maximo_en_curso
+        en_curso += 1
+        maximo_en_curso = max(maximo_en_curso, en_curso)
+        await asyncio.sleep(0.05 if file_id == 0 else 0.001)
+        en_curso -= 1
+        return {"deploymentId": f"dep-{file_id}"}
+
+    aa_client.desplegar_bot_v4.side_effect = desplegar
+    desplegador = Desplegador(db, aa_client, gateway, config, callback_token="token")
+
+    await desplegador.desplegar_robots_pendientes()
+
+    assert maximo_en_curso == 2
+    assert desplegador.metricas_ultimo_ciclo["exitosos"] == 6
+    assert desplegador.metricas_ultimo_ciclo["latencia_despliegue_seg"]["muestras"] == 6
+    insertados = [fila[0] for c in db.insertar_registros_ejecucion.call_args_list for fila in c.args[0]]
+    assert sorted(insertados) == [f"dep-{i}" for i in range(6)]
+
+
+@pytest.mark.asyncio
+async def test_conciliador_solo_consulta_ejecuciones_vencidas():
+    """Una ejecución recién desplegada no se consulta a A360 hasta su duración esperada."""
+    from datetime import datetime, timedelta
+
+    from sam.lanzador.service.conciliador import Conciliador
+
+    ahora = datetime.now()
+    db = MagicMock()
+    db.ejecutar_consulta = AsyncMock(return_value=[{"RobotId": 1, "DuracionPromedioSeg": 600.0}])
+    db.ejecutar_consulta_multiple = AsyncMock(return_value=1)
+    db.obtener_ejecuciones_en_curso = AsyncMock(
+        return_value=[
+            {
+                "EjecucionId": 1,
+                "DeploymentId": "dep-nuevo",
+                "RobotId": 1,
+                "FechaInicio": ahora,
+                "IntentosConciliadorFallidos": 0,
+            },
+            {
+                "EjecucionId": 2,
+                "DeploymentId": "dep-viejo",
+                "RobotId": 1,
+                "FechaInicio": ahora - timedelta(hours=2),
+                "IntentosConciliadorFallidos": 0,
+            },
+        ]
+    )
+    aa_client = MagicMock()
+    aa_client.obtener_detalles_por_deployment_ids = AsyncMock(
+        return_value=[{"deploymentId": "dep-viejo", "status": "RUNNING"}]
+    )
+    conciliador = Conciliador(db_connector=db, aa_client=aa_client, max_intentos_fallidos=3)
+
+    await conciliador.conciliar_ejecuciones()
+    await conciliador.conciliar_ejecuciones()
+
+    # La ejecución vieja se consulta una vez y queda reagendada; la nueva todavía no vence.
+    aa_client.obtener_detalles_por_deployment_ids.assert_awaited_once_with(["dep-viejo"])
+
+
+def _db_calendario(ejecutadas=()):
+    """Conector falso que responde las consultas del calendario según su texto."""
+    from datetime import date, time
+
+    programaciones = [
+        {
+            "ProgramacionId": 1,
+            "RobotId": 1,
+            "TipoProgramacion": "Diaria",
+            "HoraInicio": time(9, 0),
+            "DiasSemana": None,
+            "DiaDelMes": None,
+            "FechaEspecifica": None,
+            "Tolerancia": 10,
+            "EquipoId": 10,
+            "UserId": 100,
+        },
+        {
+            "ProgramacionId": 1,
+            "RobotId": 1,
+            "TipoProgramacion": "Diaria",
+            "HoraInicio": time(9, 0),
+            "DiasSemana": None,
+            "DiaDelMes": None,
+            "FechaEspecifica": None,
+            "Tolerancia": 10,
+            "EquipoId": 11,
+            "UserId": 101,
+        },
+        {
+            "ProgramacionId": 2,
+            "RobotId": 2,
+            "TipoProgramacion": "Semanal",
+            "HoraInicio": time(9, 0),
+            "DiasSemana": "Lu,Sá",
+            "DiaDelMes": None,
+            "FechaEspecifica": None,
+            "Tolerancia": 0,
+            "EquipoId": 12,
+            "UserId": 102,
+        },
+        {
+            "ProgramacionId": 3,
+            "RobotId": 3,
+            "TipoProgramacion": "Especifica",
+            "HoraInicio": time(9, 0),
+            "DiasSemana": None,
+            "DiaDelMes": None,
+            "FechaEspecifica": date(2026, 10, 18),
+            "Tolerancia": 30,
+            "EquipoId": 13,
+            "UserId": 103,
+        },
+    ]
+
+    async def consultar(query, params=None, es_select=False):
+        if "CHECKSUM_AGG" in query:
+            return [{"Filas": len(programaciones), "Huella": 1}]
+        if "FROM dbo.Programaciones" in query:
+            return programaciones
+        return list(ejecutadas)
+
+    db = AsyncMock()
+    db.ejecutar_consulta.side_effect = consultar
+    return db
+
+
+async def test_calendario_entrega_programaciones_en_ventana_una_sola_vez():
+    """
+    El calendario entrega cada par robot-equipo mientras su ventana está abierta, omite los
+    ya registrados en Ejecuciones y deja de entregarlo al confirmarse el lanzamiento.
+    """
+    from datetime import datetime, time
+
+    from sam.lanzador.service.calendario_programaciones import CalendarioProgramaciones
+
+    ejecutada = {"RobotId": 1, "EquipoId": 11, "Hora": time(9, 0), "FechaInicio": datetime(2026, 10, 17, 9, 0, 30)}
+    calendario = CalendarioProgramaciones(_db_calendario([ejecutada]), gracia_seg=120)
+    sabado = datetime(2026, 10, 17)
+
+    assert await calendario.robots_programados_pendientes(sabado.replace(hour=8, minute=59)) == []
+
+    pendientes = await calendario.robots_programados_pendientes(sabado.replace(hour=9, minute=1))
+    # La tolerancia 0 se extiende a la gracia; "Sá" coincide con el sábado; la fecha específica es otro día.
+    assert [(p["RobotId"], p["EquipoId"]) for p in pendientes] == [(1, 10), (2, 12)]
+
+    calendario.confirmar_lanzamiento(pendientes[0])
+    pendientes = await calendario.robots_programados_pendientes(sabado.replace(hour=9, minute=1, second=30))
+    assert [(p["RobotId"], p["EquipoId"]) for p in pendientes] == [(2, 12)]
+
+    assert await calendario.robots_programados_pendientes(sabado.replace(hour=9, minute=15)) == []
+    # Al día siguiente vuelve la diaria (y la específica); la semanal no corresponde al domingo.
+    pendientes = await calendario.robots_programados_pendientes(datetime(2026, 10, 18, 9, 5))
+    assert sorted((p["RobotId"], p["EquipoId"]) for p in pendientes) == [(1, 10), (1, 11), (3, 13)]
+
+
+async def test_desplegador_con_calendario_solo_consulta_disponibilidad(tmp_path):
+    """
+    Con el motor de calendario no se llama a ObtenerRobotsEjecutables: los programados en
+    equipos ocupados se saltean y los online no usan equipos tomados por un programado.
+    """
+    from datetime import datetime
+
+    db = _db_calendario()
+    db.obtener_equipos_ocupados.return_value = [12]
+    db.obtener_robots_online_disponibles.return_value = [
+        {"RobotId": 5, "EquipoId": 10, "UserId": 100, "Hora": None},
+        {"RobotId": 5, "EquipoId": 14, "UserId": 104, "Hora": None},
+    ]
+    config = {
+        "motor_programaciones": "calendario",
+        "pausa_lanzamiento": (None, None),
+        "archivo_ejecuciones_pendientes": str(tmp_path / "pendientes.jsonl"),
+    }
+    gateway = AsyncMock()
+    gateway.get_auth_header.return_value = {}
+    aa_client = AsyncMock(spec=AutomationAnywhereClient)
+    aa_client.desplegar_bot_v4.side_effect = lambda file_id, user_ids, **kwargs: {
+        "deploymentId": f"dep-{file_id}-{user_ids[0]}"
+    }
+    desplegador = Desplegador(db, aa_client, gateway, config, callback_token="token")
+    desplegador._calendario._reloj = lambda: datetime(2026, 10, 17, 9, 1)
+
+    await desplegador.desplegar_robots_pendientes()
+
+    desplegados = sorted(c.kwargs["user_ids"][0] for c in aa_client.desplegar_bot_v4.call_args_list)
+    assert desplegados == [100, 101, 104]
+    db.obtener_robots_ejecutables.assert_not_awaited()
+
+    # Los programados ya lanzados no se repiten en el ciclo siguiente.
+    aa_client.desplegar_bot_v4.reset_mock()
+    db.obtener_robots_online_disponibles.return_value = []
+    await desplegador.desplegar_robots_pendientes()
+    aa_client.desplegar_bot_v4.assert_not_called()
+
+
+async def test_vigilante_eventos_avanza_la_marca_de_agua():
+    """El primer sondeo fija la marca en el último evento existente; los siguientes solo leen lo nuevo."""
+    from sam.lanzador.service.eventos_lanzador import VigilanteEventosLanzador
+
+    db = AsyncMock()
+    db.ejecutar_consulta.side_effect = [
+        [{"Marca": 40}],
+        [{"EventoId": 41, "EquipoId": 7}, {"EventoId": 42, "EquipoId": 8}, {"EventoId": 43, "EquipoId": 7}],
+        [],
+    ]
+    vigilante = VigilanteEventosLanzador(db, lote_max=100)
+
+    assert await vigilante.obtener_equipos_liberados() == set()
+    assert await vigilante.obtener_equipos_liberados() == {7, 8}
+    assert await vigilante.obtener_equipos_liberados() == set()
+    assert db.ejecutar_consulta.call_args_list[1].args[1] == (100, 40)
+    assert db.ejecutar_consulta.call_args_list[2].args[1] == (100, 43)
+
+
+async def test_desplegador_por_evento_solo_despliega_en_equipos_liberados(tmp_path):
+    """Un ciclo disparado por un callback se limita a los equipos liberados."""
+    db = AsyncMock()
+    db.obtener_robots_ejecutables.return_value = [{"RobotId": i, "UserId": i, "EquipoId": i} for i in range(4)]
+    config = {"pausa_lanzamiento": (None, None), "archivo_ejecuciones_pendientes": str(tmp_path / "pendientes.jsonl")}
+    gateway = AsyncMock()
+    gateway.get_auth_header.return_value = {}
+    aa_client = AsyncMock(spec=AutomationAnywhereClient)
+    aa_client.desplegar_bot_v4.side_effect = lambda file_id, **kwargs: {"deploymentId": f"dep-{file_id}"}
+    desplegador = Desplegador(db, aa_client, gateway, config, callback_token="token")
+
+    await desplegador.desplegar_robots_pendientes(equipo_ids={1, 3})
+
+    assert sorted(c.kwargs["file_id"] for c in aa_client.desplegar_bot_v4.call_args_list) == [1, 3]
@@ -1,8 +1,12 @@
 """Tests para el backend de la Interfaz Web."""
 
+import re
+
 import pytest
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
 
+from sam.web.backend.api import router
 from sam.web.backend.dependencies import get_db
 from sam.web.main import app
 
@@ -43,3 +47,39 @@ class TestWebAPIEndpoints:
         response = client.patch("/api/robots/999", json={"Activo": False})
         assert response.status_code == 404
         assert "Robot no encontrado" in response.json()["detail"]
+
+
+def test_create_robot_con_columna_versionfila(mock_db_connector):
+    """Con VersionFila (rowversion, migración 5) en dbo.Robots, crear un robot responde 201 y no expone los bytes."""
+    fila = {
+        "RobotId": 7,
+        "Robot": "NuevoBot",
+        "Descripcion": None,
+        "Parametros": None,
+        "Activo": True,
+        "EsOnline": False,
+        "MinEquipos": -1,
+        "MaxEquipos": 1,
+        "PrioridadBalanceo": 100,
+        "TicketsPorEquipoAdicional": None,
+        "PoolId": None,
+        "VersionFila": b"\x00\x00\x00\x00\x00\x00\x9c\xff",
+    }
+
+    def insertar(query, params=None, es_select=True):
+        # Emula el OUTPUT de SQL Server: INSERTED.* devuelve todas las columnas de la tabla.
+        columnas = re.findall(r"INSERTED\.(\w+|\*)", query)
+        return [fila if "*" in columnas else {c: fila[c] for c in columnas}]
+
+    mock_db_connector.ejecutar_consulta.side_effect = insertar
+    app_prueba = FastAPI()
+    app_prueba.include_router(router)
+    app_prueba.dependency_overrides[get_db] = lambda: mock_db_connector
+    with TestClient(app_prueba) as test_client:
+        response = test_client.post(
+            "/api/robots", json={"RobotId": 7, "Robot": "NuevoBot", "Activo": True, "EsOnline": False}
+        )
+
+    assert response.status_code == 201
+    assert response.json()["Robot"] == "NuevoBot"
+    assert "VersionFila" not in response.json()